@@ -236,6 +236,24 @@ class DownloadError(Error):
 
 
 
+class NotModifiedError(DownloadError):
+  """Indicate that a file was not downloaded again because it has not changed
+  since it was last downloaded."""
+  pass
+
+
+
+
+
+class ConnectionPoolTimeoutError(DownloadError):
+  """Indicate that no connection to a mirror host was released by the other
+  downloads from that host in time.  The mirror itself did not fail."""
+  pass
+
+
+
+
+
 class DownloadLengthMismatchError(DownloadError):
   """Indicate that a mismatch of lengths was seen while downloading a file."""
 
@@ -0,0 +1,734 @@
+"""
+<Program Name>
+  async_download.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  An asyncio counterpart of 'download.py', for clients that update many
+  repositories, and download many targets, from a single event loop without a
+  thread per request.  safe_download() and unsafe_download() are coroutines
+  that return the same 'ssl_crypto.util.TempFile' objects as their
+  'download.py' namesakes, after the same length checks and slow retrieval
+  defenses, so that the downloaded files are verified by the same code.
+
+  Files are requested with HTTP/1.1 over asyncio streams, one connection per
+  request.  Only the 'http' and 'https' URI schemes are supported.
+
+  This module requires Python 3.5, or later.
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import asyncio
+import logging
+import ssl
+import timeit
+
+import ssl_crypto
+import ssl_crypto.conf
+import ssl_crypto.download
+import ssl_crypto.formats
+import ssl_crypto.util
+
+import six
+
+# See 'log.py' to learn how logging is handled in TUF.
+logger = logging.getLogger('ssl_crypto.async_download')
+
+# The URI schemes supported by this module, and their default ports.
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Redirections are followed, as they are by 'download.py'.
+_REDIRECT_STATUS_CODES = [301, 302, 303, 307, 308]
+_MAX_REDIRECTIONS = 10
+
+# The maximum number of header lines accepted in a response.
+_MAX_HEADER_LINES = 100
+
+
+
+async def safe_download(url, required_length, hash_algorithms=None,
+                        mirror_scoreboard=None):
+  """
+  <Purpose>
+    Given the 'url' and 'required_length' of the desired file, open a
+    connection to 'url', download it, and return the contents of the file.
+    Also ensure the length of the downloaded file matches 'required_length'
+    exactly.  See 'ssl_crypto.download.safe_download()'.
+
+  <Arguments>
+    url:
+      A URL string that represents the location of the file.  The URI scheme
+      component must be 'http' or 'https', and one of
+      'ssl_crypto.conf.SUPPORTED_URI_SCHEMES'.
+
+    required_length:
+      An integer value representing the length of the file.  This is an exact
+      limit.
+
+    hash_algorithms:
+      An optional list of hash algorithms whose digests are computed as the
+      file is downloaded.  See 'ssl_crypto.util.TempFile.get_digest()'.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of the download, if it succeeds.
+
+  <Side Effects>
+    A 'ssl_crypto.util.TempFile' object is created on disk to store the
+    contents of 'url'.
+
+  <Exceptions>
+    ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed
+    vs expected lengths while downloading the file.
+
+    ssl_crypto.FormatError, if any of the arguments are improperly formatted.
+
+    Any other unforeseen runtime exception.
+
+  <Returns>
+    A 'ssl_crypto.util.TempFile' file-like object that points to the contents
+    of 'url'.
+  """
+
+  _check_download_arguments(url, required_length)
+
+  return await _download_file(url, required_length,
+                              STRICT_REQUIRED_LENGTH=True,
+                              hash_algorithms=hash_algorithms,
+                              mirror_scoreboard=mirror_scoreboard)
+
+
+
+
+
+async def unsafe_download(url, required_length, hash_algorithms=None,
+                          mirror_scoreboard=None, validators=None,
+                          compression=None):
+  """
+  <Purpose>
+    Given the 'url' and 'required_length' of the desired file, open a
+    connection to 'url', download it, and return the contents of the file.
+    Also ensure the length of the downloaded file is up to 'required_length',
+    and no larger.  See 'ssl_crypto.download.unsafe_download()'.
+
+  <Arguments>
+    url:
+      A URL string that represents the location of the file.  The URI scheme
+      component must be 'http' or 'https', and one of
+      'ssl_crypto.conf.SUPPORTED_URI_SCHEMES'.
+
+    required_length:
+      An integer value representing the length of the file.  This is an upper
+      limit.
+
+    hash_algorithms:
+      An optional list of hash algorithms whose digests are computed as the
+      file is downloaded.  See 'ssl_crypto.util.TempFile.get_digest()'.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of the download, if it succeeds.
+
+    validators:
+      An optional dict of the validators of the copy of the file last
+      downloaded from 'url'.  See 'ssl_crypto.download.unsafe_download()'.
+
+    compression:
+      The compression algorithm (e.g., 'gzip') of the file, which is
+      decompressed as it is downloaded, or None.  See
+      'ssl_crypto.download.unsafe_download()'.
+
+  <Side Effects>
+    A 'ssl_crypto.util.TempFile' object is created on disk to store the
+    contents of 'url'.
+
+  <Exceptions>
+    ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed
+    vs expected lengths while downloading the file.
+
+    ssl_crypto.NotModifiedError, if 'validators' is given and the server
+    responds that the file has not changed.
+
+    ssl_crypto.FormatError, if any of the arguments are improperly formatted.
+
+    Any other unforeseen runtime exception.
+
+  <Returns>
+    A 'ssl_crypto.util.TempFile' file-like object that points to the contents
+    of 'url'.
+  """
+
+  _check_download_arguments(url, required_length)
+
+  if validators is not None:
+    ssl_crypto.formats.VALIDATORS_SCHEMA.check_match(validators)
+
+  if compression is not None:
+    ssl_crypto.formats.NAME_SCHEMA.check_match(compression)
+
+  return await _download_file(url, required_length,
+                              STRICT_REQUIRED_LENGTH=False,
+                              hash_algorithms=hash_algorithms,
+                              mirror_scoreboard=mirror_scoreboard,
+                              validators=validators, compression=compression)
+
+
+
+
+
+def _check_download_arguments(url, required_length):
+  """
+  <Purpose>
+    Ensure the arguments of safe_download() and unsafe_download() have the
+    appropriate format, and that 'url' specifies a supported URI scheme.
+
+  <Arguments>
+    url:
+      A URL string.
+
+    required_length:
+      An integer value representing the length of the file.
+
+  <Side Effects>
+    None.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if any of the arguments are improperly formatted,
+    or if 'url' specifies an unsupported URI scheme.
+
+  <Returns>
+    None.
+  """
+
+  # Do all of the arguments have the appropriate format?
+  # Raise 'ssl_crypto.FormatError' if there is a mismatch.
+  ssl_crypto.formats.URL_SCHEMA.check_match(url)
+  ssl_crypto.formats.LENGTH_SCHEMA.check_match(required_length)
+
+  # Ensure 'url' specifies one of the URI schemes in
+  # 'ssl_crypto.conf.SUPPORTED_URI_SCHEMES' that this module can request.
+  parsed_url = six.moves.urllib.parse.urlparse(url)
+
+  if parsed_url.scheme not in ssl_crypto.conf.SUPPORTED_URI_SCHEMES or \
+     parsed_url.scheme not in _DEFAULT_PORTS:
+    message = \
+      repr(url) + ' specifies an unsupported URI scheme.  Supported ' + \
+      ' URI Schemes: ' + repr(sorted(_DEFAULT_PORTS))
+    raise ssl_crypto.FormatError(message)
+
+
+
+
+
+async def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True,
+                         hash_algorithms=None, mirror_scoreboard=None,
+                         validators=None, compression=None):
+  """
+  <Purpose>
+    Given the url and length of the desired file, this coroutine opens a
+    connection to 'url' and downloads the file while ensuring its length
+    matches 'required_length'.  The checks are those of
+    'ssl_crypto.download._download_file()'.
+
+  <Arguments>
+    url:
+      A URL string that represents the location of the file.
+
+    required_length:
+      An integer value representing the length of the file.
+
+    STRICT_REQUIRED_LENGTH:
+      A Boolean indicator used to signal whether we should perform strict
+      checking of required_length, or treat it as an upper limit.
+
+    hash_algorithms:
+      An optional list of hash algorithms whose digests are updated with each
+      chunk as it is downloaded.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of a successful download.
+
+    validators:
+      An optional dict of the validators of the copy of the file last
+      downloaded, updated with those of the downloaded file.
+
+    compression:
+      The compression algorithm of the file, which is decompressed as it is
+      downloaded, or None.
+
+  <Side Effects>
+    A 'ssl_crypto.util.TempFile' object is created on disk to store the
+    contents of 'url'.
+
+  <Exceptions>
+    ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed
+    vs expected lengths while downloading the file.
+
+    ssl_crypto.NotModifiedError, if 'validators' is given and the file has
+    not changed.
+
+    Any other unforeseen runtime exception.
+
+  <Returns>
+    A 'ssl_crypto.util.TempFile' file-like object that points to the contents
+    of 'url'.
+  """
+
+  # 'url.replace()' is for compatibility with Windows-based systems because
+  # they might put back-slashes in place of forward-slashes.  This converts it
+  # to the common format.
+  url = url.replace('\\', '/')
+  logger.info('Downloading: '+str(url))
+
+  # This is the temporary file that we will return to contain the contents of
+  # the downloaded file.
+  temp_file = ssl_crypto.util.TempFile(hash_algorithms=hash_algorithms,
+    spool_size=ssl_crypto.conf.DOWNLOAD_SPOOL_SIZE)
+  response = None
+
+  # Only the decompressed data is written to disk.
+  if compression is not None:
+    temp_file.decompress_writes(compression,
+                                ssl_crypto.conf.MAX_DECOMPRESSED_LENGTH)
+
+  try:
+    request_time = timeit.default_timer()
+    response = await _open_connection(url, validators=validators)
+    response_time = timeit.default_timer()
+
+    # Reject a file reported to be larger than 'required_length' before any
+    # of its data is transferred.
+    ssl_crypto.download._check_content_length(response.content_length,
+                                              required_length,
+                                              STRICT_REQUIRED_LENGTH)
+
+    total_downloaded = \
+      await _download_fixed_amount_of_data(response, temp_file,
+                                           required_length)
+    temp_file.flush()
+
+    ssl_crypto.download._check_downloaded_length(total_downloaded,
+      required_length, STRICT_REQUIRED_LENGTH=STRICT_REQUIRED_LENGTH)
+
+    if validators is not None:
+      validators.clear()
+      validators.update(ssl_crypto.download._get_validators(response.headers))
+
+    if mirror_scoreboard is not None:
+      mirror_scoreboard.record_download(url, response_time - request_time,
+                                        total_downloaded,
+                                        timeit.default_timer() - response_time)
+
+  # The file is unchanged, and was not downloaded.
+  except ssl_crypto.NotModifiedError:
+    temp_file.close_temp_file()
+    logger.info('Not modified: ' + str(url))
+    raise
+
+  # The download may also be cancelled by the event loop.  Any written data is
+  # lost.
+  except BaseException:
+    temp_file.close_temp_file()
+    logger.exception('Could not download URL: '+str(url))
+    raise
+
+  finally:
+    if response is not None:
+      response.close()
+
+  return temp_file
+
+
+
+
+
+async def _download_fixed_amount_of_data(response, temp_file,
+                                         required_length):
+  """
+  <Purpose>
+    This is a helper coroutine, where the download really happens.  It reads
+    data from 'response' a chunk of data at a time, or less, until
+    'required_length' is reached.  The chunks grow while the server fills
+    every read, and slow retrieval attacks are defended against, exactly as in
+    'ssl_crypto.download._download_fixed_amount_of_data()'.
+
+  <Arguments>
+    response:
+      The '_AsyncResponse' returned by _open_connection().
+
+    temp_file:
+      A temporary file where the contents of the response will be stored.
+
+    required_length:
+      The number of bytes that we must download for the file.
+
+  <Side Effects>
+    Data from the server will be written to 'temp_file'.
+
+  <Exceptions>
+    Runtime or network exceptions, other than timeouts, will be raised
+    without question.
+
+  <Returns>
+    The total number of bytes downloaded for the desired file.
+  """
+
+  # Tolerate servers with a slow start by ignoring their delivery speed for
+  # 'ssl_crypto.conf.SLOW_START_GRACE_PERIOD' seconds.
+  grace_period = -ssl_crypto.conf.SLOW_START_GRACE_PERIOD
+
+  # Keep track of total bytes downloaded.
+  number_of_bytes_received = 0
+
+  # The number of bytes received by filled reads since the download speed was
+  # last checked.
+  number_of_bytes_unchecked = 0
+
+  # A read returns the data received so far, up to 'read_amount' bytes.
+  chunk_size = ssl_crypto.conf.CHUNK_SIZE
+  max_chunk_size = max(ssl_crypto.conf.MAX_CHUNK_SIZE, chunk_size)
+
+  start_time = timeit.default_timer()
+
+  while number_of_bytes_received < required_length:
+    read_amount = min(chunk_size,
+                      required_length - number_of_bytes_received)
+    data = b''
+
+    try:
+      data = await asyncio.wait_for(response.read(read_amount),
+                                    ssl_crypto.conf.SOCKET_TIMEOUT)
+
+    # A read that timed out is retried during the slow start grace period.
+    except asyncio.TimeoutError:
+      pass
+
+    else:
+      # The server has no more data to send.
+      if not data:
+        break
+
+    number_of_bytes_received = number_of_bytes_received + len(data)
+    temp_file.write(data, auto_flush=False)
+
+    if number_of_bytes_received == required_length:
+      break
+
+    # The server keeps up with the reads, so read more at a time, and check
+    # its speed less often.
+    if len(data) == read_amount:
+      chunk_size = min(chunk_size * 2, max_chunk_size)
+      number_of_bytes_unchecked = number_of_bytes_unchecked + len(data)
+
+      if number_of_bytes_unchecked < \
+         ssl_crypto.conf.DOWNLOAD_SPEED_CHECK_INTERVAL:
+        continue
+
+    number_of_bytes_unchecked = 0
+
+    seconds_spent_receiving = timeit.default_timer() - start_time
+
+    if (seconds_spent_receiving + grace_period) < 0:
+      continue
+
+    # If the average download speed is below a certain threshold, we flag
+    # this as a possible slow-retrieval attack.
+    average_download_speed = number_of_bytes_received / seconds_spent_receiving
+
+    if average_download_speed < ssl_crypto.conf.MIN_AVERAGE_DOWNLOAD_SPEED:
+      break
+
+    # A read timed out after the grace period.
+    if not data:
+      break
+
+  logger.debug('Downloaded '+str(number_of_bytes_received)+'/'+ \
+               str(required_length)+' bytes.')
+
+  return number_of_bytes_received
+
+
+
+
+
+async def _open_connection(url, redirections_left=_MAX_REDIRECTIONS,
+                           validators=None):
+  """
+  <Purpose>
+    Helper coroutine that requests 'url' over a new connection, and reads the
+    status line and headers of the response.  Redirections are followed.
+
+  <Arguments>
+    url:
+      An 'http' or 'https' URL string.
+
+    redirections_left:
+      The number of redirections that may still be followed.
+
+    validators:
+      If given, a dict of the validators of the copy of 'url' last downloaded,
+      sent in the 'If-None-Match' and 'If-Modified-Since' headers.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if a redirection points to an unsupported URI
+    scheme.
+
+    ssl_crypto.NotModifiedError, if 'validators' is given and the server
+    responds with a 304 (Not Modified) status.
+
+    six.moves.urllib.error.HTTPError, if the server responds with a status
+    other than 200.
+
+    ssl_crypto.DownloadError, if the response is not valid HTTP/1.x.
+
+    asyncio.TimeoutError, if the server does not respond within
+    'ssl_crypto.conf.SOCKET_TIMEOUT' seconds.
+
+  <Side Effects>
+    Opens a connection to a remote server.
+
+  <Returns>
+    An '_AsyncResponse' object.  The caller must close it.
+  """
+
+  parsed_url = six.moves.urllib.parse.urlparse(url)
+  port = parsed_url.port or _DEFAULT_PORTS[parsed_url.scheme]
+
+  ssl_context = None
+  if parsed_url.scheme == 'https':
+    ssl_context = ssl.create_default_context(
+      cafile=ssl_crypto.conf.ssl_certificates)
+
+  reader, writer = await asyncio.wait_for(
+    asyncio.open_connection(parsed_url.hostname, port, ssl=ssl_context),
+    ssl_crypto.conf.SOCKET_TIMEOUT)
+
+  try:
+    # Request the path (and query) of 'url'.  Fragments are never sent to the
+    # server.  The 'Accept-Encoding' header protects against "creative"
+    # interpretation of the RFC (see 'ssl_crypto.download._get_request()').
+    request_path = parsed_url.path or '/'
+    if parsed_url.query:
+      request_path = request_path + '?' + parsed_url.query
+
+    request = 'GET ' + request_path + ' HTTP/1.1\r\n' + \
+      'Host: ' + parsed_url.netloc + '\r\n' + \
+      'Accept-Encoding: identity\r\n'
+
+    # Request the file only if it has changed.
+    if validators:
+      if 'etag' in validators:
+        request = request + 'If-None-Match: ' + validators['etag'] + '\r\n'
+
+      if 'last_modified' in validators:
+        request = request + 'If-Modified-Since: ' + \
+          validators['last_modified'] + '\r\n'
+
+    request = request + 'Connection: close\r\n\r\n'
+    writer.write(request.encode('ascii'))
+
+    status, reason, headers = \
+      await asyncio.wait_for(_read_response_head(reader),
+                             ssl_crypto.conf.SOCKET_TIMEOUT)
+
+  except BaseException:
+    writer.close()
+    raise
+
+  response = _AsyncResponse(reader, writer, headers)
+
+  if status in _REDIRECT_STATUS_CODES and 'location' in headers and \
+     redirections_left > 0:
+    response.close()
+    redirected_url = six.moves.urllib.parse.urljoin(url, headers['location'])
+    logger.debug('Redirected from ' + repr(url) + ' to ' + repr(redirected_url))
+
+    if six.moves.urllib.parse.urlparse(redirected_url).scheme not in \
+       _DEFAULT_PORTS:
+      message = 'Redirected to an unsupported URI scheme: ' + \
+        repr(redirected_url)
+      raise ssl_crypto.FormatError(message)
+
+    return await _open_connection(redirected_url, redirections_left - 1,
+                                  validators)
+
+  if status == 304 and validators:
+    response.close()
+    raise ssl_crypto.NotModifiedError(repr(url) + ' has not changed.')
+
+  if status != 200:
+    response.close()
+    raise six.moves.urllib.error.HTTPError(url, status, reason, headers, None)
+
+  return response
+
+
+
+
+
+async def _read_response_head(reader):
+  """
+  <Purpose>
+    Helper coroutine that reads the status line and headers of an HTTP/1.x
+    response.
+
+  <Arguments>
+    reader:
+      The 'asyncio.StreamReader' of the connection.
+
+  <Exceptions>
+    ssl_crypto.DownloadError, if the response is not valid HTTP/1.x.
+
+  <Side Effects>
+    Reads from 'reader'.
+
+  <Returns>
+    A (status, reason, headers) tuple.  'headers' is a dict of lowercase
+    header names to values.
+  """
+
+  status_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+
+  try:
+    version, status, reason = (status_line.split(' ', 2) + [''])[:3]
+    status = int(status, 10)
+
+  except ValueError:
+    raise ssl_crypto.DownloadError('Invalid status line: ' + repr(status_line))
+
+  if not version.startswith('HTTP/1.'):
+    raise ssl_crypto.DownloadError('Invalid status line: ' + repr(status_line))
+
+  headers = {}
+  for header_line_number in range(_MAX_HEADER_LINES):
+    header_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+
+    if not header_line:
+      return status, reason, headers
+
+    name, separator, value = header_line.partition(':')
+    headers[name.strip().lower()] = value.strip()
+
+  raise ssl_crypto.DownloadError('Too many header lines in the response.')
+
+
+
+
+
+class _AsyncResponse(object):
+  """
+  The body of an HTTP/1.x response, read with the coroutine read().  Bodies
+  delimited by their 'Content-Length', by chunked transfer encoding, or by the
+  end of the connection are supported.
+  """
+
+  def __init__(self, reader, writer, headers):
+    self._reader = reader
+    self._writer = writer
+    self.headers = headers
+
+    self._chunked = \
+      headers.get('transfer-encoding', '').lower() == 'chunked'
+
+    # The length of the body, or None if it is unknown.
+    self.content_length = None
+    if not self._chunked:
+      try:
+        self.content_length = int(headers['content-length'], 10)
+        assert self.content_length > -1
+
+      except (KeyError, ValueError, AssertionError):
+        logger.debug('The server did not report a valid content length.')
+        self.content_length = None
+
+    # The number of bytes left in the body (or in the current chunk, if the
+    # body is chunked).
+    self._bytes_left = self.content_length
+    if self._chunked:
+      self._bytes_left = 0
+
+    # True if the data of the current chunk was read, but not the CRLF that
+    # follows it.
+    self._chunk_end_pending = False
+
+    self._end_of_body = self.content_length == 0
+
+
+  async def read(self, amount):
+    # read() runs under 'asyncio.wait_for()', so it may be cancelled at any
+    # await.  The state of the body is therefore updated right after each
+    # read from the stream, and no data is read from it after the data
+    # returned, so that a cancelled read() loses nothing and may be retried.
+    if self._end_of_body:
+      return b''
+
+    if self._chunked and self._bytes_left == 0:
+      if self._chunk_end_pending:
+        await self._read_chunk_end()
+
+      await self._read_chunk_size()
+      if self._end_of_body:
+        return b''
+
+    if self._bytes_left is not None:
+      amount = min(amount, self._bytes_left)
+
+    data = await self._reader.read(amount)
+
+    if self._bytes_left is not None:
+      self._bytes_left = self._bytes_left - len(data)
+
+      # The chunk data is followed by CRLF, read by the next call.
+      if self._chunked and self._bytes_left == 0:
+        self._chunk_end_pending = True
+
+    if not data or self._bytes_left == 0 and not self._chunked:
+      self._end_of_body = True
+
+    return data
+
+
+  async def _read_chunk_end(self):
+    chunk_end_line = await self._reader.readline()
+    self._chunk_end_pending = False
+
+    if chunk_end_line.strip():
+      raise ssl_crypto.DownloadError('Invalid chunk data: ' +
+                                     repr(chunk_end_line))
+
+
+  async def _read_chunk_size(self):
+    chunk_size_line = (await self._reader.readline()).decode('latin-1')
+
+    try:
+      # Chunk extensions follow a ';'.
+      self._bytes_left = int(chunk_size_line.split(';', 1)[0].strip(), 16)
+
+    except ValueError:
+      raise ssl_crypto.DownloadError('Invalid chunk size: ' +
+                                     repr(chunk_size_line))
+
+    # The last chunk has a size of zero, and is followed by optional trailer
+    # lines and an empty line.
+    if self._bytes_left == 0:
+      self._end_of_body = True
+      for trailer_line_number in range(_MAX_HEADER_LINES):
+        if not (await self._reader.readline()).strip():
+          break
+
+
+  def close(self):
+    self._writer.close()
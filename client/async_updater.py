@@ -0,0 +1,873 @@
+"""
+<Program Name>
+  async_updater.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  'async_updater.py' provides 'AsyncUpdater', an asyncio interface to
+  'tuf.client.updater.Updater'.  Its refresh(), target(), and
+  download_target() methods are coroutines that transfer metadata and target
+  files with 'tuf.async_download', so that a single event loop may update many
+  repositories, and download many targets, concurrently.
+
+  Downloaded files are verified and installed by the wrapped 'Updater', with
+  the same methods it uses for its own downloads; only the network transfers
+  differ.  The trusted metadata of a repository is updated by one coroutine
+  at a time, while target files are downloaded without restriction.
+
+  This module requires Python 3.5, or later.
+
+<Example Client>
+
+  import asyncio
+
+  import tuf.conf
+  import tuf.client.async_updater
+
+  tuf.conf.repository_directory = 'local-repository'
+
+  repository_mirrors = {'mirror1': {'url_prefix': 'http://localhost:8001',
+                                    'metadata_path': 'metadata',
+                                    'targets_path': 'targets',
+                                    'confined_target_dirs': ['']}}
+
+  async def update(updater, target_filepaths, destination_directory):
+    await updater.refresh()
+    targets = await asyncio.gather(*[updater.target(target_filepath)
+                                     for target_filepath in target_filepaths])
+    await asyncio.gather(*[updater.download_target(target,
+                                                   destination_directory)
+                           for target in targets])
+
+  updater = tuf.client.async_updater.AsyncUpdater('updater',
+                                                  repository_mirrors)
+  loop = asyncio.get_event_loop()
+  loop.run_until_complete(update(updater, ['file1.txt', 'file2.txt'], '.'))
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import asyncio
+import logging
+
+import tuf
+import tuf.async_download
+import tuf.client.updater
+import tuf.conf
+import tuf.formats
+import tuf.mirrors
+
+import six
+
+# See 'log.py' to learn how logging is handled in TUF.
+logger = logging.getLogger('tuf.client.async_updater')
+
+
+class AsyncUpdater(object):
+  """
+  <Purpose>
+    Provide a class that can download target files securely from an asyncio
+    event loop.  The trusted metadata, mirrors, and mirror scoreboard are
+    those of a wrapped 'tuf.client.updater.Updater'.
+
+  <Updater Attributes>
+    self.updater:
+      The 'tuf.client.updater.Updater' that holds the trusted metadata, and
+      verifies and installs the downloaded files.  Its blocking methods (e.g.,
+      all_targets(), updated_targets()) remain available, but should not be
+      called from the event loop while a coroutine of this object runs.
+
+  <Updater Methods>
+    refresh():
+      A coroutine that updates the metadata of the top-level roles, like
+      'tuf.client.updater.Updater.refresh()'.
+
+    target(file_path):
+      A coroutine that returns the target information for a specific file
+      identified by its file path, like 'tuf.client.updater.Updater.target()'.
+
+    download_target(target, destination_directory):
+      A coroutine that downloads, verifies, and saves a target, like
+      'tuf.client.updater.Updater.download_target()'.
+  """
+
+  def __init__(self, updater_name, repository_mirrors):
+    """
+    <Purpose>
+      Constructor.  The trusted metadata of the repository is loaded from disk
+      by a 'tuf.client.updater.Updater'.
+
+    <Arguments>
+      updater_name:
+        The name of the updater.
+
+      repository_mirrors:
+        A dictionary holding repository mirror information, conformant to
+        'tuf.formats.MIRRORDICT_SCHEMA'.
+
+    <Exceptions>
+      See 'tuf.client.updater.Updater.__init__()'.
+
+    <Side Effects>
+      The metadata files for the top-level roles are read from disk and
+      stored in dictionaries.
+
+    <Returns>
+      None.
+    """
+
+    self.updater = tuf.client.updater.Updater(updater_name, repository_mirrors)
+
+    # Serializes the coroutines that update the trusted metadata.  The lock is
+    # created by the first of them, in the event loop that runs it.
+    self._metadata_lock = None
+
+
+
+
+
+  def __str__(self):
+    """
+      The string representation of an AsyncUpdater object.
+    """
+
+    return str(self.updater)
+
+
+
+
+
+  def _get_metadata_lock(self):
+    """
+    <Purpose>
+      Return the 'asyncio.Lock' that serializes updates of the trusted
+      metadata, creating it if necessary.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      Creates 'self._metadata_lock' on the first call.
+
+    <Returns>
+      An 'asyncio.Lock' object.
+    """
+
+    if self._metadata_lock is None:
+      self._metadata_lock = asyncio.Lock()
+
+    return self._metadata_lock
+
+
+
+
+
+  async def refresh(self, unsafely_update_root_if_necessary=True):
+    """
+    <Purpose>
+      Update the latest copies of the metadata for the top-level roles, in
+      the order timestamp -> snapshot -> root (if necessary) -> targets.  See
+      'tuf.client.updater.Updater.refresh()'.
+
+    <Arguments>
+      unsafely_update_root_if_necessary:
+        Boolean that indicates whether to unsafely update the Root metadata if
+        any of the top-level metadata cannot be downloaded successfully.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        If the metadata for any of the top-level roles cannot be updated.
+
+      tuf.ExpiredMetadataError:
+        If any of the top-level metadata is expired.
+
+    <Side Effects>
+      Updates the metadata files of the top-level roles with the latest
+      information.  The mirror scoreboard is saved, if
+      'tuf.conf.PERSIST_MIRROR_SCOREBOARD' is True.
+
+    <Returns>
+      None.
+    """
+
+    # Does 'unsafely_update_root_if_necessary' have the correct format?
+    # Raise 'tuf.FormatError' if there is a mismatch.
+    tuf.formats.BOOLEAN_SCHEMA.check_match(unsafely_update_root_if_necessary)
+
+    async with self._get_metadata_lock():
+      await self._refresh(unsafely_update_root_if_necessary)
+
+
+
+
+
+  async def _refresh(self, unsafely_update_root_if_necessary):
+    """
+    <Purpose>
+      The body of refresh(), called with the metadata lock held.
+
+    <Arguments>
+      unsafely_update_root_if_necessary:
+        Boolean that indicates whether to unsafely update the Root metadata if
+        any of the top-level metadata cannot be downloaded successfully.
+
+    <Exceptions>
+      See refresh().
+
+    <Side Effects>
+      See refresh().
+
+    <Returns>
+      None.
+    """
+
+    DEFAULT_TIMESTAMP_UPPERLENGTH = tuf.conf.DEFAULT_TIMESTAMP_REQUIRED_LENGTH
+    DEFAULT_ROOT_UPPERLENGTH = tuf.conf.DEFAULT_ROOT_REQUIRED_LENGTH
+
+    # Update an expired Root role first, if allowed.  See
+    # 'tuf.client.updater.Updater.refresh()'.
+    root_metadata = self.updater.metadata['current']['root']
+
+    try:
+      self.updater._ensure_not_expired(root_metadata, 'root')
+
+    except tuf.ExpiredMetadataError:
+      if unsafely_update_root_if_necessary:
+        message = 'Expired Root metadata was loaded from disk.  ' + \
+          'Try to update it now.'
+        logger.info(message)
+        await self._update_metadata('root', DEFAULT_ROOT_UPPERLENGTH)
+
+      else:
+        raise
+
+    try:
+      await self._update_metadata('timestamp', DEFAULT_TIMESTAMP_UPPERLENGTH)
+      await self._update_metadata_if_changed('snapshot',
+                                             referenced_metadata='timestamp')
+      await self._update_metadata_if_changed('root')
+      await self._update_metadata_if_changed('targets')
+
+    except (tuf.NoWorkingMirrorError, tuf.ExpiredMetadataError):
+      if unsafely_update_root_if_necessary:
+        message = 'Valid top-level metadata cannot be downloaded.  Unsafely ' + \
+          'update the Root metadata.'
+        logger.info(message)
+
+        await self._update_metadata('root', DEFAULT_ROOT_UPPERLENGTH)
+        await self._refresh(unsafely_update_root_if_necessary=False)
+
+      else:
+        raise
+
+    else:
+      self.updater._save_parsed_metadata_cache()
+      self.updater._discard_untrusted_partial_target_files()
+
+    finally:
+      self.updater._save_mirror_scoreboard()
+
+
+
+
+
+  async def _update_metadata(self, metadata_role, upperbound_filelength,
+                             version=None, compression_algorithm=None):
+    """
+    <Purpose>
+      Download, verify, and install the metadata file of 'metadata_role'.
+      See 'tuf.client.updater.Updater._update_metadata()'.
+
+    <Arguments>
+      metadata_role:
+        The name of the metadata.  This is a role name and should not end
+        in '.json'.  Examples: 'root', 'targets', 'targets/linux/x86'.
+
+      upperbound_filelength:
+        The expected length, or upper bound, of the metadata file to be
+        downloaded.
+
+      version:
+        The expected and required version number of the 'metadata_role' file
+        downloaded.
+
+      compression_algorithm:
+        A string designating the compression type of 'metadata_role'.  'gzip'
+        is the only compression algorithm currently supported.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The metadata cannot be updated.
+
+      tuf.ExpiredMetadataError:
+        The mirror reported that the trusted 'timestamp' metadata has not
+        changed, and it has expired.
+
+    <Side Effects>
+      The metadata file belonging to 'metadata_role' is downloaded from a
+      repository mirror and installed.
+
+    <Returns>
+      None.
+    """
+
+    metadata_filename = metadata_role + '.json'
+
+    if compression_algorithm == 'gzip':
+      metadata_filename = metadata_filename + '.gz'
+
+    remote_filename = \
+      self.updater._get_remote_metadata_filename(metadata_filename, version)
+
+    try:
+      metadata_file_object = \
+        await self._get_metadata_file(metadata_role, remote_filename,
+                                      upperbound_filelength, version,
+                                      compression_algorithm)
+
+    # The trusted metadata is unchanged on the mirror, but it must not have
+    # expired.
+    except tuf.NotModifiedError:
+      logger.info(repr(metadata_role) + ' has not changed.')
+      self.updater._ensure_not_expired(
+        self.updater.metadata['current'][metadata_role], metadata_role)
+      return
+
+    self.updater._install_metadata_file(metadata_role, metadata_file_object,
+                                        compression_algorithm)
+
+
+
+
+
+  async def _get_metadata_file(self, metadata_role, remote_filename,
+                               upperbound_filelength, expected_version,
+                               compression_algorithm):
+    """
+    <Purpose>
+      Try each mirror, best first, until a valid metadata file of
+      'metadata_role' is downloaded.  See
+      'tuf.client.updater.Updater._get_metadata_file()'.
+
+    <Arguments>
+      metadata_role:
+        The role name of the metadata (e.g., 'root', 'targets',
+        'targets/linux/x86').
+
+      remote_filename:
+        The relative file path (on the remote repository) of 'metadata_role'.
+
+      upperbound_filelength:
+        The expected length, or upper bound, of the metadata file.
+
+      expected_version:
+        The expected and required version number of the file, or None.
+
+      compression_algorithm:
+        The name of the compression algorithm (e.g., 'gzip'), or None.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The metadata could not be fetched.
+
+      tuf.NotModifiedError:
+        A mirror reported that the trusted metadata has not changed.
+
+    <Side Effects>
+      The failures and successful downloads are recorded in the mirror
+      scoreboard.
+
+    <Returns>
+      A 'tuf.util.TempFile' file-like object containing the metadata.
+    """
+
+    # Use the copy downloaded by _prefetch_metadata(), if it is valid.
+    file_object = \
+      self.updater._get_prefetched_metadata_file(metadata_role, remote_filename,
+                                                 expected_version,
+                                                 compression_algorithm)
+    if file_object is not None:
+      return file_object
+
+    file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', remote_filename,
+      self.updater.mirrors, self.updater.mirror_scoreboard)
+
+    # file_mirror (URL): error (Exception)
+    file_mirror_errors = {}
+
+    for file_mirror in file_mirrors:
+      validators = self.updater._get_conditional_request_validators(
+        metadata_role, expected_version, file_mirror)
+
+      try:
+        file_object = await tuf.async_download.unsafe_download(file_mirror,
+          upperbound_filelength,
+          mirror_scoreboard=self.updater.mirror_scoreboard,
+          validators=validators, compression=compression_algorithm)
+
+        if validators is not None:
+          self.updater._check_metadata_file_changed(file_object, metadata_role,
+                                                    file_mirror, validators)
+
+        self.updater._verify_downloaded_metadata_file(file_object,
+          metadata_role, expected_version, compression_algorithm)
+
+      # The mirror did not fail.
+      except tuf.NotModifiedError:
+        raise
+
+      except Exception as exception:
+        # Remember the error from this mirror, and try the next one.
+        logger.exception('Update failed from ' + file_mirror + '.')
+        file_mirror_errors[file_mirror] = exception
+        self.updater.mirror_scoreboard.record_failure(file_mirror)
+
+      else:
+        if validators is not None:
+          self.updater._metadata_validators[file_mirror] = validators
+
+        return file_object
+
+    logger.error('Failed to update {0} from all mirrors: {1}'.format(
+                 remote_filename, file_mirror_errors))
+    raise tuf.NoWorkingMirrorError(file_mirror_errors)
+
+
+
+
+
+  async def _update_metadata_if_changed(self, metadata_role,
+                                        referenced_metadata='snapshot'):
+    """
+    <Purpose>
+      Update the metadata of 'metadata_role' if 'referenced_metadata' lists a
+      newer version of it.  See
+      'tuf.client.updater.Updater._update_metadata_if_changed()'.
+
+    <Arguments>
+      metadata_role:
+        The name of the metadata role.
+
+      referenced_metadata:
+        The name of the metadata role that lists the version of
+        'metadata_role'.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        If 'metadata_role' could not be downloaded after determining that it
+        had changed.
+
+      tuf.RepositoryError:
+        If the referenced metadata is missing.
+
+    <Side Effects>
+      If it is determined that 'metadata_role' has been updated, the metadata
+      store (i.e., self.updater.metadata) is updated with the new metadata,
+      and the affected stores modified (i.e., the previous metadata store is
+      updated).  If the metadata is 'targets' or a delegated targets role,
+      the role database is updated with the new information, including its
+      delegated roles.
+
+    <Returns>
+      None.
+    """
+
+    update_arguments = \
+      self.updater._get_metadata_update_arguments(metadata_role,
+                                                  referenced_metadata)
+
+    if update_arguments is None:
+      return
+
+    try:
+      await self._update_metadata(metadata_role, *update_arguments)
+
+    except:
+      # The current metadata we have is not current but we couldn't get new
+      # metadata.  We shouldn't use the old metadata anymore.
+      self.updater._delete_metadata(metadata_role)
+      logger.error('Metadata for ' + repr(metadata_role) + ' cannot be updated.')
+      raise
+
+    else:
+      self.updater._reimport_delegations(metadata_role)
+
+
+
+
+
+  async def _refresh_targets_metadata(self, rolename='targets',
+                                      include_delegations=False):
+    """
+    <Purpose>
+      Refresh the targets metadata of 'rolename'.  See
+      'tuf.client.updater.Updater._refresh_targets_metadata()'.
+
+    <Arguments>
+      rolename:
+        The name of the targets role whose metadata is refreshed.
+
+      include_delegations:
+        Boolean indicating if the delegated roles of 'rolename' should also
+        be refreshed.
+
+    <Exceptions>
+      tuf.RepositoryError:
+        If the metadata file for the 'targets' role is missing from the
+        'snapshot' metadata.
+
+    <Side Effects>
+      The metadata for the delegated roles are loaded and updated if they
+      have changed.
+
+    <Returns>
+      None.
+    """
+
+    roles_to_update = \
+      self.updater._get_targets_roles_to_refresh(rolename, include_delegations)
+
+    # Download the changed metadata of the roles concurrently.  It is still
+    # verified one role at a time below, parent roles first.
+    await self._prefetch_metadata(roles_to_update)
+
+    # The current metadata of most roles was already loaded by
+    # _prefetch_metadata(), and is not parsed again.
+    try:
+      for rolename in roles_to_update:
+        self.updater._load_metadata_from_file('previous', rolename)
+
+        if rolename not in self.updater.metadata['current']:
+          self.updater._load_metadata_from_file('current', rolename)
+
+        await self._update_metadata_if_changed(rolename)
+
+    finally:
+      self.updater._discard_prefetched_metadata()
+
+    if include_delegations:
+      self.updater._save_parsed_metadata_cache()
+
+
+
+
+
+  async def _prefetch_metadata(self, role_names):
+    """
+    <Purpose>
+      Concurrently download the changed metadata of the 'role_names' roles,
+      at most 'tuf.conf.MAX_CONCURRENT_DOWNLOADS' at a time.  See
+      'tuf.client.updater.Updater._prefetch_metadata()'.
+
+    <Arguments>
+      role_names:
+        A list of Targets role names, parent roles first.
+
+    <Exceptions>
+      None.  Failed downloads are logged, and retried by _get_metadata_file().
+
+    <Side Effects>
+      The downloaded files are stored until they are verified, or discarded.
+
+    <Returns>
+      None.
+    """
+
+    metadata_to_prefetch = self.updater._get_metadata_to_prefetch(role_names)
+
+    if len(metadata_to_prefetch) < 2:
+      return
+
+    logger.info('Prefetching ' + str(len(metadata_to_prefetch)) + \
+                ' metadata files.')
+
+    semaphore = asyncio.Semaphore(tuf.conf.MAX_CONCURRENT_DOWNLOADS)
+
+    async def prefetch_metadata_file(metadata_role, remote_filename,
+                                     upperbound_filelength):
+      file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', remote_filename,
+        self.updater.mirrors, self.updater.mirror_scoreboard)
+
+      # Compressed metadata is decompressed as it is downloaded.
+      compression = None
+      if remote_filename.endswith('.gz'):
+        compression = 'gzip'
+
+      async with semaphore:
+        for file_mirror in file_mirrors:
+          try:
+            file_object = await tuf.async_download.unsafe_download(file_mirror,
+              upperbound_filelength,
+              mirror_scoreboard=self.updater.mirror_scoreboard,
+              compression=compression)
+
+          except Exception:
+            logger.warning('Could not prefetch ' + repr(file_mirror) + '.')
+            self.updater.mirror_scoreboard.record_failure(file_mirror)
+
+          else:
+            self.updater._prefetched_metadata[remote_filename] = file_object
+            return
+
+    await asyncio.gather(*[prefetch_metadata_file(*metadata_to_download)
+                           for metadata_to_download in metadata_to_prefetch])
+
+
+
+
+
+  async def target(self, target_filepath):
+    """
+    <Purpose>
+      Return the target file information of 'target_filepath', and update its
+      corresponding metadata, if necessary.  See
+      'tuf.client.updater.Updater.target()'.
+
+    <Arguments>
+      target_filepath:
+        The path to the target file on the repository.  This will be relative
+        to the 'targets' (or equivalent) directory on a given mirror.
+
+    <Exceptions>
+      tuf.FormatError:
+        If 'target_filepath' is improperly formatted.
+
+      tuf.UnknownTargetError:
+        If 'target_filepath' was not found.
+
+      Any other unforeseen runtime exception.
+
+    <Side Effects>
+      The metadata for updated delegated roles are downloaded and stored.
+
+    <Returns>
+      The target information for 'target_filepath', conformant to
+      'tuf.formats.TARGETFILE_SCHEMA'.
+    """
+
+    # Does 'target_filepath' have the correct format?
+    # Raise 'tuf.FormatError' if there is a mismatch.
+    tuf.formats.RELPATH_SCHEMA.check_match(target_filepath)
+
+    # 'target_filepath' might contain URL encoding escapes.
+    target_filepath = six.moves.urllib.parse.unquote(target_filepath)
+
+    if not target_filepath.startswith('/'):
+      target_filepath = '/' + target_filepath
+
+    async with self._get_metadata_lock():
+      target = self.updater._get_cached_target(target_filepath)
+
+      if target is None:
+        visited_role_names = []
+        target = await self._preorder_depth_first_walk(target_filepath,
+                                                       visited_role_names)
+
+        if target is not None:
+          self.updater._cache_target(target_filepath, target,
+                                     visited_role_names)
+
+    if target is None:
+      message = target_filepath+' not found.'
+      logger.error(message)
+      raise tuf.UnknownTargetError(message)
+
+    return target
+
+
+
+
+
+  async def _preorder_depth_first_walk(self, target_filepath,
+                                       visited_role_names=None):
+    """
+    <Purpose>
+      Search the targets metadata of all roles, in order of delegation
+      priority, for 'target_filepath'.  See
+      'tuf.client.updater.Updater._preorder_depth_first_walk()'.
+
+    <Arguments>
+      target_filepath:
+        The path to the target file on the repository.
+
+      visited_role_names:
+        An optional list to which the name of each role searched is appended.
+
+    <Exceptions>
+      tuf.RepositoryError:
+        If 'targets.json' is missing from the snapshot metadata.
+
+    <Side Effects>
+      The metadata for updated delegated roles are downloaded and stored.
+
+    <Returns>
+      The target information for 'target_filepath', conformant to
+      'tuf.formats.TARGETFILE_SCHEMA', or None if it was not found.
+    """
+
+    target = None
+    role_names = ['targets']
+
+    # Compute the hash of 'target_filepath' once for the whole walk.
+    target_filepath_hash = self.updater._get_target_hash(target_filepath)
+
+    # Ensure the client has the most up-to-date version of 'targets.json'.
+    await self._update_metadata_if_changed('targets')
+
+    # Preorder depth-first traversal of the tree of target delegations.
+    while len(role_names) > 0 and target is None:
+      role_name = role_names.pop(-1)
+
+      # The metadata for 'role_name' must be downloaded/updated before
+      # its targets, delegations, and child roles can be inspected.
+      await self._refresh_targets_metadata(role_name,
+                                           include_delegations=False)
+
+      if visited_role_names is not None:
+        visited_role_names.append(role_name)
+
+      target = \
+        self.updater._search_targets_role(role_name, target_filepath,
+                                          role_names, target_filepath_hash)
+
+    return target
+
+
+
+
+
+  async def download_target(self, target, destination_directory):
+    """
+    <Purpose>
+      Download 'target' and verify it is trusted.  See
+      'tuf.client.updater.Updater.download_target()'.
+
+      Targets are not downloaded under the metadata lock, so any number of
+      them may be downloaded concurrently.
+
+    <Arguments>
+      target:
+        The target to be downloaded.  Conformant to
+        'tuf.formats.TARGETFILE_SCHEMA'.
+
+      destination_directory:
+        The directory to save the downloaded target file.
+
+    <Exceptions>
+      tuf.FormatError:
+        If 'target' is not properly formatted.
+
+      tuf.NoWorkingMirrorError:
+        If a target could not be downloaded from any of the mirrors.
+
+    <Side Effects>
+      A target file is saved to the local system.
+
+    <Returns>
+      None.
+    """
+
+    # Do the arguments have the correct format?
+    # Raise 'tuf.FormatError' if the check fail.
+    tuf.formats.TARGETFILE_SCHEMA.check_match(target)
+    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+
+    target_filepath = target['filepath']
+    trusted_length = target['fileinfo']['length']
+    trusted_hashes = target['fileinfo']['hashes']
+
+    # A valid copy in the target store is cloned instead of downloaded.
+    if self.updater._copy_target_from_store(target_filepath, trusted_length,
+                                            trusted_hashes,
+                                            destination_directory):
+      self.updater._save_target_manifest()
+      return
+
+    target_file_object = await self._get_target_file(target_filepath,
+                                                     trusted_length,
+                                                     trusted_hashes)
+
+    self.updater._move_target_file(target_file_object, target_filepath,
+                                   destination_directory, trusted_hashes)
+    self.updater._save_target_manifest()
+
+
+
+
+
+  async def _get_target_file(self, target_filepath, file_length, file_hashes):
+    """
+    <Purpose>
+      Try each mirror, best first, until 'target_filepath' is downloaded with
+      the trusted length and hashes.
+
+    <Arguments>
+      target_filepath:
+        The relative target filepath obtained from TUF targets metadata.
+
+      file_length:
+        The expected compressed length of the target file.
+
+      file_hashes:
+        The expected hashes of the target file.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The target could not be fetched.
+
+    <Side Effects>
+      The failures and successful downloads are recorded in the mirror
+      scoreboard.
+
+    <Returns>
+      A 'tuf.util.TempFile' file-like object containing the target.
+    """
+
+    remote_filepath = \
+      self.updater._get_remote_target_filepath(target_filepath, file_hashes)
+
+    file_mirrors = tuf.mirrors.get_list_of_mirrors('target', remote_filepath,
+      self.updater.mirrors, self.updater.mirror_scoreboard)
+
+    # file_mirror (URL): error (Exception)
+    file_mirror_errors = {}
+
+    for file_mirror in file_mirrors:
+      file_object = None
+
+      try:
+        file_object = await tuf.async_download.safe_download(file_mirror,
+          file_length, hash_algorithms=list(file_hashes),
+          mirror_scoreboard=self.updater.mirror_scoreboard)
+
+        self.updater._verify_target_file(file_object, file_length,
+                                         file_hashes)
+
+      except Exception as exception:
+        logger.exception('Download failed from ' + file_mirror + '.')
+        file_mirror_errors[file_mirror] = exception
+        self.updater.mirror_scoreboard.record_failure(file_mirror)
+
+        if file_object is not None:
+          file_object.close_temp_file()
+
+      else:
+        return file_object
+
+    logger.error('Failed to download {0} from all mirrors: {1}'.format(
+                 remote_filepath, file_mirror_errors))
+    raise tuf.NoWorkingMirrorError(file_mirror_errors)
@@ -128,12 +128,16 @@ def update_client(repository_mirror):
   all_targets = updater.all_targets()
   updated_targets = updater.updated_targets(all_targets, destination_directory)
 
-  # Download each of these updated targets and save them locally.
+  # Download these updated targets concurrently and save them locally.
+  # Targets that fail with a download error are skipped, but any other error
+  # is raised.
+  download_results = updater.download_targets(updated_targets,
+                                              destination_directory)
   for target in updated_targets:
-    try: 
-      updater.download_target(target, destination_directory)
-    except tuf.DownloadError as e:
-      pass
+    download_error = download_results.get(target['filepath'])
+    if download_error is not None and \
+      not isinstance(download_error, tuf.DownloadError):
+      raise download_error
 
   # Remove any files from the destination directory that are no longer being
   # tracked.
@@ -107,13 +107,22 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
 import errno
+import functools
+import heapq
 import logging
+import marshal
 import os
 import shutil
+import sys
+import threading
 import time
+import timeit
 import random
 
+from multiprocessing.pool import ThreadPool
+
 import tuf
 import tuf.conf
 import tuf.download
@@ -138,6 +147,29 @@ logger = logging.getLogger('tuf.client.updater')
 iso8601_logger = logging.getLogger('iso8601')
 iso8601_logger.disabled = True
 
+# The version of the parsed metadata cache written by the updater (see
+# 'tuf.formats.PARSEDMETADATACACHE_SCHEMA').  Caches of other versions are
+# ignored.
+_PARSED_METADATA_CACHE_VERSION = 1
+
+
+
+def _hold_metadata_lock(method):
+  """
+  Decorate an Updater method so that it holds the updater's metadata lock
+  while it reads or updates the trusted metadata.  A refresh, including one
+  made in the background by start_auto_refresh(), thus appears atomic to the
+  other decorated methods.
+  """
+
+  @functools.wraps(method)
+  def wrapper(self, *args, **kwargs):
+    with self._metadata_lock:
+      return method(self, *args, **kwargs)
+
+  return wrapper
+
+
 
 class Updater(object):
   """
@@ -182,11 +214,25 @@ class Updater(object):
       the target methods (e.g., all_targets(), targets_of_role(), target()).
       The refresh() method should be called by the client before any target
       requests.
+
+    start_auto_refresh(interval):
+      Starts a daemon thread that refreshes the top-level metadata every
+      'interval' seconds.  The changed metadata is downloaded before the
+      trusted metadata is locked, and then updated at once, so that the target
+      methods are not held up by the download.
+
+    stop_auto_refresh():
+      Stops the thread started by start_auto_refresh().
     
     all_targets():
       Returns the target information for the 'targets' and delegated roles.
       Prior to extracting the target information, this method attempts a file
       download of all the target metadata that have changed.
+
+    iter_targets():
+      Like all_targets(), but a generator that yields the target information
+      role by role, and only updates the metadata of a role when the
+      iteration reaches it.
     
     targets_of_role('targets'):
       Returns the target information for the targets of a specified role.
@@ -207,6 +253,11 @@ class Updater(object):
       This method performs the actual download of the specified target.  The
       file is saved to the 'destination_directory' argument.
 
+    download_targets(targets, destination_directory):
+      Like download_target(), but downloads and verifies a list of targets
+      concurrently on a bounded pool of threads, and reports the result of
+      each download.
+
     remove_obsolete_targets(destination_directory):
       Any files located in 'destination_directory' that were previously
       served by the repository but have since been removed, can be deleted
@@ -288,6 +339,16 @@ class Updater(object):
     self.name = updater_name
     self.mirrors = repository_mirrors
 
+    # Held while the trusted metadata is read or updated by the public methods
+    # (see _hold_metadata_lock()).  It is reentrant, as refresh() may call
+    # itself.
+    self._metadata_lock = threading.RLock()
+
+    # The daemon thread started by start_auto_refresh(), and the event that
+    # stops it.
+    self._auto_refresh_thread = None
+    self._auto_refresh_stop_event = None
+
     # Store the trusted metadata read from disk.
     self.metadata = {}
     
@@ -310,6 +371,40 @@ class Updater(object):
     # determines if metadata and target files downloaded from remote
     # repositories include the digest.
     self.consistent_snapshot = False
+
+    # Store the partially downloaded target files that every mirror failed to
+    # complete, so that a later download of the same target resumes them.  The
+    # dict keys are (target filepath, length, hashes) tuples, and the dict
+    # values 'tuf.util.TempFile' objects, least recently failed first, for at
+    # most 'tuf.conf.MAX_PARTIAL_TARGET_FILES' targets.  The lock guards the
+    # dict against the concurrent downloads of download_targets().
+    self._partial_target_files = collections.OrderedDict()
+    self._partial_target_files_lock = threading.Lock()
+
+    # Store the delegations of each targets role compiled for target lookups
+    # (see _get_delegation_index()).  The dict values are (delegated roles,
+    # index) tuples; an index is rebuilt when the list of delegated roles in
+    # the role's current metadata is replaced.
+    self._delegation_indexes = {}
+
+    # Store the target information resolved by target(), least recently used
+    # first, for at most 'tuf.conf.MAX_CACHED_TARGETS' target paths.  The dict
+    # keys are target paths, and the dict values (target, role versions,
+    # expiration) tuples (see _cache_target()).
+    self._target_cache = collections.OrderedDict()
+
+    # Store the metadata files downloaded by _prefetch_metadata() until they
+    # are verified, in delegation order, by _get_metadata_file().  The dict
+    # keys are remote metadata filenames, and the dict values
+    # 'tuf.util.TempFile' objects.
+    self._prefetched_metadata = {}
+
+    # Store the validators (see 'tuf.formats.VALIDATORS_SCHEMA') of the copy
+    # of the timestamp metadata last accepted from each mirror, so that it is
+    # only downloaded again once it has changed (see
+    # _get_conditional_request_validators()).  The dict keys are the URLs of
+    # the file on the mirrors.
+    self._metadata_validators = {}
     
     # Ensure the repository metadata directory has been set.
     if tuf.conf.repository_directory is None:
@@ -337,6 +432,45 @@ class Updater(object):
       message = 'Missing ' + repr(previous_path) + '.  This path must exist.'
       raise tuf.RepositoryError(message)
     self.metadata_directory['previous'] = previous_path
+
+    # Keep the performance observed from each mirror host, so that mirrors
+    # are tried best-first.  It is saved in the client's metadata directory,
+    # if 'tuf.conf.PERSIST_MIRROR_SCOREBOARD' is True.
+    self.mirror_scoreboard = tuf.mirrors.MirrorScoreboard()
+    self._mirror_scoreboard_filepath = \
+      os.path.join(repository_directory, 'metadata', 'mirror_scoreboard.json')
+
+    if tuf.conf.PERSIST_MIRROR_SCOREBOARD:
+      self.mirror_scoreboard.load(self._mirror_scoreboard_filepath)
+
+    # Store the file properties and hashes of the local target files saved, or
+    # found unchanged, by the updater, so that updated_targets() need not
+    # rehash them.  The dict keys are absolute file paths, and the dict values
+    # conformant to 'tuf.formats.TARGETMANIFESTENTRY_SCHEMA'.  The manifest is
+    # loaded from the client's metadata directory when it is first needed.
+    self._target_manifest = None
+    self._target_manifest_changed = False
+    self._target_manifest_lock = threading.Lock()
+    self._target_manifest_filepath = \
+      os.path.join(repository_directory, 'metadata', 'target_manifest.json')
+
+    # Store a lock per SHA-256 digest of the targets being downloaded while
+    # 'tuf.conf.TARGET_STORE_DIRECTORY' is set, so that concurrent downloads
+    # of identical targets download them once (see _download_target()).
+    self._target_store_locks = {}
+    self._target_store_locks_lock = threading.Lock()
+
+    # Store the metadata files parsed from the client's metadata directory, if
+    # 'tuf.conf.USE_PARSED_METADATA_CACHE' is True, so that a file whose
+    # SHA-256 digest is unchanged is not parsed again.  The dict keys are
+    # metadata file paths relative to the metadata directory, and the dict
+    # values conformant to 'tuf.formats.PARSEDMETADATAENTRY_SCHEMA'.  The cache
+    # is loaded with the first metadata file, and saved after a successful
+    # refresh.
+    self._parsed_metadata_cache = None
+    self._parsed_metadata_cache_changed = False
+    self._parsed_metadata_cache_filepath = \
+      os.path.join(repository_directory, 'metadata', 'parsed_metadata.cache')
     
     # Load current and previous metadata.
     for metadata_set in ['current', 'previous']:
@@ -363,6 +497,221 @@ class Updater(object):
 
 
 
+  def _save_mirror_scoreboard(self):
+    """
+    <Purpose>
+      Non-public method that saves 'self.mirror_scoreboard' in the client's
+      metadata directory, if 'tuf.conf.PERSIST_MIRROR_SCOREBOARD' is True.  A
+      failure to save it is logged, but not raised, as the scoreboard only
+      affects the order in which mirrors are tried.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      Writes 'mirror_scoreboard.json' in the client's metadata directory.
+
+    <Returns>
+      None.
+    """
+
+    if not tuf.conf.PERSIST_MIRROR_SCOREBOARD:
+      return
+
+    try:
+      self.mirror_scoreboard.save(self._mirror_scoreboard_filepath)
+
+    except (IOError, OSError) as exception:
+      logger.warning('Could not save the mirror scoreboard: ' + str(exception))
+
+
+
+
+
+  def _get_target_manifest(self):
+    """
+    <Purpose>
+      Non-public method that returns the manifest of local target files,
+      loading it from the client's metadata directory on the first call.  A
+      missing or invalid manifest file is replaced by an empty manifest.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The manifest file may be read.
+
+    <Returns>
+      A dict conformant to 'tuf.formats.TARGETMANIFEST_SCHEMA'.
+    """
+
+    with self._target_manifest_lock:
+      if self._target_manifest is None:
+        self._target_manifest = {}
+
+        if os.path.exists(self._target_manifest_filepath):
+          try:
+            target_manifest = \
+              tuf.util.load_json_file(self._target_manifest_filepath)
+            tuf.formats.TARGETMANIFEST_SCHEMA.check_match(target_manifest)
+
+          except tuf.Error as exception:
+            logger.warning('Ignoring the target manifest in ' + \
+              repr(self._target_manifest_filepath) + ': ' + str(exception))
+
+          else:
+            self._target_manifest = target_manifest
+
+      return self._target_manifest
+
+
+
+
+
+  def _get_local_file_properties(self, filepath):
+    """
+    <Purpose>
+      Non-public method that returns the file properties of 'filepath' that
+      are recorded in the target manifest.
+
+    <Arguments>
+      filepath:
+        The path of a local file.
+
+    <Exceptions>
+      OSError, if 'filepath' cannot be accessed.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A dict with the 'length', 'mtime_ns', 'ctime_ns', and 'inode' of
+      'filepath'.
+    """
+
+    file_stat = os.stat(filepath)
+
+    # Python 2 does not provide the times in nanoseconds.
+    mtime_ns = getattr(file_stat, 'st_mtime_ns', None)
+    if mtime_ns is None:
+      mtime_ns = int(file_stat.st_mtime * 1000000000)
+
+    ctime_ns = getattr(file_stat, 'st_ctime_ns', None)
+    if ctime_ns is None:
+      ctime_ns = int(file_stat.st_ctime * 1000000000)
+
+    return {'length': file_stat.st_size, 'mtime_ns': mtime_ns,
+            'ctime_ns': ctime_ns, 'inode': file_stat.st_ino}
+
+
+
+
+
+  def _record_local_target_file(self, filepath, file_hashes,
+                                file_properties=None):
+    """
+    <Purpose>
+      Non-public method that records the hashes of the local target file
+      'filepath' in the target manifest, with its current file properties.
+      Nothing is recorded if 'tuf.conf.USE_TARGET_MANIFEST' is False, or if
+      'file_properties' is given and no longer matches the file.
+
+    <Arguments>
+      filepath:
+        The path of a local target file.
+
+      file_hashes:
+        The hashes of the contents of 'filepath', conformant to
+        'tuf.formats.HASHDICT_SCHEMA'.
+
+      file_properties:
+        The properties of 'filepath' (see _get_local_file_properties()) from
+        before its hashes were computed, or None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The target manifest is modified.  It is saved by
+      _save_target_manifest().
+
+    <Returns>
+      None.
+    """
+
+    if not tuf.conf.USE_TARGET_MANIFEST:
+      return
+
+    target_manifest = self._get_target_manifest()
+    filepath = os.path.abspath(filepath)
+
+    try:
+      current_file_properties = self._get_local_file_properties(filepath)
+
+    except OSError:
+      return
+
+    # The file was modified while it was hashed.
+    if file_properties is not None and \
+       file_properties != current_file_properties:
+      return
+
+    manifest_entry = current_file_properties
+    manifest_entry['hashes'] = dict(file_hashes)
+
+    with self._target_manifest_lock:
+      target_manifest[filepath] = manifest_entry
+      self._target_manifest_changed = True
+
+
+
+
+
+  def _save_target_manifest(self):
+    """
+    <Purpose>
+      Non-public method that saves the target manifest to the client's
+      metadata directory, if it has changed.  Errors are logged, not raised,
+      since the manifest only saves work.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The target manifest file is written.
+
+    <Returns>
+      None.
+    """
+
+    with self._target_manifest_lock:
+      if not self._target_manifest_changed:
+        return
+
+      file_object = tuf.util.TempFile()
+      file_object.write(tuf.util.json.dumps(self._target_manifest,
+                                            sort_keys=True).encode('utf-8'))
+      self._target_manifest_changed = False
+
+    try:
+      file_object.move(self._target_manifest_filepath)
+
+    except (IOError, OSError) as exception:
+      logger.warning('Could not save the target manifest: ' + str(exception))
+
+
+
+
+
   def _load_metadata_from_file(self, metadata_set, metadata_role):
     """
     <Purpose>
@@ -411,14 +760,10 @@ class Updater(object):
     
     # Ensure the metadata path is valid/exists, else ignore the call. 
     if os.path.exists(metadata_filepath):
-      # Load the file.  The loaded object should conform to
+      # Load the 'signed' role object of the file, which should conform to
       # 'tuf.formats.SIGNABLE_SCHEMA'.
-      metadata_signable = tuf.util.load_json_file(metadata_filepath)
-
-      tuf.formats.check_signable_object_format(metadata_signable)
-
-      # Extract the 'signed' role object from 'metadata_signable'.
-      metadata_object = metadata_signable['signed']
+      metadata_object = self._load_signed_metadata(metadata_set,
+                                                   metadata_filename)
    
       # Save the metadata object to the metadata store.
       self.metadata[metadata_set][metadata_role] = metadata_object
@@ -440,126 +785,407 @@ class Updater(object):
 
 
 
-  def _rebuild_key_and_role_db(self):
+  def _load_signed_metadata(self, metadata_set, metadata_filename):
     """
     <Purpose>
-      Non-public method that rebuilds the key and role databases from the
-      currently trusted 'root' metadata object extracted from 'root.json'.  This
-      private method is called when a new/updated 'root' metadata file is
-      loaded.  This method will only store the role information of the top-level
-      roles (i.e., 'root', 'targets', 'snapshot', 'timestamp').
+      Non-public method that returns the 'signed' object of the metadata file
+      'metadata_filename' in the 'metadata_set' directory.  If the SHA-256
+      digest of the file matches the one in the parsed metadata cache, the
+      cached object is returned.  Otherwise, the file is parsed, and cached.
 
     <Arguments>
-      None.
+      metadata_set:
+        The string 'current' or 'previous'.
+
+      metadata_filename:
+        The name of the metadata file (e.g., 'targets/linux.json').
 
     <Exceptions>
-      tuf.FormatError:
-        If the 'root' metadata is improperly formatted.
+      tuf.FormatError, if the file is not a properly formatted signable.
 
-      tuf.Error:
-        If there is an error loading a role contained in the 'root'
-        metadata.
+      tuf.Error, if the file cannot be deserialized.
+
+      IOError, if the file cannot be read.
 
     <Side Effects>
-      The key and role databases are reloaded for the top-level roles.
+      The parsed metadata cache may be loaded and modified.
 
     <Returns>
-      None.
+      The 'signed' object of the metadata file.
     """
-    
-    # Clobbering this means all delegated metadata files are rendered outdated
-    # and will need to be reloaded.  However, reloading the delegated metadata
-    # files is avoided here because fetching target information with methods
-    # like all_targets() and target() always cause a refresh of these files.
-    # The metadata files for delegated roles are also not loaded when the
-    # repository is first instantiated.  Due to this setup, reloading delegated
-    # roles is not required here.
-    tuf.keydb.create_keydb_from_root_metadata(self.metadata['current']['root'])
-    tuf.roledb.create_roledb_from_root_metadata(self.metadata['current']['root'])
 
+    metadata_filepath = os.path.join(self.metadata_directory[metadata_set],
+                                     metadata_filename)
+
+    with open(metadata_filepath, 'rb') as file_object:
+      metadata_bytes = file_object.read()
 
+    if not tuf.conf.USE_PARSED_METADATA_CACHE:
+      metadata_signable = \
+        tuf.util.load_json_string(metadata_bytes.decode('utf-8'))
+      tuf.formats.check_signable_object_format(metadata_signable)
 
+      return metadata_signable['signed']
 
+    cache_key = metadata_set + '/' + metadata_filename
+    digest_object = tuf.hash.digest('sha256')
+    digest_object.update(metadata_bytes)
+    metadata_digest = digest_object.hexdigest()
 
-  def _import_delegations(self, parent_role):
+    cache_entry = self._get_parsed_metadata_cache().get(cache_key)
+    if cache_entry is not None and cache_entry['digest'] == metadata_digest:
+      try:
+        return marshal.loads(cache_entry['signed'])
+
+      except (EOFError, ValueError, TypeError):
+        logger.warning('Ignoring the invalid parsed metadata of ' + \
+          repr(cache_key) + '.')
+
+    metadata_signable = \
+      tuf.util.load_json_string(metadata_bytes.decode('utf-8'))
+    tuf.formats.check_signable_object_format(metadata_signable)
+    self._cache_parsed_metadata(cache_key, metadata_digest,
+                                metadata_signable['signed'])
+
+    return metadata_signable['signed']
+
+
+
+
+
+  def _get_parsed_metadata_cache(self):
     """
     <Purpose>
-      Non-public method that imports all the roles delegated by 'parent_role'.
-    
+      Non-public method that returns the parsed metadata cache, loading it
+      from the client's metadata directory on the first call.  A missing or
+      invalid cache file, or one written by another cache or Python version,
+      is replaced by an empty cache.
+
     <Arguments>
-      parent_role:
-        The role whose delegations will be imported.
-        
-    <Exceptions>
-      tuf.FormatError:
-        If a key attribute of a delegated role's signing key is
-        improperly formatted.
+      None.
 
-      tuf.Error:
-        If the signing key of a delegated role cannot not be loaded.
+    <Exceptions>
+      None.
 
     <Side Effects>
-      The key and role database is modified to include the newly
-      loaded roles delegated by 'parent_role'.
+      The parsed metadata cache file may be read.
 
     <Returns>
-      None.
+      A dict whose values conform to 'tuf.formats.PARSEDMETADATAENTRY_SCHEMA'.
     """
-        
-    current_parent_metadata = self.metadata['current'][parent_role]
-  
-    if 'delegations' not in current_parent_metadata:
-      return
 
-    # This could be quite slow with a huge number of delegations.
-    keys_info = current_parent_metadata['delegations'].get('keys', {})
-    roles_info = current_parent_metadata['delegations'].get('roles', [])
+    if self._parsed_metadata_cache is None:
+      self._parsed_metadata_cache = {}
 
-    logger.debug('Adding roles delegated from ' + repr(parent_role) + '.')
-   
-    # Iterate through the keys of the delegated roles of 'parent_role'
-    # and load them.
-    for keyid, keyinfo in six.iteritems(keys_info):
-      if keyinfo['keytype'] in ['rsa', 'ed25519']:
-        key = tuf.keys.format_metadata_to_key(keyinfo)
-      
-        # We specify the keyid to ensure that it's the correct keyid
-        # for the key.
+      if os.path.exists(self._parsed_metadata_cache_filepath):
         try:
-          tuf.keydb.add_key(key, keyid)
-        
-        except tuf.KeyAlreadyExistsError:
-          pass
-        
-        except (tuf.FormatError, tuf.Error) as e:
-          logger.exception('Invalid key for keyid: ' + repr(keyid) + '.')
-          logger.error('Aborting role delegation for parent role ' + parent_role + '.')
-          raise
-      
-      else:
-        logger.warning('Invalid key type for ' + repr(keyid) + '.')
-        continue
+          with open(self._parsed_metadata_cache_filepath, 'rb') as file_object:
+            parsed_metadata_cache = marshal.loads(file_object.read())
+          tuf.formats.PARSEDMETADATACACHE_SCHEMA.check_match(
+            parsed_metadata_cache)
 
-    # Add the roles to the role database.
-    for roleinfo in roles_info:
-      try:
-        # NOTE: tuf.roledb.add_role will take care of the case where rolename
-        # is None.
-        rolename = roleinfo.get('name')
-        logger.debug('Adding delegated role: ' + str(rolename) + '.')
-        tuf.roledb.add_role(rolename, roleinfo)
-      
-      except tuf.RoleAlreadyExistsError as e:
-        logger.warning('Role already exists: ' + rolename)
-      
-      except:
-        logger.exception('Failed to add delegated role: ' + rolename + '.')
-        raise
+        except (IOError, OSError, EOFError, ValueError, TypeError,
+                tuf.FormatError) as exception:
+          logger.warning('Ignoring the parsed metadata cache in ' + \
+            repr(self._parsed_metadata_cache_filepath) + ': ' + str(exception))
 
+        else:
+          if parsed_metadata_cache['version'] == \
+             _PARSED_METADATA_CACHE_VERSION and \
+             parsed_metadata_cache['python_version'] == \
+             self._get_python_version():
+            self._parsed_metadata_cache = parsed_metadata_cache['entries']
+
+          else:
+            logger.debug('Ignoring the parsed metadata cache of another' + \
+              ' version.')
+
+    return self._parsed_metadata_cache
+
+
+
+
+
+  def _get_python_version(self):
+    """
+    <Purpose>
+      Non-public method that returns the 'major.minor' version of the running
+      Python, which determines the 'marshal' format of the parsed metadata
+      cache.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A string (e.g., '3.6').
+    """
+
+    return str(sys.version_info[0]) + '.' + str(sys.version_info[1])
+
+
+
+
+
+  def _cache_parsed_metadata(self, cache_key, metadata_digest,
+                             metadata_object):
+    """
+    <Purpose>
+      Non-public method that stores a parsed metadata file in the parsed
+      metadata cache.  Nothing is stored if
+      'tuf.conf.USE_PARSED_METADATA_CACHE' is False.
+
+    <Arguments>
+      cache_key:
+        The path of the metadata file relative to the client's metadata
+        directory (e.g., 'current/root.json').
+
+      metadata_digest:
+        The hex SHA-256 digest of the metadata file.
+
+      metadata_object:
+        The 'signed' object of the metadata file.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The parsed metadata cache is modified.  It is saved by
+      _save_parsed_metadata_cache().
+
+    <Returns>
+      None.
+    """
+
+    if not tuf.conf.USE_PARSED_METADATA_CACHE:
+      return
+
+    # The object is serialized now, so that later changes to the metadata
+    # store cannot alter the cache.
+    self._get_parsed_metadata_cache()[cache_key] = \
+      {'digest': metadata_digest, 'signed': marshal.dumps(metadata_object)}
+    self._parsed_metadata_cache_changed = True
+
+
+
+
+
+  def _move_parsed_metadata(self, metadata_filename):
+    """
+    <Purpose>
+      Non-public method that moves the parsed metadata of the current metadata
+      file 'metadata_filename' to the previous metadata set, after the file
+      itself has been moved to the 'previous' directory.
+
+    <Arguments>
+      metadata_filename:
+        The name of the metadata file (e.g., 'targets/linux.json').
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The parsed metadata cache is modified.
+
+    <Returns>
+      None.
+    """
+
+    if not tuf.conf.USE_PARSED_METADATA_CACHE:
+      return
+
+    parsed_metadata_cache = self._get_parsed_metadata_cache()
+    cache_entry = parsed_metadata_cache.pop('current/' + metadata_filename,
+                                            None)
+    parsed_metadata_cache.pop('previous/' + metadata_filename, None)
+
+    if cache_entry is not None:
+      parsed_metadata_cache['previous/' + metadata_filename] = cache_entry
+
+    self._parsed_metadata_cache_changed = True
+
+
+
+
+
+  def _save_parsed_metadata_cache(self):
+    """
+    <Purpose>
+      Non-public method that saves the parsed metadata cache to the client's
+      metadata directory, if it has changed.  The parsed metadata of files
+      that no longer exist is dropped.  Errors are logged, not raised, since
+      the cache only saves work.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The parsed metadata cache file is written.
+
+    <Returns>
+      None.
+    """
+
+    if not self._parsed_metadata_cache_changed:
+      return
+
+    parsed_metadata_cache = self._get_parsed_metadata_cache()
+
+    for cache_key in list(parsed_metadata_cache):
+      metadata_set, metadata_filename = cache_key.split('/', 1)
+      metadata_filepath = \
+        os.path.join(self.metadata_directory[metadata_set], metadata_filename)
+
+      if not os.path.exists(metadata_filepath):
+        del parsed_metadata_cache[cache_key]
+
+    file_object = tuf.util.TempFile()
+    file_object.write(marshal.dumps(
+      {'version': _PARSED_METADATA_CACHE_VERSION,
+       'python_version': self._get_python_version(),
+       'entries': parsed_metadata_cache}))
+    self._parsed_metadata_cache_changed = False
+
+    try:
+      file_object.move(self._parsed_metadata_cache_filepath)
+
+    except (IOError, OSError) as exception:
+      logger.warning('Could not save the parsed metadata cache: ' + \
+        str(exception))
+
+
+
+
+
+  def _rebuild_key_and_role_db(self):
+    """
+    <Purpose>
+      Non-public method that rebuilds the key and role databases from the
+      currently trusted 'root' metadata object extracted from 'root.json'.  This
+      private method is called when a new/updated 'root' metadata file is
+      loaded.  This method will only store the role information of the top-level
+      roles (i.e., 'root', 'targets', 'snapshot', 'timestamp').
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      tuf.FormatError:
+        If the 'root' metadata is improperly formatted.
+
+      tuf.Error:
+        If there is an error loading a role contained in the 'root'
+        metadata.
+
+    <Side Effects>
+      The key and role databases are reloaded for the top-level roles.
+
+    <Returns>
+      None.
+    """
+    
+    # Clobbering this means all delegated metadata files are rendered outdated
+    # and will need to be reloaded.  However, reloading the delegated metadata
+    # files is avoided here because fetching target information with methods
+    # like all_targets() and target() always cause a refresh of these files.
+    # The metadata files for delegated roles are also not loaded when the
+    # repository is first instantiated.  Due to this setup, reloading delegated
+    # roles is not required here.
+    tuf.keydb.create_keydb_from_root_metadata(self.metadata['current']['root'])
+    tuf.roledb.create_roledb_from_root_metadata(self.metadata['current']['root'])
+
+
+
+
+
+  def _import_delegations(self, parent_role):
+    """
+    <Purpose>
+      Non-public method that imports all the roles delegated by 'parent_role'.
+    
+    <Arguments>
+      parent_role:
+        The role whose delegations will be imported.
+        
+    <Exceptions>
+      tuf.FormatError:
+        If a key attribute of a delegated role's signing key is
+        improperly formatted.
+
+      tuf.Error:
+        If the signing key of a delegated role cannot not be loaded.
+
+    <Side Effects>
+      The key and role database is modified to include the newly
+      loaded roles delegated by 'parent_role'.
+
+    <Returns>
+      None.
+    """
+        
+    current_parent_metadata = self.metadata['current'][parent_role]
+  
+    if 'delegations' not in current_parent_metadata:
+      return
+
+    # This could be quite slow with a huge number of delegations.
+    keys_info = current_parent_metadata['delegations'].get('keys', {})
+    roles_info = current_parent_metadata['delegations'].get('roles', [])
+
+    logger.debug('Adding roles delegated from ' + repr(parent_role) + '.')
+   
+    # Iterate through the keys of the delegated roles of 'parent_role'
+    # and load them.
+    for keyid, keyinfo in six.iteritems(keys_info):
+      if keyinfo['keytype'] in ['rsa', 'ed25519']:
+        key = tuf.keys.format_metadata_to_key(keyinfo)
+      
+        # We specify the keyid to ensure that it's the correct keyid
+        # for the key.
+        try:
+          tuf.keydb.add_key(key, keyid)
+        
+        except tuf.KeyAlreadyExistsError:
+          pass
+        
+        except (tuf.FormatError, tuf.Error) as e:
+          logger.exception('Invalid key for keyid: ' + repr(keyid) + '.')
+          logger.error('Aborting role delegation for parent role ' + parent_role + '.')
+          raise
+      
+      else:
+        logger.warning('Invalid key type for ' + repr(keyid) + '.')
+        continue
+
+    # Add the roles to the role database.
+    for roleinfo in roles_info:
+      try:
+        # NOTE: tuf.roledb.add_role will take care of the case where rolename
+        # is None.
+        rolename = roleinfo.get('name')
+        logger.debug('Adding delegated role: ' + str(rolename) + '.')
+        tuf.roledb.add_role(rolename, roleinfo)
+      
+      except tuf.RoleAlreadyExistsError as e:
+        logger.warning('Role already exists: ' + rolename)
+      
+      except:
+        logger.exception('Failed to add delegated role: ' + rolename + '.')
+        raise
 
 
 
 
+
+  @_hold_metadata_lock
   def refresh(self, unsafely_update_root_if_necessary=True):
     """
     <Purpose>
@@ -601,7 +1227,10 @@ class Updater(object):
         
     <Side Effects>
       Updates the metadata files of the top-level roles with the latest
-      information.
+      information.  The mirror scoreboard is saved, if
+      'tuf.conf.PERSIST_MIRROR_SCOREBOARD' is True, and the parsed metadata
+      cache, if 'tuf.conf.USE_PARSED_METADATA_CACHE' is True.  The partial
+      downloads of targets no longer listed by the metadata are discarded.
 
     <Returns>
       None.
@@ -711,61 +1340,307 @@ class Updater(object):
           'expired. Your metadata is out of date.')
         raise
 
+    # The next updater need not parse the metadata files again.  Partial
+    # downloads of targets that the new metadata no longer trusts are not
+    # resumed.
+    else:
+      self._save_parsed_metadata_cache()
+      self._discard_untrusted_partial_target_files()
+
+    # Keep what was learned about the mirrors, whether or not the update
+    # succeeded.
+    finally:
+      self._save_mirror_scoreboard()
 
 
 
 
-  def _check_hashes(self, file_object, trusted_hashes):
+
+  def start_auto_refresh(self, interval=None):
     """
     <Purpose>
-      Non-public method that verifies multiple secure hashes of the downloaded
-      file 'file_object'.  If any of these fail it raises an exception.  This is
-      to conform with the TUF spec, which support clients with different hashing
-      algorithms. The 'hash.py' module is used to compute the hashes of
-      'file_object'.
+      Start a daemon thread that refreshes the top-level metadata, as
+      refresh() does, about every 'interval' seconds.  The interval varies by
+      up to 'tuf.conf.AUTO_REFRESH_JITTER' of itself, so that clients do not
+      request the mirrors in step, and doubles after every consecutive refresh
+      that finds no working mirror, up to 'tuf.conf.AUTO_REFRESH_MAX_INTERVAL'
+      seconds.
+
+      The metadata that has changed is downloaded before the metadata lock is
+      acquired.  It is then verified and installed while the lock is held, so
+      that the target methods (e.g., target()) see the trusted metadata either
+      entirely before or entirely after a refresh, but do not wait for its
+      downloads.  download_target() does not wait for the lock.
+
+      The first refresh is made after the first interval; the client should
+      call refresh() before it starts the thread.  Errors are logged, and the
+      refresh is tried again after the next interval.
 
     <Arguments>
-      file_object:
-        A 'tuf.util.TempFile' file-like object.  'file_object' ensures that a
-        read() without a size argument properly reads the entire file.
-
-      trusted_hashes:
-        A dictionary with hash-algorithm names as keys and hashes as dict values.
-        The hashes should be in the hexdigest format.  Should be Conformant to
-        'tuf.formats.HASHDICT_SCHEMA'.
+      interval:
+        The number of seconds between refreshes, or None to use
+        'tuf.conf.AUTO_REFRESH_INTERVAL'.
 
     <Exceptions>
-      tuf.BadHashError, if the hashes don't match.
+      tuf.FormatError, if 'interval' is improperly formatted.
+
+      tuf.Error, if the thread has already been started.
 
     <Side Effects>
-      Hash digest object is created using the 'tuf.hash' module.
+      Starts a daemon thread.
 
     <Returns>
       None.
     """
 
-    # Verify each trusted hash of 'trusted_hashes'.  If all are valid, simply
-    # return.
-    for algorithm, trusted_hash in six.iteritems(trusted_hashes):
-      digest_object = tuf.hash.digest(algorithm)
-      digest_object.update(file_object.read())
-      computed_hash = digest_object.hexdigest()
-      
-      # Raise an exception if any of the hashes are incorrect.
-      if trusted_hash != computed_hash:
-        raise tuf.BadHashError(trusted_hash, computed_hash)
-      else:
-        logger.info('The file\'s '+algorithm+' hash is correct: '+trusted_hash)
+    if interval is None:
+      interval = tuf.conf.AUTO_REFRESH_INTERVAL
 
+    tuf.formats.LENGTH_SCHEMA.check_match(interval)
 
+    if self._auto_refresh_thread is not None and \
+       self._auto_refresh_thread.is_alive():
+      raise tuf.Error('The auto refresh of ' + repr(self.name) + \
+                      ' has already been started.')
 
+    self._auto_refresh_stop_event = threading.Event()
+    self._auto_refresh_thread = \
+      threading.Thread(target=self._auto_refresh,
+                       args=(interval, self._auto_refresh_stop_event),
+                       name='auto refresh of ' + self.name)
+    self._auto_refresh_thread.daemon = True
+    self._auto_refresh_thread.start()
 
 
-  def _hard_check_file_length(self, file_object, trusted_file_length):
+
+
+
+  def stop_auto_refresh(self, timeout=None):
     """
     <Purpose>
-      Non-public method that ensures the length of 'file_object' is strictly
-      equal to 'trusted_file_length'.  This is a deliberately redundant
+      Stop the thread started by start_auto_refresh(), and wait for it to
+      exit.  A refresh in progress is completed first.  Nothing is done if the
+      thread has not been started.
+
+    <Arguments>
+      timeout:
+        The maximum number of seconds to wait for the thread to exit, or None
+        to wait until it does.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The auto refresh thread exits.
+
+    <Returns>
+      None.
+    """
+
+    if self._auto_refresh_thread is None:
+      return
+
+    self._auto_refresh_stop_event.set()
+    self._auto_refresh_thread.join(timeout)
+    self._auto_refresh_thread = None
+    self._auto_refresh_stop_event = None
+
+
+
+
+
+  def _auto_refresh(self, interval, stop_event):
+    """
+    <Purpose>
+      Non-public method run by the thread of start_auto_refresh().  It calls
+      _refresh_in_background() after every delay returned by
+      _get_auto_refresh_delay(), until 'stop_event' is set.
+
+    <Arguments>
+      interval:
+        The number of seconds between refreshes.
+
+      stop_event:
+        A 'threading.Event' that stops the thread when set.
+
+    <Exceptions>
+      None.  Errors are logged.
+
+    <Side Effects>
+      The top-level metadata is refreshed.
+
+    <Returns>
+      None.
+    """
+
+    # The number of consecutive refreshes that found no working mirror.
+    failures = 0
+
+    while not stop_event.wait(self._get_auto_refresh_delay(interval,
+                                                           failures)):
+      try:
+        self._refresh_in_background()
+
+      except tuf.NoWorkingMirrorError as exception:
+        failures = failures + 1
+        logger.warning('Auto refresh of ' + repr(self.name) + ' found no' + \
+          ' working mirror (' + str(failures) + ' consecutive failures): ' + \
+          str(exception))
+
+      except Exception:
+        failures = 0
+        logger.exception('Auto refresh of ' + repr(self.name) + ' failed.')
+
+      else:
+        failures = 0
+
+
+
+
+
+  def _get_auto_refresh_delay(self, interval, failures):
+    """
+    <Purpose>
+      Non-public method that returns the number of seconds to wait before the
+      next auto refresh: 'interval', doubled for each of the last consecutive
+      'failures', at most 'tuf.conf.AUTO_REFRESH_MAX_INTERVAL', and varied by
+      up to 'tuf.conf.AUTO_REFRESH_JITTER' of itself.
+
+    <Arguments>
+      interval:
+        The number of seconds between refreshes.
+
+      failures:
+        The number of consecutive refreshes that found no working mirror.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A number of seconds.
+    """
+
+    # The exponent is bounded, so that the delay cannot overflow.
+    delay = interval * 2 ** min(failures, 32)
+    delay = min(delay, max(interval, tuf.conf.AUTO_REFRESH_MAX_INTERVAL))
+
+    jitter = tuf.conf.AUTO_REFRESH_JITTER
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+
+
+
+  def _refresh_in_background(self):
+    """
+    <Purpose>
+      Non-public method that refreshes the top-level metadata for
+      start_auto_refresh().  The changed metadata files are downloaded by
+      _prefetch_top_level_metadata(), without holding the metadata lock, and
+      refresh() then verifies and installs them while holding it.  Files that
+      were not prefetched, or are not valid, are downloaded by refresh().
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      Any exception raised by refresh().
+
+      tuf.NoWorkingMirrorError, if the timestamp metadata cannot be downloaded
+      from any mirror.
+
+    <Side Effects>
+      The top-level metadata is updated.
+
+    <Returns>
+      None.
+    """
+
+    prefetched_metadata = self._prefetch_top_level_metadata()
+
+    with self._metadata_lock:
+      # The timestamp metadata has not changed on the mirrors, so neither has
+      # the other top-level metadata.  refresh() would only have ensured that
+      # it has not expired.
+      if prefetched_metadata is None:
+        try:
+          for metadata_role in ['timestamp', 'snapshot', 'root', 'targets']:
+            if metadata_role in self.metadata['current']:
+              self._ensure_not_expired(self.metadata['current'][metadata_role],
+                                       metadata_role)
+
+          return
+
+        # refresh() tries to recover from expired metadata.
+        except tuf.ExpiredMetadataError:
+          prefetched_metadata = {}
+
+      self._prefetched_metadata.update(prefetched_metadata)
+
+      try:
+        self.refresh()
+
+      finally:
+        self._discard_prefetched_metadata()
+
+
+
+
+
+  def _check_hashes(self, file_object, trusted_hashes):
+    """
+    <Purpose>
+      Non-public method that verifies multiple secure hashes of the downloaded
+      file 'file_object'.  If any of these fail it raises an exception.  This is
+      to conform with the TUF spec, which support clients with different hashing
+      algorithms.  Digests computed while 'file_object' was downloaded are
+      used as is; the 'hash.py' module computes any other digest of
+      'file_object'.
+
+    <Arguments>
+      file_object:
+        A 'tuf.util.TempFile' file-like object.  'file_object' ensures that a
+        read() without a size argument properly reads the entire file.
+
+      trusted_hashes:
+        A dictionary with hash-algorithm names as keys and hashes as dict values.
+        The hashes should be in the hexdigest format.  Should be Conformant to
+        'tuf.formats.HASHDICT_SCHEMA'.
+
+    <Exceptions>
+      tuf.BadHashError, if the hashes don't match.
+
+    <Side Effects>
+      Hash digest object is created using the 'tuf.hash' module.
+
+    <Returns>
+      None.
+    """
+
+    # Verify each trusted hash of 'trusted_hashes'.  If all are valid, simply
+    # return.
+    for algorithm, trusted_hash in six.iteritems(trusted_hashes):
+      digest_object = file_object.get_digest(algorithm)
+      computed_hash = digest_object.hexdigest()
+      
+      # Raise an exception if any of the hashes are incorrect.
+      if trusted_hash != computed_hash:
+        raise tuf.BadHashError(trusted_hash, computed_hash)
+      else:
+        logger.info('The file\'s '+algorithm+' hash is correct: '+trusted_hash)
+
+
+
+
+
+  def _hard_check_file_length(self, file_object, trusted_file_length):
+    """
+    <Purpose>
+      Non-public method that ensures the length of 'file_object' is strictly
+      equal to 'trusted_file_length'.  This is a deliberately redundant
       implementation designed to complement
       tuf.download._check_downloaded_length().
 
@@ -781,16 +1656,15 @@ class Updater(object):
       tuf.DownloadLengthMismatchError, if the lengths do not match.
 
     <Side Effects>
-      Reads the contents of 'file_object' and logs a message if 'file_object'
-      matches the trusted length.
+      Logs a message if 'file_object' matches the trusted length.
 
     <Returns>
       None.
     """
 
-    # Read the entire contents of 'file_object', a 'tuf.util.TempFile' file-like
-    # object that ensures the entire file is read.
-    observed_length = len(file_object.read())
+    # 'file_object', a 'tuf.util.TempFile' file-like object, counts the bytes
+    # written to it, so its contents need not be read back.
+    observed_length = file_object.get_length()
    
     # Return and log a message if the length 'file_object' is equal to
     # 'trusted_file_length', otherwise raise an exception.  A hard check
@@ -828,16 +1702,16 @@ class Updater(object):
       tuf.DownloadLengthMismatchError, if the lengths do not match.
 
     <Side Effects>
-      Reads the contents of 'file_object' and logs a message if 'file_object'
-      is less than or equal to the trusted length.
+      Logs a message if 'file_object' is less than or equal to the trusted
+      length.
 
     <Returns>
       None.
     """
 
-    # Read the entire contents of 'file_object', a 'tuf.util.TempFile' file-like
-    # object that ensures the entire file is read.
-    observed_length = len(file_object.read()) 
+    # 'file_object', a 'tuf.util.TempFile' file-like object, counts the bytes
+    # written to it, so its contents need not be read back.
+    observed_length = file_object.get_length()
    
     # Return and log a message if 'file_object' is less than or equal to
     # 'trusted_file_length', otherwise raise an exception.  A soft check
@@ -880,166 +1754,411 @@ class Updater(object):
     <Side Effects>
       The target file is downloaded from all known repository mirrors in the
       worst case. If a valid copy of the target file is found, it is stored in
-      a temporary file and returned.
+      a temporary file and returned.  A download interrupted on one mirror is
+      resumed on the next one.  If every mirror fails, the bytes received so
+      far are kept in a temporary file, and resumed by the next call for the
+      same target.
 
     <Returns>
       A 'tuf.util.TempFile' file-like object containing the target.
     """
 
+    # Resume the partial download of this target, if any, left by an earlier
+    # call.  Its digests are carried across the resume.
+    partial_key = (target_filepath, file_length,
+                   tuple(sorted(six.iteritems(file_hashes))))
+    with self._partial_target_files_lock:
+      target_file_object = self._partial_target_files.pop(partial_key, None)
+
+    if target_file_object is None:
+      target_file_object = tuf.util.TempFile(hash_algorithms=list(file_hashes),
+        spool_size=tuf.conf.DOWNLOAD_SPOOL_SIZE)
+
     # Define a callable function that is passed as an argument to _get_file()
     # and called.  The 'verify_target_file' function ensures the file length
     # and hashes of 'target_filepath' are strictly equal to the trusted values.
     def verify_target_file(target_file_object):
-      
-      # Every target file must have its length and hashes inspected.
-      self._hard_check_file_length(target_file_object, file_length)
-      self._check_hashes(target_file_object, file_hashes)
+      self._verify_target_file(target_file_object, file_length, file_hashes)
 
     # Target files, unlike metadata files, are not decompressed; the
     # 'compression' argument to _get_file() is needed only for decompression of
     # metadata.  Target files may be compressed or uncompressed.
-    if self.consistent_snapshot:
-      target_digest = random.choice(list(file_hashes.values()))
-      dirname, basename = os.path.split(target_filepath)
-      target_filepath = os.path.join(dirname, target_digest+'.'+basename)
+    remote_filepath = self._get_remote_target_filepath(target_filepath,
+                                                       file_hashes)
 
-    return self._get_file(target_filepath, verify_target_file,
-                          'target', file_length, compression=None,
-                          verify_compressed_file_function=None,
-                          download_safely=True)
+    # The digests of 'file_hashes' are computed as the target is downloaded,
+    # so that verify_target_file() does not read it back from disk.
+    try:
+      return self._get_file(remote_filepath, verify_target_file,
+                            'target', file_length, compression=None,
+                            verify_compressed_file_function=None,
+                            download_safely=True,
+                            temp_file=target_file_object)
+
+    except tuf.NoWorkingMirrorError:
+      partial_length = target_file_object.get_length()
+      
+      if 0 < partial_length < file_length and \
+         tuf.conf.MAX_PARTIAL_TARGET_FILES > 0:
+        logger.info('Keeping ' + str(partial_length) + ' downloaded bytes of ' +
+                    repr(partial_key[0]) + ' to resume the download later.')
+        self._keep_partial_target_file(partial_key, target_file_object)
+      
+      else:
+        target_file_object.close_temp_file()
+      
+      raise
 
 
 
 
 
-  def _verify_uncompressed_metadata_file(self, metadata_file_object,
-                                         metadata_role):
+  def _keep_partial_target_file(self, partial_key, target_file_object):
     """
     <Purpose>
-      Non-public method that verifies an uncompressed metadata file.  An
-      exception is raised if 'metadata_file_object is invalid, and there is no
-      return value.
+      Non-public method that keeps the partially downloaded 'target_file_object'
+      so that the next download of the same target resumes it.  The least
+      recently failed downloads are discarded to keep at most
+      'tuf.conf.MAX_PARTIAL_TARGET_FILES' of them.
 
     <Arguments>
-      metadata_file_object:
-        A 'tuf.util.TempFile' instance containing the metadata file.
-        'metadata_file_object' ensures the entire file is returned with read().
+      partial_key:
+        The (target filepath, length, hashes) tuple of the target.
 
-      metadata_role:
-        The role name of the metadata (e.g., 'root', 'targets',
-        'targets/linux/x86').
+      target_file_object:
+        The 'tuf.util.TempFile' holding the bytes of the target received so
+        far.
 
     <Exceptions>
-      tuf.ForbiddenTargetError:
-        In case a targets role has signed for a target it was not delegated to.
-
-      tuf.FormatError:
-        In case the metadata file is valid JSON, but not valid TUF metadata.
-
-      tuf.InvalidMetadataJSONError:
-        In case the metadata file is not valid JSON.
-
-      tuf.ReplayedMetadataError:
-        In case the downloaded metadata file is older than the current one.
-
-      tuf.RepositoryError:
-        In case the repository is somehow inconsistent; e.g. a parent has not
-        delegated to a child (contrary to expectations).
-
-      tuf.SignatureError:
-        In case the metadata file does not have a valid signature.
+      None.
 
     <Side Effects>
-      The content of 'metadata_file_object' is read and loaded.
+      'self._partial_target_files' is modified, and the temporary files of the
+      discarded downloads are closed.
 
     <Returns>
       None.
     """
 
-    metadata = metadata_file_object.read().decode('utf-8')
-    
-    try:
-      metadata_signable = tuf.util.load_json_string(metadata)
-    
-    except Exception as exception:
-      raise tuf.InvalidMetadataJSONError(exception)
-    
-    else:
-      # Ensure the loaded 'metadata_signable' is properly formatted.  Raise
-      # 'tuf.FormatError' if not.
-      tuf.formats.check_signable_object_format(metadata_signable)
+    discarded_file_objects = []
 
-    # Is 'metadata_signable' expired?
-    self._ensure_not_expired(metadata_signable['signed'], metadata_role)
-   
-    # We previously verified version numbers in this function, but have since
-    # moved version number verification to the functions that retrieve
-    # metadata.
+    with self._partial_target_files_lock:
+      # A concurrent download of the same target may have failed first.
+      previous_file_object = self._partial_target_files.pop(partial_key, None)
+      if previous_file_object is not None:
+        discarded_file_objects.append(previous_file_object)
 
-    # Reject the metadata if any specified targets are not allowed.
-    # 'tuf.ForbiddenTargetError' raised if any of the targets of 'metadata_role'
-    # are not allowed.
-    if metadata_signable['signed']['_type'] == 'Targets':
-      if metadata_role != 'targets':
-        metadata_targets = list(metadata_signable['signed']['targets'].keys())
-        parent_rolename = tuf.roledb.get_parent_rolename(metadata_role)
-        parent_role_metadata = self.metadata['current'][parent_rolename]
-        parent_delegations = parent_role_metadata['delegations']
-        tuf.util.ensure_all_targets_allowed(metadata_role, metadata_targets,
-                                            parent_delegations)
+      self._partial_target_files[partial_key] = target_file_object
 
-    # Verify the signature on the downloaded metadata object.
-    valid = tuf.sig.verify(metadata_signable, metadata_role)
-    if not valid:
-      raise tuf.BadSignatureError(metadata_role)
+      while len(self._partial_target_files) > \
+            tuf.conf.MAX_PARTIAL_TARGET_FILES:
+        discarded_key, discarded_file_object = \
+          self._partial_target_files.popitem(last=False)
+        logger.debug('Discarding the partial download of ' +
+                     repr(discarded_key[0]))
+        discarded_file_objects.append(discarded_file_object)
 
+    for discarded_file_object in discarded_file_objects:
+      discarded_file_object.close_temp_file()
 
 
 
 
-  def _unsafely_get_metadata_file(self, metadata_role, metadata_filepath,
-                                  uncompressed_fileinfo,
-                                  compression=None, compressed_fileinfo=None):
 
+  def _discard_untrusted_partial_target_files(self):
     """
     <Purpose>
-      Non-public method that downloads a metadata file up to a certain length.
-      The actual file length may not be strictly equal to its expected length.
-      File hashes will not be checked because it is expected to be unknown.
+      Non-public method that discards the partially downloaded targets that
+      the current metadata no longer lists with the same length and hashes.  A
+      target is still trusted if a loaded targets role, whose version is the
+      one listed by the current snapshot, lists it.
 
     <Arguments>
-      metadata_role:
-        The role name of the metadata (e.g., 'root', 'targets',
-        'targets/linux/x86').
-
-      metadata_filepath:
-        The metadata filepath (i.e., relative to the repository metadata
-        directory).
-
-      uncompressed_fileinfo:
-        The trusted file length and hashes of the uncompressed version of the 
-        metadata file.  Should be 'tuf.formats.FILEINFO_SCHEMA'.
-
-      compression:
-        The name of the compression algorithm (e.g., 'gzip'), if the metadata
-        file is compressed. 
-        
-      compressed_fileinfo:
-        The fileinfo of the metadata file, if it is compressed.  Should be
-        'tuf.formats.FILEINFO_SCHEMA'.
+      None.
 
     <Exceptions>
-      tuf.NoWorkingMirrorError:
-        The metadata could not be fetched. This is raised only when all known
-        mirrors failed to provide a valid copy of the desired metadata file.
+      None.
 
     <Side Effects>
-      The metadata file is downloaded from all known repository mirrors in the
-      worst case. If a valid copy of the metadata file is found, it is stored
-      in a temporary file and returned.
+      'self._partial_target_files' is modified, and the temporary files of the
+      discarded downloads are closed.
 
     <Returns>
-      A 'tuf.util.TempFile' file-like object containing the metadata.
+      None.
+    """
+
+    discarded_file_objects = []
+
+    with self._partial_target_files_lock:
+      for partial_key in list(self._partial_target_files):
+        target_filepath, file_length, file_hashes = partial_key
+
+        if not self._is_trusted_target_file(target_filepath, file_length,
+                                            dict(file_hashes)):
+          logger.debug('Discarding the partial download of the untrusted ' +
+                       'target ' + repr(target_filepath))
+          discarded_file_objects.append(
+            self._partial_target_files.pop(partial_key))
+
+    for discarded_file_object in discarded_file_objects:
+      discarded_file_object.close_temp_file()
+
+
+
+
+
+  def _is_trusted_target_file(self, target_filepath, file_length,
+                              file_hashes):
+    """
+    <Purpose>
+      Non-public method that determines whether a loaded targets role, whose
+      current metadata is the version listed by the snapshot, lists
+      'target_filepath' with 'file_length' and 'file_hashes'.
+
+    <Arguments>
+      target_filepath:
+        The target filepath obtained from TUF targets metadata.
+
+      file_length:
+        The length of the target file.
+
+      file_hashes:
+        The hashes of the target file.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      Boolean.
+    """
+
+    for role_name, role_metadata in six.iteritems(self.metadata['current']):
+      if role_name != 'targets' and not role_name.startswith('targets/'):
+        continue
+
+      fileinfo = role_metadata['targets'].get(target_filepath)
+
+      if fileinfo is None or fileinfo['length'] != file_length or \
+         fileinfo['hashes'] != file_hashes:
+        continue
+
+      # A role whose newer version is listed by the snapshot is stale.
+      role_versions = self._get_snapshot_versions([role_name])
+
+      if role_versions is not None and \
+         role_versions[role_name] == role_metadata['version']:
+        return True
+
+    return False
+
+
+
+
+
+  def _get_remote_target_filepath(self, target_filepath, file_hashes):
+    """
+    <Purpose>
+      Non-public method that returns the filepath of a target file on the
+      repository mirrors.  If the repository uses consistent snapshots, the
+      filename is prefixed with one of the target's trusted digests.
+
+    <Arguments>
+      target_filepath:
+        The target filepath (relative to the repository targets directory)
+        obtained from TUF targets metadata.
+
+      file_hashes:
+        The trusted hashes of the target file.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      The filepath of the target, relative to the targets directory of a
+      mirror.
+    """
+
+    if self.consistent_snapshot:
+      target_digest = random.choice(list(file_hashes.values()))
+      dirname, basename = os.path.split(target_filepath)
+      target_filepath = os.path.join(dirname, target_digest+'.'+basename)
+
+    return target_filepath
+
+
+
+
+
+  def _verify_target_file(self, target_file_object, file_length, file_hashes):
+    """
+    <Purpose>
+      Non-public method that ensures the length and hashes of a downloaded
+      target file are strictly equal to the trusted values.
+
+    <Arguments>
+      target_file_object:
+        A 'tuf.util.TempFile' file-like object containing the target.
+
+      file_length:
+        The trusted length of the target file.
+
+      file_hashes:
+        The trusted hashes of the target file.
+
+    <Exceptions>
+      tuf.DownloadLengthMismatchError, if the lengths do not match.
+
+      tuf.BadHashError, if the hashes do not match.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      None.
+    """
+      
+    # Every target file must have its length and hashes inspected.
+    self._hard_check_file_length(target_file_object, file_length)
+    self._check_hashes(target_file_object, file_hashes)
+
+
+
+
+
+  def _verify_uncompressed_metadata_file(self, metadata_file_object,
+                                         metadata_role):
+    """
+    <Purpose>
+      Non-public method that verifies an uncompressed metadata file.  An
+      exception is raised if 'metadata_file_object is invalid, and there is no
+      return value.
+
+    <Arguments>
+      metadata_file_object:
+        A 'tuf.util.TempFile' instance containing the metadata file.
+        'metadata_file_object' ensures the entire file is returned with read().
+
+      metadata_role:
+        The role name of the metadata (e.g., 'root', 'targets',
+        'targets/linux/x86').
+
+    <Exceptions>
+      tuf.ForbiddenTargetError:
+        In case a targets role has signed for a target it was not delegated to.
+
+      tuf.FormatError:
+        In case the metadata file is valid JSON, but not valid TUF metadata.
+
+      tuf.InvalidMetadataJSONError:
+        In case the metadata file is not valid JSON.
+
+      tuf.ReplayedMetadataError:
+        In case the downloaded metadata file is older than the current one.
+
+      tuf.RepositoryError:
+        In case the repository is somehow inconsistent; e.g. a parent has not
+        delegated to a child (contrary to expectations).
+
+      tuf.SignatureError:
+        In case the metadata file does not have a valid signature.
+
+    <Side Effects>
+      The content of 'metadata_file_object' is read and loaded.
+
+    <Returns>
+      None.
+    """
+
+    metadata = metadata_file_object.read().decode('utf-8')
+    
+    try:
+      metadata_signable = tuf.util.load_json_string(metadata)
+    
+    except Exception as exception:
+      raise tuf.InvalidMetadataJSONError(exception)
+    
+    else:
+      # Ensure the loaded 'metadata_signable' is properly formatted.  Raise
+      # 'tuf.FormatError' if not.
+      tuf.formats.check_signable_object_format(metadata_signable)
+
+    # Is 'metadata_signable' expired?
+    self._ensure_not_expired(metadata_signable['signed'], metadata_role)
+   
+    # We previously verified version numbers in this function, but have since
+    # moved version number verification to the functions that retrieve
+    # metadata.
+
+    # Reject the metadata if any specified targets are not allowed.
+    # 'tuf.ForbiddenTargetError' raised if any of the targets of 'metadata_role'
+    # are not allowed.
+    if metadata_signable['signed']['_type'] == 'Targets':
+      if metadata_role != 'targets':
+        metadata_targets = list(metadata_signable['signed']['targets'].keys())
+        parent_rolename = tuf.roledb.get_parent_rolename(metadata_role)
+        parent_role_metadata = self.metadata['current'][parent_rolename]
+        parent_delegations = parent_role_metadata['delegations']
+        tuf.util.ensure_all_targets_allowed(metadata_role, metadata_targets,
+                                            parent_delegations)
+
+    # Verify the signature on the downloaded metadata object.
+    valid = tuf.sig.verify(metadata_signable, metadata_role)
+    if not valid:
+      raise tuf.BadSignatureError(metadata_role)
+
+
+
+
+
+  def _unsafely_get_metadata_file(self, metadata_role, metadata_filepath,
+                                  uncompressed_fileinfo,
+                                  compression=None, compressed_fileinfo=None):
+
+    """
+    <Purpose>
+      Non-public method that downloads a metadata file up to a certain length.
+      The actual file length may not be strictly equal to its expected length.
+      File hashes will not be checked because it is expected to be unknown.
+
+    <Arguments>
+      metadata_role:
+        The role name of the metadata (e.g., 'root', 'targets',
+        'targets/linux/x86').
+
+      metadata_filepath:
+        The metadata filepath (i.e., relative to the repository metadata
+        directory).
+
+      uncompressed_fileinfo:
+        The trusted file length and hashes of the uncompressed version of the 
+        metadata file.  Should be 'tuf.formats.FILEINFO_SCHEMA'.
+
+      compression:
+        The name of the compression algorithm (e.g., 'gzip'), if the metadata
+        file is compressed. 
+        
+      compressed_fileinfo:
+        The fileinfo of the metadata file, if it is compressed.  Should be
+        'tuf.formats.FILEINFO_SCHEMA'.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The metadata could not be fetched. This is raised only when all known
+        mirrors failed to provide a valid copy of the desired metadata file.
+
+    <Side Effects>
+      The metadata file is downloaded from all known repository mirrors in the
+      worst case. If a valid copy of the metadata file is found, it is stored
+      in a temporary file and returned.
+
+    <Returns>
+      A 'tuf.util.TempFile' file-like object containing the metadata.
     """
    
     # Store file length and hashes of the uncompressed version metadata.
@@ -1116,95 +2235,522 @@ class Updater(object):
         The metadata could not be fetched. This is raised only when all known
         mirrors failed to provide a valid copy of the desired metadata file.
 
+      tuf.NotModifiedError:
+        A mirror reported that the trusted metadata has not changed (see
+        _get_conditional_request_validators()).
+
     <Side Effects>
       The file is downloaded from all known repository mirrors in the worst
       case. If a valid copy of the file is found, it is stored in a temporary
-      file and returned.
+      file and returned.  If 'tuf.conf.HEDGED_REQUEST_DELAY' is set, several
+      mirrors may be downloading the file at the same time.
 
     <Returns>
       A 'tuf.util.TempFile' file-like object containing the metadata.
     """
 
-    file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', remote_filename,
-                                                   self.mirrors)
-    # file_mirror (URL): error (Exception)
-    file_mirror_errors = {}
-    file_object = None
+    # Use the copy downloaded by _prefetch_metadata(), if it is valid.
+    file_object = self._get_prefetched_metadata_file(metadata_role,
+                                                     remote_filename,
+                                                     expected_version,
+                                                     compression_algorithm)
+    if file_object is not None:
+      return file_object
 
-    for file_mirror in file_mirrors:
-      try:
-        file_object = tuf.download.unsafe_download(file_mirror,
-                                                   upperbound_filelength)
+    # The validators of the valid copy downloaded from each mirror.  Only
+    # those of the copy returned are kept.  The dict keys are 'id()'s of the
+    # downloaded file objects.
+    downloaded_validators = {}
 
-        if compression_algorithm is not None:
-          logger.info('Decompressing ' + str(file_mirror))
-          file_object.decompress_temp_file_object(compression_algorithm)
-        
-        else:
-          logger.info('Not decompressing ' + str(file_mirror))
-        
-        # Verify 'file_object' according to the callable function.
-        # 'file_object' is also verified if decompressed above (i.e., the
-        # uncompressed version).
-        metadata_signable = \
-          tuf.util.load_json_string(file_object.read().decode('utf-8'))
-       
-        # If the version number is unspecified, ensure that the version number
-        # downloaded is greater than the currently trusted version number for
-        # 'metadata_role'.
-        version_downloaded = metadata_signable['signed']['version'] 
-        
-        if expected_version is not None:
-          # Verify that the downloaded version matches the version expected by
-          # the caller.
-          if version_downloaded != expected_version:
-            message = \
-              'Downloaded version number: ' + repr(version_downloaded) + '.' \
-              ' Version number MUST be: ' + repr(expected_version)
-            raise tuf.BadVersionNumberError(message) 
-         
-        # The caller does not know which version to download.  Verify that the
-        # downloaded version is at least greater than the one locally available.
-        else:
-          # Verify that the version number of the locally stored
-          # 'timestamp.json', if available, is less than what was downloaded.
-          # Otherwise, accept the new timestamp with version number
-          # 'version_downloaded'.
-          logger.info('metadata_role: ' + repr(metadata_role)) 
-          try:
-            current_version = \
-              self.metadata['current'][metadata_role]['version']
-              
-            if version_downloaded < current_version:
-              raise tuf.ReplayedMetadataError(metadata_role, version_downloaded,
-                                              current_version)
-          
-          except KeyError:
-            logger.info(metadata_role + ' not available locally.')
+    # Define a callable function that downloads 'remote_filename' from
+    # 'file_mirror', and returns it only if it is a valid copy.  It may be
+    # called from several threads at once if requests are hedged.
+    def get_verified_metadata_file(file_mirror, cancel_event=None):
+      validators = self._get_conditional_request_validators(metadata_role,
+                                                            expected_version,
+                                                            file_mirror)
 
-        self._verify_uncompressed_metadata_file(file_object, metadata_role)
+      file_object = tuf.download.unsafe_download(file_mirror,
+        upperbound_filelength, cancel_event=cancel_event,
+        mirror_scoreboard=self.mirror_scoreboard, validators=validators,
+        compression=compression_algorithm)
 
-      except Exception as exception:
-        # Remember the error from this mirror, and "reset" the target file.
-        logger.exception('Update failed from ' + file_mirror + '.')
-        file_mirror_errors[file_mirror] = exception
-        file_object = None
-      
-      else:
-        break
+      if validators is not None:
+        self._check_metadata_file_changed(file_object, metadata_role,
+                                          file_mirror, validators)
+
+      self._verify_downloaded_metadata_file(file_object, metadata_role,
+                                            expected_version,
+                                            compression_algorithm)
+
+      if validators is not None:
+        downloaded_validators[id(file_object)] = (file_mirror, validators)
 
-    if file_object:
       return file_object
-    
+
+    file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', remote_filename,
+                                                   self.mirrors,
+                                                   self.mirror_scoreboard)
+
+    # Request the next mirror whenever the latest request is slow to succeed,
+    # rather than only after it fails.
+    if tuf.conf.HEDGED_REQUEST_DELAY is not None:
+      file_object = \
+        self._get_file_from_hedged_mirrors(remote_filename, file_mirrors,
+                                           get_verified_metadata_file)
+
+    else:
+      file_object = self._get_file_from_mirrors(remote_filename, file_mirrors,
+                                                get_verified_metadata_file)
+
+    # Keep the validators of the copy that will be installed.
+    if id(file_object) in downloaded_validators:
+      file_mirror, validators = downloaded_validators[id(file_object)]
+      self._metadata_validators[file_mirror] = validators
+
+    return file_object
+
+
+
+
+
+  def _get_file_from_mirrors(self, filepath, file_mirrors, get_file_function):
+    """
+    <Purpose>
+      Non-public method that requests a file from 'file_mirrors', one at a
+      time and in order, until a valid copy of the file is returned.
+
+    <Arguments>
+      filepath:
+        The relative metadata filepath, used in log messages.
+
+      file_mirrors:
+        The list of URLs of the file, as returned by
+        tuf.mirrors.get_list_of_mirrors().
+
+      get_file_function:
+        A callable function that expects a URL from 'file_mirrors', and that
+        returns a verified 'tuf.util.TempFile' file-like object or raises an
+        exception.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The file could not be fetched. This is raised only when all known
+        mirrors failed to provide a valid copy of the file.
+
+      tuf.NotModifiedError:
+        A mirror reported that the trusted file has not changed.  The
+        remaining mirrors are not tried.
+
+    <Side Effects>
+      The failures are recorded in the mirror scoreboard.
+
+    <Returns>
+      A 'tuf.util.TempFile' file-like object containing the file.
+    """
+
+    # file_mirror (URL): error (Exception)
+    file_mirror_errors = {}
+    file_object = None
+
+    for file_mirror in file_mirrors:
+      try:
+        file_object = get_file_function(file_mirror)
+
+      # The mirror did not fail.
+      except tuf.NotModifiedError:
+        raise
+
+      except Exception as exception:
+        # Remember the error from this mirror, and "reset" the target file.
+        logger.exception('Update failed from ' + file_mirror + '.')
+        file_mirror_errors[file_mirror] = exception
+        file_object = None
+        self._record_mirror_failure(file_mirror, exception)
+      
+      else:
+        break
+
+    if file_object:
+      return file_object
+    
     else:
       logger.error('Failed to update {0} from all mirrors: {1}'.format(
-                       remote_filename, file_mirror_errors))
+                       filepath, file_mirror_errors))
       raise tuf.NoWorkingMirrorError(file_mirror_errors)
 
 
 
 
 
+  def _record_mirror_failure(self, file_mirror, exception):
+    """
+    <Purpose>
+      Non-public method that records, in the mirror scoreboard, that a request
+      for 'file_mirror' failed with 'exception'.  A request that gave up
+      waiting for one of the connections to the mirror host, which were all in
+      use by other downloads, is not a failure of the mirror and is not
+      recorded.
+
+    <Arguments>
+      file_mirror:
+        The URL of the file requested.
+
+      exception:
+        The exception raised by the request.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The mirror scoreboard may be modified.
+
+    <Returns>
+      None.
+    """
+
+    if isinstance(exception, tuf.ConnectionPoolTimeoutError):
+      logger.debug('Not recording a failure of ' + repr(file_mirror) + ','
+                   ' whose connections were in use.')
+      return
+
+    self.mirror_scoreboard.record_failure(file_mirror)
+
+
+
+
+
+  def _get_conditional_request_validators(self, metadata_role,
+                                          expected_version, file_mirror):
+    """
+    <Purpose>
+      Non-public method that returns the validators to request the metadata of
+      'metadata_role' from 'file_mirror' with, if it should be requested only
+      if it has changed.  Only the timestamp metadata, whose version is not
+      known in advance, is requested conditionally, if
+      'tuf.conf.USE_CONDITIONAL_TIMESTAMP_REQUESTS' is True and a trusted copy
+      is available.  Otherwise, its validators are still collected.
+
+    <Arguments>
+      metadata_role:
+        The role name of the metadata (e.g., 'timestamp').
+
+      expected_version:
+        The version number of the metadata requested, or None.
+
+      file_mirror:
+        The URL of the metadata file on a mirror.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A new dict conformant to 'tuf.formats.VALIDATORS_SCHEMA', possibly
+      empty, or None if the metadata should not be requested conditionally.
+    """
+
+    if not tuf.conf.USE_CONDITIONAL_TIMESTAMP_REQUESTS or \
+       metadata_role != 'timestamp' or expected_version is not None:
+      return None
+
+    # Without a trusted copy, the file is requested unconditionally, but the
+    # validators of the copy accepted are kept.
+    if metadata_role not in self.metadata['current']:
+      return {}
+
+    return dict(self._metadata_validators.get(file_mirror, {}))
+
+
+
+
+
+  def _check_metadata_file_changed(self, file_object, metadata_role,
+                                   file_mirror, validators):
+    """
+    <Purpose>
+      Non-public method that ensures the metadata file downloaded from
+      'file_mirror' differs from the currently trusted metadata file of
+      'metadata_role'.  An identical file need not be verified, and
+      'validators' are kept for 'file_mirror', as they describe the trusted
+      file.
+
+    <Arguments>
+      file_object:
+        The downloaded, uncompressed 'tuf.util.TempFile' file-like object.
+
+      metadata_role:
+        The role name of the metadata (e.g., 'timestamp').
+
+      file_mirror:
+        The URL 'file_object' was downloaded from.
+
+      validators:
+        The validators of 'file_object', as returned by the mirror.
+
+    <Exceptions>
+      tuf.NotModifiedError, if the file is identical to the trusted one.
+
+    <Side Effects>
+      'file_object' is closed if it is identical to the trusted file.
+
+    <Returns>
+      None.
+    """
+
+    current_filepath = os.path.join(self.metadata_directory['current'],
+                                    metadata_role + '.json')
+
+    try:
+      with open(current_filepath, 'rb') as current_file_object:
+        current_metadata = current_file_object.read()
+
+    except (IOError, OSError):
+      return
+
+    if file_object.read() == current_metadata:
+      file_object.close_temp_file()
+      self._metadata_validators[file_mirror] = validators
+      raise tuf.NotModifiedError(repr(file_mirror) + ' has not changed.')
+
+
+
+
+
+  def _verify_downloaded_metadata_file(self, file_object, metadata_role,
+                                       expected_version,
+                                       compression_algorithm):
+    """
+    <Purpose>
+      Non-public method that decompresses (if needed) and verifies a metadata
+      file downloaded from a mirror.  Its version number must be
+      'expected_version', or, if the version is unknown, no older than the
+      currently trusted version.  Its signatures and expiration are verified
+      by _verify_uncompressed_metadata_file().
+
+    <Arguments>
+      file_object:
+        A 'tuf.util.TempFile' file-like object containing the downloaded
+        metadata.
+
+      metadata_role:
+        The role name of the metadata (e.g., 'root', 'targets',
+        'targets/linux/x86').
+
+      expected_version:
+        The expected and required version number of the 'metadata_role' file
+        downloaded, or None if it is unknown.
+
+      compression_algorithm:
+        The name of the compression algorithm (e.g., 'gzip') of 'file_object',
+        or None if it is not compressed.
+
+    <Exceptions>
+      tuf.BadVersionNumberError, if the version is not 'expected_version'.
+
+      tuf.ReplayedMetadataError, if the version is older than the trusted one.
+
+      Any exception raised by _verify_uncompressed_metadata_file().
+
+    <Side Effects>
+      'file_object' is decompressed, if 'compression_algorithm' is set.
+
+    <Returns>
+      None.
+    """
+
+    # The file was decompressed as it was downloaded, unless it was downloaded
+    # by _get_file(), so this usually only ensures that the compressed data
+    # was complete.
+    if compression_algorithm is not None:
+      logger.info('Decompressing ' + repr(metadata_role))
+      file_object.decompress_temp_file_object(compression_algorithm,
+                                              tuf.conf.MAX_DECOMPRESSED_LENGTH)
+    
+    else:
+      logger.info('Not decompressing ' + repr(metadata_role))
+    
+    # Verify 'file_object', which is the uncompressed version if it was
+    # decompressed above.
+    metadata_signable = \
+      tuf.util.load_json_string(file_object.read().decode('utf-8'))
+   
+    # If the version number is unspecified, ensure that the version number
+    # downloaded is greater than the currently trusted version number for
+    # 'metadata_role'.
+    version_downloaded = metadata_signable['signed']['version'] 
+    
+    if expected_version is not None:
+      # Verify that the downloaded version matches the version expected by
+      # the caller.
+      if version_downloaded != expected_version:
+        message = \
+          'Downloaded version number: ' + repr(version_downloaded) + '.' \
+          ' Version number MUST be: ' + repr(expected_version)
+        raise tuf.BadVersionNumberError(message) 
+     
+    # The caller does not know which version to download.  Verify that the
+    # downloaded version is at least greater than the one locally available.
+    else:
+      # Verify that the version number of the locally stored
+      # 'timestamp.json', if available, is less than what was downloaded.
+      # Otherwise, accept the new timestamp with version number
+      # 'version_downloaded'.
+      logger.info('metadata_role: ' + repr(metadata_role)) 
+      try:
+        current_version = \
+          self.metadata['current'][metadata_role]['version']
+          
+        if version_downloaded < current_version:
+          raise tuf.ReplayedMetadataError(metadata_role, version_downloaded,
+                                          current_version)
+      
+      except KeyError:
+        logger.info(metadata_role + ' not available locally.')
+
+    self._verify_uncompressed_metadata_file(file_object, metadata_role)
+
+
+
+
+
+  def _get_file_from_hedged_mirrors(self, filepath, file_mirrors,
+                                    get_file_function):
+    """
+    <Purpose>
+      Non-public method that requests a file from 'file_mirrors', in order,
+      without waiting for a slow mirror to fail.  A request is sent to the
+      next mirror whenever the latest request has not succeeded after
+      'tuf.conf.HEDGED_REQUEST_DELAY' seconds, or as soon as every pending
+      request has failed.  The first valid copy of the file is returned, and
+      the pending requests are cancelled.
+
+    <Arguments>
+      filepath:
+        The relative metadata or target filepath, used in log messages.
+
+      file_mirrors:
+        The list of URLs of the file, as returned by
+        tuf.mirrors.get_list_of_mirrors().
+
+      get_file_function:
+        A callable function that expects a URL from 'file_mirrors' and a
+        'threading.Event', and that returns a verified 'tuf.util.TempFile'
+        file-like object or raises an exception.  The download should be
+        abandoned once the event is set.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        The file could not be fetched. This is raised only when all known
+        mirrors failed to provide a valid copy of the file.
+
+      tuf.NotModifiedError:
+        A mirror reported that the trusted file has not changed.  The pending
+        requests are cancelled.
+
+    <Side Effects>
+      Starts a daemon thread per mirror requested.  The threads of cancelled
+      requests exit once they notice the cancellation.
+
+    <Returns>
+      A 'tuf.util.TempFile' file-like object containing the file.
+    """
+
+    delay = tuf.conf.HEDGED_REQUEST_DELAY
+    cancel_event = threading.Event()
+    
+    # Each request puts a (file_mirror, exception) tuple in 'results' when it
+    # completes.  The exception is None for the request that won the race,
+    # which appends its file to 'winning_file_objects'.
+    results = six.moves.queue.Queue()
+    winner_lock = threading.Lock()
+    winning_file_objects = []
+
+    def request_file(file_mirror):
+      try:
+        file_object = get_file_function(file_mirror, cancel_event)
+
+      except Exception as exception:
+        # A request cancelled because another mirror won did not fail, nor
+        # did a mirror whose file has not changed.
+        if not cancel_event.is_set() and \
+           not isinstance(exception, tuf.NotModifiedError):
+          logger.exception('Update failed from ' + file_mirror + '.')
+          self._record_mirror_failure(file_mirror, exception)
+        results.put((file_mirror, exception))
+        return
+
+      # Only the first valid copy is kept.  A later one lost the race.
+      with winner_lock:
+        won = not winning_file_objects
+        if won:
+          winning_file_objects.append(file_object)
+          cancel_event.set()
+
+      if won:
+        results.put((file_mirror, None))
+
+      else:
+        file_object.close_temp_file()
+
+    # file_mirror (URL): error (Exception)
+    file_mirror_errors = {}
+    remaining_mirrors = list(file_mirrors)
+    pending_requests = 0
+    next_request_time = None
+
+    while remaining_mirrors or pending_requests:
+      if remaining_mirrors and (pending_requests == 0 or \
+         timeit.default_timer() >= next_request_time):
+        file_mirror = remaining_mirrors.pop(0)
+        
+        if pending_requests:
+          logger.info('Hedging the request for ' + repr(filepath) + \
+                      ' with ' + file_mirror)
+
+        request_thread = threading.Thread(target=request_file,
+                                          args=(file_mirror,))
+        request_thread.daemon = True
+        request_thread.start()
+        
+        pending_requests = pending_requests + 1
+        next_request_time = timeit.default_timer() + delay
+        continue
+
+      # Wait for a request to complete, but no longer than the time left
+      # before the next mirror should be requested.
+      timeout = None
+      if remaining_mirrors:
+        timeout = max(0, next_request_time - timeit.default_timer())
+
+      try:
+        file_mirror, exception = results.get(timeout=timeout)
+
+      except six.moves.queue.Empty:
+        continue
+
+      pending_requests = pending_requests - 1
+
+      if exception is None:
+        return winning_file_objects[0]
+
+      # The trusted file has not changed, so cancel the other requests.
+      if isinstance(exception, tuf.NotModifiedError):
+        cancel_event.set()
+        raise exception
+
+      file_mirror_errors[file_mirror] = exception
+
+    logger.error('Failed to update {0} from all mirrors: {1}'.format(
+                 filepath, file_mirror_errors))
+    raise tuf.NoWorkingMirrorError(file_mirror_errors)
+
+
+
+
+
   def _safely_get_metadata_file(self, metadata_role, metadata_filepath,
                                 uncompressed_fileinfo,
                                 compression=None, compressed_fileinfo=None):
@@ -1290,7 +2836,8 @@ class Updater(object):
   # for "unsafe" download? This should induce safer and more readable code.
   def _get_file(self, filepath, verify_file_function, file_type,
                 file_length, compression=None,
-                verify_compressed_file_function=None, download_safely=True):
+                verify_compressed_file_function=None, download_safely=True,
+                hash_algorithms=None, temp_file=None):
     """
     <Purpose>
       Non-public method that tries downloading, up to a certain length, a
@@ -1329,6 +2876,16 @@ class Updater(object):
       download_safely:
         A boolean switch to toggle safe or unsafe download of the file.
 
+      hash_algorithms:
+        An optional list of hash algorithms whose digests are computed while
+        the file is downloaded (e.g., the algorithms of its trusted hashes).
+
+      temp_file:
+        An optional 'tuf.util.TempFile' that the file is downloaded into, and
+        which is returned.  A download interrupted on one mirror is resumed on
+        the next one, and the data received is kept in 'temp_file' if all
+        mirrors fail.  Only used if 'download_safely' is True.
+
     <Exceptions>
       tuf.NoWorkingMirrorError:
         The metadata could not be fetched. This is raised only when all known
@@ -1344,7 +2901,8 @@ class Updater(object):
     """
 
     file_mirrors = tuf.mirrors.get_list_of_mirrors(file_type, filepath,
-                                                   self.mirrors)
+                                                   self.mirrors,
+                                                   self.mirror_scoreboard)
     # file_mirror (URL): error (Exception)
     file_mirror_errors = {}
     file_object = None
@@ -1353,16 +2911,19 @@ class Updater(object):
       try:
         if download_safely:
           file_object = tuf.download.safe_download(file_mirror,
-                                                   file_length)
+            file_length, hash_algorithms, temp_file,
+            mirror_scoreboard=self.mirror_scoreboard)
         else:
           file_object = tuf.download.unsafe_download(file_mirror,
-                                                     file_length)
+            file_length, hash_algorithms,
+            mirror_scoreboard=self.mirror_scoreboard)
 
         if compression is not None:
           if verify_compressed_file_function is not None: 
             verify_compressed_file_function(file_object)  
           logger.info('Decompressing '+str(file_mirror))
-          file_object.decompress_temp_file_object(compression)
+          file_object.decompress_temp_file_object(compression,
+            tuf.conf.MAX_DECOMPRESSED_LENGTH)
         
         else:
           logger.info('Not decompressing '+str(file_mirror))
@@ -1377,6 +2938,12 @@ class Updater(object):
         logger.exception('Update failed from '+file_mirror+'.')
         file_mirror_errors[file_mirror] = exception
         file_object = None
+        self._record_mirror_failure(file_mirror, exception)
+
+        # A complete 'temp_file' failed verification, so none of its data can
+        # be trusted.  An incomplete one is resumed on the next mirror.
+        if temp_file is not None and temp_file.get_length() >= file_length:
+          temp_file.truncate()
       
       else:
         break
@@ -1428,10 +2995,15 @@ class Updater(object):
         failure but rather indicates that all possible ways to update the
         metadata have been tried and failed.
 
+      tuf.ExpiredMetadataError:
+        The mirror reported that the trusted 'timestamp' metadata has not
+        changed, and it has expired.
+
     <Side Effects>
       The metadata file belonging to 'metadata_role' is downloaded from a
       repository mirror.  If the metadata is valid, it is stored in the 
-      metadata store.
+      metadata store.  The timestamp metadata is only downloaded again if it
+      has changed, if 'tuf.conf.USE_CONDITIONAL_TIMESTAMP_REQUESTS' is True.
 
     <Returns>
       None.
@@ -1439,7 +3011,6 @@ class Updater(object):
 
     # Construct the metadata filename as expected by the download/mirror modules.
     metadata_filename = metadata_role + '.json'
-    uncompressed_metadata_filename = metadata_filename
    
     # The 'snapshot' or Targets metadata may be compressed.  Add the appropriate
     # extension to 'metadata_filename'. 
@@ -1466,6 +3037,58 @@ class Updater(object):
     # metadata, but this is easily extend to "unsafe" metadata as well as
     # "safe" targets.
    
+    remote_filename = self._get_remote_metadata_filename(metadata_filename,
+                                                         version)
+   
+    logger.info('Verifying ' + repr(metadata_role) + ' requesting version: ' + repr(version))
+    try:
+      metadata_file_object = \
+        self._get_metadata_file(metadata_role, remote_filename,
+                                upperbound_filelength, version,
+                                compression_algorithm)
+
+    # The trusted metadata is unchanged on the mirror, so it is kept.  Its
+    # signatures were verified when it was installed, but it may have expired
+    # since.
+    except tuf.NotModifiedError:
+      logger.info(repr(metadata_role) + ' has not changed.')
+      self._ensure_not_expired(self.metadata['current'][metadata_role],
+                               metadata_role)
+      return
+
+    self._install_metadata_file(metadata_role, metadata_file_object,
+                                compression_algorithm)
+
+
+
+
+
+  def _get_remote_metadata_filename(self, metadata_filename, version):
+    """
+    <Purpose>
+      Non-public method that returns the filename of a metadata file on the
+      repository mirrors.  If the repository uses consistent snapshots, the
+      filename is prefixed with the version number requested.
+
+    <Arguments>
+      metadata_filename:
+        The metadata filename, possibly with a compression extension (e.g.,
+        'targets/unclaimed.json.gz').
+
+      version:
+        The version number of the metadata file requested, or None if it is
+        unknown.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      The metadata filename, relative to the metadata directory of a mirror.
+    """
+
     remote_filename = metadata_filename
     filename_version = ''
 
@@ -1473,16 +3096,57 @@ class Updater(object):
       filename_version = version
       dirname, basename = os.path.split(remote_filename)
       remote_filename = os.path.join(dirname, str(filename_version) + '.' + basename)
-   
-    logger.info('Verifying ' + repr(metadata_role) + ' requesting version: ' + repr(version))
-    metadata_file_object = \
-      self._get_metadata_file(metadata_role, remote_filename,
-                              upperbound_filelength, version,
-                              compression_algorithm)
 
-    # The metadata has been verified. Move the metadata file into place.
-    # First, move the 'current' metadata file to the 'previous' directory
-    # if it exists.
+    return remote_filename
+
+
+
+
+
+  def _install_metadata_file(self, metadata_role, metadata_file_object,
+                             compression_algorithm=None):
+    """
+    <Purpose>
+      Non-public method that 'installs' a verified metadata file of
+      'metadata_role'.  The currently trusted file is moved to the 'previous'
+      directory, the new file is moved to the 'current' directory, and the
+      metadata stores are updated.
+
+    <Arguments>
+      metadata_role:
+        The name of the metadata. This is a role name and should not end
+        in '.json'.  Examples: 'root', 'targets', 'targets/linux/x86'.
+
+      metadata_file_object:
+        The verified (and decompressed) 'tuf.util.TempFile' file-like object
+        of 'metadata_role', as returned by _get_metadata_file().
+
+      compression_algorithm:
+        The compression algorithm (e.g., 'gzip') of the file downloaded, or
+        None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      Metadata files are moved, and the current and previous metadata stores
+      are updated.  If 'metadata_role' is 'root', the key and role databases
+      are rebuilt.
+
+    <Returns>
+      None.
+    """
+
+    # Construct the metadata filenames, as in _update_metadata().
+    metadata_filename = metadata_role + '.json'
+    uncompressed_metadata_filename = metadata_filename
+   
+    if compression_algorithm == 'gzip':
+      metadata_filename = metadata_filename + '.gz'
+
+    # The metadata has been verified. Move the metadata file into place.
+    # First, move the 'current' metadata file to the 'previous' directory
+    # if it exists.
     current_filepath = os.path.join(self.metadata_directory['current'],
                                     metadata_filename)
     current_filepath = os.path.abspath(current_filepath)
@@ -1496,12 +3160,13 @@ class Updater(object):
       # Previous metadata might not exist, say when delegations are added.
       tuf.util.ensure_parent_dir(previous_filepath)
       shutil.move(current_filepath, previous_filepath)
+      self._move_parsed_metadata(metadata_filename)
 
     # Next, move the verified updated metadata file to the 'current' directory.
     # Note that the 'move' method comes from tuf.util's TempFile class.
     # 'metadata_file_object' is an instance of tuf.util.TempFile.
-    metadata_signable = \
-      tuf.util.load_json_string(metadata_file_object.read().decode('utf-8'))
+    metadata_bytes = metadata_file_object.read()
+    metadata_signable = tuf.util.load_json_string(metadata_bytes.decode('utf-8'))
     if compression_algorithm == 'gzip':
       current_uncompressed_filepath = \
         os.path.join(self.metadata_directory['current'],
@@ -1528,6 +3193,14 @@ class Updater(object):
     self.metadata['current'][metadata_role] = updated_metadata_object
     self._update_versioninfo(uncompressed_metadata_filename)
 
+    # The next updater need not parse the installed file.
+    if tuf.conf.USE_PARSED_METADATA_CACHE:
+      digest_object = tuf.hash.digest('sha256')
+      digest_object.update(metadata_bytes)
+      self._cache_parsed_metadata('current/' + uncompressed_metadata_filename,
+                                  digest_object.hexdigest(),
+                                  updated_metadata_object)
+
     # Ensure the role and key information of the top-level roles is also updated
     # according to the newly-installed Root metadata.
     if metadata_role == 'root':
@@ -1596,6 +3269,72 @@ class Updater(object):
     <Returns>
       None.
     """
+
+    # Return if 'metadata_role' has not changed.  Otherwise, get the arguments
+    # of the _update_metadata() call that updates it.
+    update_arguments = self._get_metadata_update_arguments(metadata_role,
+                                                           referenced_metadata)
+    if update_arguments is None:
+      return
+
+    upperbound_filelength, version, compression = update_arguments
+
+    try:
+      self._update_metadata(metadata_role, upperbound_filelength, version,
+                            compression)
+
+    except:
+      # The current metadata we have is not current but we couldn't
+      # get new metadata. We shouldn't use the old metadata anymore.
+      # This will get rid of in-memory knowledge of the role and
+      # delegated roles, but will leave delegated metadata files as
+      # current files on disk.
+      # TODO: Should we get rid of the delegated metadata files?
+      # We shouldn't need to, but we need to check the trust
+      # implications of the current implementation.
+      self._delete_metadata(metadata_role)
+      logger.error('Metadata for ' +repr(metadata_role) + ' cannot be updated.')
+      raise
+    
+    else:
+      self._reimport_delegations(metadata_role)
+
+
+
+
+
+  def _get_metadata_update_arguments(self, metadata_role,
+                                     referenced_metadata='snapshot'):
+    """
+    <Purpose>
+      Non-public method that determines whether 'metadata_role' has changed,
+      according to the 'meta' field of 'referenced_metadata'.  See
+      _update_metadata_if_changed().
+
+    <Arguments>
+      metadata_role:
+        The name of the metadata. This is a role name and should not end
+        in '.json'.  Examples: 'root', 'targets', 'targets/linux/x86'.
+
+      referenced_metadata:
+        This is the metadata that provides the role information for
+        'metadata_role' (e.g., 'snapshot').
+        
+    <Exceptions>
+      tuf.RepositoryError:
+        If the referenced metadata is missing.
+
+      tuf.ExpiredMetadataError:
+        If 'metadata_role' has not changed, but the trusted copy has expired.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      None, if 'metadata_role' has not changed.  Otherwise, the
+      (upperbound_filelength, version, compression_algorithm) arguments of the
+      _update_metadata() call that updates 'metadata_role'.
+    """
         
     uncompressed_metadata_filename = metadata_role + '.json'
 
@@ -1632,10 +3371,43 @@ class Updater(object):
       self._ensure_not_expired(self.metadata['current'][metadata_role],
                                metadata_role)
 
-      return
+      return None
     
     logger.debug('Metadata ' + repr(uncompressed_metadata_filename) + ' has changed.')
 
+    upperbound_filelength, compression = \
+      self._get_metadata_download_arguments(metadata_role)
+
+    return upperbound_filelength, expected_versioninfo['version'], compression
+
+
+
+
+
+  def _get_metadata_download_arguments(self, metadata_role):
+    """
+    <Purpose>
+      Non-public method that returns the upper bound of the file length, and
+      the compression algorithm, with which a new version of 'metadata_role'
+      is downloaded.
+
+    <Arguments>
+      metadata_role:
+        The name of the metadata role (e.g., 'snapshot', 'targets/linux').
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      An (upperbound_filelength, compression) tuple.  'compression' is 'gzip'
+      or None.
+    """
+
+    uncompressed_metadata_filename = metadata_role + '.json'
+
     # There might be a compressed version of 'snapshot.json' or Targets
     # metadata available for download.  Check the 'meta' field of
     # 'referenced_metadata' to see if it is listed when 'metadata_role'
@@ -1681,33 +3453,42 @@ class Updater(object):
     # The metadata is considered Targets (or delegated Targets metadata).
     else:
       upperbound_filelength = tuf.conf.DEFAULT_TARGETS_REQUIRED_LENGTH
-    
-    try:
-      self._update_metadata(metadata_role, upperbound_filelength,
-                            expected_versioninfo['version'], compression)
 
-    except:
-      # The current metadata we have is not current but we couldn't
-      # get new metadata. We shouldn't use the old metadata anymore.
-      # This will get rid of in-memory knowledge of the role and
-      # delegated roles, but will leave delegated metadata files as
-      # current files on disk.
-      # TODO: Should we get rid of the delegated metadata files?
-      # We shouldn't need to, but we need to check the trust
-      # implications of the current implementation.
-      self._delete_metadata(metadata_role)
-      logger.error('Metadata for ' +repr(metadata_role) + ' cannot be updated.')
-      raise
-    
-    else:
-      # We need to remove delegated roles because the delegated roles may not
-      # be trusted anymore.
-      if metadata_role == 'targets' or metadata_role.startswith('targets/'):
-        logger.debug('Removing delegated roles of ' + repr(metadata_role) + '.')
-        
-        # TODO: Should we also remove the keys of the delegated roles?
-        tuf.roledb.remove_delegated_roles(metadata_role)
-        self._import_delegations(metadata_role)
+    return upperbound_filelength, compression
+
+
+
+
+
+  def _reimport_delegations(self, metadata_role):
+    """
+    <Purpose>
+      Non-public method that replaces the delegated roles of 'metadata_role'
+      in the role database, after 'metadata_role' has been updated.  Nothing
+      is done if 'metadata_role' is not a Targets role.
+
+    <Arguments>
+      metadata_role:
+        The name of the updated metadata (e.g., 'targets/linux').
+
+    <Exceptions>
+      Any exception raised by _import_delegations().
+
+    <Side Effects>
+      The role and key databases are updated.
+
+    <Returns>
+      None.
+    """
+
+    # We need to remove delegated roles because the delegated roles may not
+    # be trusted anymore.
+    if metadata_role == 'targets' or metadata_role.startswith('targets/'):
+      logger.debug('Removing delegated roles of ' + repr(metadata_role) + '.')
+      
+      # TODO: Should we also remove the keys of the delegated roles?
+      tuf.roledb.remove_delegated_roles(metadata_role)
+      self._import_delegations(metadata_role)
 
 
 
@@ -1894,6 +3675,7 @@ class Updater(object):
     if os.path.exists(current_filepath):
       tuf.util.ensure_parent_dir(previous_filepath)
       os.rename(current_filepath, previous_filepath)
+      self._move_parsed_metadata(metadata_filepath)
 
 
 
@@ -1991,6 +3773,7 @@ class Updater(object):
 
 
 
+  @_hold_metadata_lock
   def all_targets(self):
     """
     <Purpose> 
@@ -2044,6 +3827,82 @@ class Updater(object):
 
 
 
+  def iter_targets(self):
+    """
+    <Purpose>
+      Generate the target information for all the trusted targets on the
+      repository, in the order of all_targets().  The metadata of a delegated
+      role is only loaded, and updated if it has changed, when the iteration
+      reaches the role, and no list of all the targets is built; so a caller
+      that stops early does not fetch the remaining roles.  The metadata of
+      every role visited is kept in the metadata store, as by all_targets(),
+      so memory still grows with the number of roles and targets visited.
+      Each target conforms to 'tuf.formats.TARGETFILE_SCHEMA'.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      tuf.RepositoryError:
+        If the metadata for the 'targets' role is missing from
+        the 'snapshot' metadata.
+
+      tuf.NoWorkingMirrorError:
+        If the changed metadata of a delegated role cannot be downloaded.
+        Targets of the roles before it have already been generated.
+
+    <Side Effects>
+      The metadata for target roles is updated and stored, as the iteration
+      proceeds.
+
+    <Returns>
+      A generator of targets, conformant to 'tuf.formats.TARGETFILE_SCHEMA'.
+    """
+
+    if 'targets.json' not in self.metadata['current']['snapshot']['meta']:
+      message = 'The snapshot metadata file is missing the targets.json entry.'
+      raise tuf.RepositoryError(message)
+
+    # The roles are visited in sorted order of their names, as in
+    # all_targets().  A role is sorted before its delegated roles, so these can
+    # be added to the heap of roles to visit when the role itself is visited.
+    role_names = ['targets']
+    visited_role_names = set()
+
+    while role_names:
+      role_name = heapq.heappop(role_names)
+
+      if role_name in visited_role_names:
+        continue
+
+      visited_role_names.add(role_name)
+
+      # The metadata lock is not held while the caller handles the targets.
+      with self._metadata_lock:
+        # The metadata of 'targets' is updated by refresh().
+        if role_name != 'targets':
+          self._refresh_targets_metadata(role_name, include_delegations=False)
+
+        # Do we have metadata for 'role_name'?
+        if role_name not in self.metadata['current']:
+          logger.debug('No metadata for ' + repr(role_name) + '.  Unable' + \
+                       ' to determine targets.')
+          continue
+
+        role_metadata = self.metadata['current'][role_name]
+
+      for child_role in role_metadata.get('delegations', {}).get('roles', []):
+        heapq.heappush(role_names, child_role['name'])
+
+      for filepath, fileinfo in six.iteritems(role_metadata['targets']):
+        yield {'filepath': filepath, 'fileinfo': fileinfo}
+
+    self._save_parsed_metadata_cache()
+
+
+
+
+
   def _refresh_targets_metadata(self, rolename='targets', include_delegations=False):
     """
     <Purpose>
@@ -2079,6 +3938,65 @@ class Updater(object):
       None.
     """
 
+    roles_to_update = self._get_targets_roles_to_refresh(rolename,
+                                                         include_delegations)
+
+    # Download the changed metadata of the roles concurrently.  It is still
+    # verified one role at a time below, parent roles first.
+    self._prefetch_metadata(roles_to_update)
+
+    # Iterate the roles to update, load their metadata files, and update them
+    # if changed.  The current metadata of most roles was already loaded by
+    # _prefetch_metadata(), and is not parsed again.
+    try:
+      for rolename in roles_to_update:
+        self._load_metadata_from_file('previous', rolename)
+
+        if rolename not in self.metadata['current']:
+          self._load_metadata_from_file('current', rolename)
+
+        self._update_metadata_if_changed(rolename)
+
+    finally:
+      self._discard_prefetched_metadata()
+
+    # Save the metadata parsed for all the delegated roles at once, rather
+    # than role by role.
+    if include_delegations:
+      self._save_parsed_metadata_cache()
+
+
+
+
+
+  def _get_targets_roles_to_refresh(self, rolename, include_delegations):
+    """
+    <Purpose>
+      Non-public method that returns the roles refreshed by
+      _refresh_targets_metadata(rolename, include_delegations), in the order
+      they must be refreshed (i.e., parent roles first).
+
+    <Arguments>
+      rolename:
+        The name of a Targets role (e.g., 'targets/linux/x86').
+
+      include_delegations:
+         Boolean indicating if the delegated roles set by 'rolename' should be
+         included.
+
+    <Exceptions>
+      tuf.RepositoryError:
+        If the metadata file for the 'targets' role is missing from the
+        'snapshot' metadata.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A sorted list of role names.  The 'targets' role is excluded, as it is
+      updated by refresh().
+    """
+
     roles_to_update = []
 
     # See if this role provides metadata and, if we're including delegations,
@@ -2106,70 +4024,491 @@ class Updater(object):
         message = 'The snapshot metadata file is missing the targets.json entry.'
         raise tuf.RepositoryError(message)
   
-    # If there is nothing to refresh, we are done.
-    if not roles_to_update:
-      return
-
     # Sort the roles so that parent roles always come first.
     roles_to_update.sort()
     logger.debug('Roles to update: '+repr(roles_to_update)+'.')
 
-    # Iterate 'roles_to_update', load its metadata file, and update it if 
-    # changed.
-    for rolename in roles_to_update:
-      self._load_metadata_from_file('previous', rolename)
-      self._load_metadata_from_file('current', rolename)
+    return roles_to_update
 
-      self._update_metadata_if_changed(rolename)
 
 
 
 
-
-  def refresh_targets_metadata_chain(self, rolename):
+  def _get_metadata_to_prefetch(self, role_names, referenced_meta=None):
     """
     <Purpose>
-      Refresh the minimum targets metadata of 'rolename'.  If 'rolename' is
-      'targets/claimed/3.3/django', refresh the metadata of the following roles:
-      
-      targets.json
-      targets/claimed.json
-      targets/claimed/3.3.json
-
-      Note that 'targets/claimed/3.3/django.json' is not refreshed here.
-      
-      The metadata of the 'targets' role is updated in refresh() by the 
-      _update_metadata_if_changed('targets') call, not here.  Delegated roles
-      are not loaded when the repository is first initialized; they can be
-      loaded from disk, updated if they have changed, and stored to the
-      'self.metadata' store by this method.  This method may be called
-      before targets_of_role('rolename') so that the most up-to-date metadata is
-      available to verify the target files of 'rolename', including the metadata 
-      of 'rolename'.
+      Non-public method that determines which of the 'role_names' roles have
+      a newer version listed in the current snapshot metadata than the
+      version trusted by the client, and how each would be downloaded.  The
+      trusted version is read from the metadata store, into which the current
+      metadata of roles not yet loaded is loaded first.
 
     <Arguments>
-      rolename:
-        This is a full delegated rolename and should not end in '.json'.
-        Example: 'targets/linux/x86'.
-      
-    <Exceptions>
-      tuf.FormatError:
-        If any of the arguments are improperly formatted.
+      role_names:
+        A list of role names (e.g., 'targets/unclaimed').
 
-      tuf.RepositoryError:
-        If the metadata of any of the parent roles of 'rolename' is missing
-        from the 'snapshot.json' metadata file.
+      referenced_meta:
+        The 'meta' field of the metadata that lists the versions of the
+        'role_names' roles, or None to use the current snapshot metadata.
+
+    <Exceptions>
+      None.
 
     <Side Effects>
-      The metadata of the parent roles of 'rolename' are loaded from disk and
-      updated if they have changed.  Metadata is removed from the role database
-      if it has expired.
+      The current metadata of roles not yet loaded is loaded into the metadata
+      store (see _load_metadata_from_file()), so the caller must hold the
+      metadata lock.
 
     <Returns>
-      A list of the roles that have been updated, loaded, and are valid.
+      A list of (metadata_role, remote_filename, upperbound_filelength)
+      tuples, in the order of 'role_names'.
     """
-    
-    # Do the arguments have the correct format? 
+
+    if referenced_meta is None:
+      referenced_meta = self.metadata['current']['snapshot']['meta']
+
+    metadata_to_prefetch = []
+
+    for role_name in role_names:
+      metadata_filename = role_name + '.json'
+      versioninfo = referenced_meta.get(metadata_filename)
+
+      # _update_metadata_if_changed() reports roles missing from snapshot.
+      if versioninfo is None:
+        continue
+
+      # Roles not yet loaded are loaded now, once, through the parsed metadata
+      # cache; the caller does not load them again.
+      if role_name not in self.metadata['current']:
+        try:
+          self._load_metadata_from_file('current', role_name)
+
+        except (tuf.Error, KeyError, TypeError):
+          logger.debug('Cannot load the current metadata of ' + repr(role_name))
+
+      trusted_version = None
+      if role_name in self.metadata['current']:
+        trusted_version = self.metadata['current'][role_name]['version']
+
+      if trusted_version is not None and \
+         versioninfo['version'] <= trusted_version:
+        continue
+
+      upperbound_filelength, compression = \
+        self._get_metadata_download_arguments(role_name)
+
+      if compression == 'gzip':
+        metadata_filename = metadata_filename + '.gz'
+
+      remote_filename = self._get_remote_metadata_filename(metadata_filename,
+                                                           versioninfo['version'])
+      metadata_to_prefetch.append((role_name, remote_filename,
+                                   upperbound_filelength))
+
+    return metadata_to_prefetch
+
+
+
+
+
+  def _prefetch_metadata(self, role_names):
+    """
+    <Purpose>
+      Non-public method that concurrently downloads the changed metadata of
+      the 'role_names' roles, on a pool of at most
+      'tuf.conf.MAX_CONCURRENT_DOWNLOADS' (and
+      'tuf.conf.MAX_CONNECTIONS_PER_MIRROR') threads.  The downloaded files are
+      not verified here; the metadata of a delegated role can only be
+      verified after its parent role has been updated.  They are verified by
+      _get_metadata_file() when each role is updated, in order, and
+      downloaded again if they are not valid.  Nothing is done if fewer than
+      two roles have changed.
+
+    <Arguments>
+      role_names:
+        A list of Targets role names, parent roles first.
+
+    <Exceptions>
+      None.  Failed downloads are logged, and retried by _get_metadata_file().
+
+    <Side Effects>
+      The downloaded files are stored in 'self._prefetched_metadata' until
+      they are used, or discarded by _discard_prefetched_metadata().
+
+    <Returns>
+      None.
+    """
+
+    metadata_to_prefetch = self._get_metadata_to_prefetch(role_names)
+
+    if len(metadata_to_prefetch) < 2:
+      return
+
+    logger.info('Prefetching ' + str(len(metadata_to_prefetch)) + \
+                ' metadata files.')
+
+    self._prefetched_metadata.update(
+      self._download_metadata_to_prefetch(metadata_to_prefetch))
+
+
+
+
+
+  def _download_metadata_to_prefetch(self, metadata_to_prefetch):
+    """
+    <Purpose>
+      Non-public method that concurrently downloads the metadata files listed
+      in 'metadata_to_prefetch', on a pool of at most
+      'tuf.conf.MAX_CONCURRENT_DOWNLOADS' threads.  The files are not
+      verified.  Since they are requested from the same mirrors, the pool is
+      no larger than 'tuf.conf.MAX_CONNECTIONS_PER_MIRROR', so that no thread
+      waits for a connection to be released.
+
+    <Arguments>
+      metadata_to_prefetch:
+        A list of (metadata_role, remote_filename, upperbound_filelength)
+        tuples, as returned by _get_metadata_to_prefetch().
+
+    <Exceptions>
+      None.  Failed downloads are logged.
+
+    <Side Effects>
+      The failures are recorded in the mirror scoreboard.
+
+    <Returns>
+      A dict of the remote filenames of the files downloaded to their
+      'tuf.util.TempFile' objects.
+    """
+
+    downloaded_metadata = {}
+
+    if not metadata_to_prefetch:
+      return downloaded_metadata
+
+    def prefetch_metadata_worker(metadata_to_download):
+      metadata_role, remote_filename, upperbound_filelength = \
+        metadata_to_download
+      file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', remote_filename,
+                                                     self.mirrors,
+                                                     self.mirror_scoreboard)
+
+      # Compressed metadata is decompressed as it is downloaded.
+      compression = None
+      if remote_filename.endswith('.gz'):
+        compression = 'gzip'
+
+      for file_mirror in file_mirrors:
+        try:
+          file_object = tuf.download.unsafe_download(file_mirror,
+            upperbound_filelength, mirror_scoreboard=self.mirror_scoreboard,
+            compression=compression)
+
+        except Exception as exception:
+          logger.warning('Could not prefetch ' + repr(file_mirror) + '.')
+          self._record_mirror_failure(file_mirror, exception)
+
+        else:
+          return remote_filename, file_object
+
+      return remote_filename, None
+
+    thread_pool = ThreadPool(min(tuf.conf.MAX_CONCURRENT_DOWNLOADS,
+                                 tuf.conf.MAX_CONNECTIONS_PER_MIRROR,
+                                 len(metadata_to_prefetch)))
+
+    try:
+      for remote_filename, file_object in \
+        thread_pool.imap_unordered(prefetch_metadata_worker,
+                                   metadata_to_prefetch):
+        if file_object is not None:
+          downloaded_metadata[remote_filename] = file_object
+
+    finally:
+      thread_pool.close()
+      thread_pool.join()
+
+    return downloaded_metadata
+
+
+
+
+
+  def _prefetch_top_level_metadata(self):
+    """
+    <Purpose>
+      Non-public method that downloads, without modifying the trusted
+      metadata, the top-level metadata files that refresh() would download:
+      the timestamp metadata, and the snapshot, root, and targets metadata
+      whose versions, as listed in the downloaded timestamp and snapshot
+      metadata, are newer than the trusted ones.  The downloaded files are not
+      verified here, only parsed to find the versions they list.  The files
+      are verified by refresh() when they are used.
+
+      The timestamp metadata is requested conditionally, as in refresh().  The
+      validators of a changed copy are not kept, as it has not been verified;
+      the next request downloads it once more.
+
+      The files are downloaded without holding the metadata lock, so that
+      target lookups are not blocked by the network.  The lock is held
+      briefly to read the trusted state each download depends on (and to
+      load it if needed), and to keep the validators of an unchanged
+      timestamp metadata file.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError, if the timestamp metadata cannot be downloaded
+      from any mirror.
+
+    <Side Effects>
+      The failures are recorded in the mirror scoreboard.
+
+    <Returns>
+      None, if the timestamp metadata has not changed.  Otherwise, a dict of
+      remote filenames to 'tuf.util.TempFile' objects, for
+      'self._prefetched_metadata'.
+    """
+
+    file_mirrors = tuf.mirrors.get_list_of_mirrors('meta', 'timestamp.json',
+                                                   self.mirrors,
+                                                   self.mirror_scoreboard)
+
+    with self._metadata_lock:
+      mirror_validators = [(file_mirror,
+        self._get_conditional_request_validators('timestamp', None,
+                                                 file_mirror))
+        for file_mirror in file_mirrors]
+
+    # file_mirror (URL): error (Exception)
+    file_mirror_errors = {}
+    timestamp_file_object = None
+
+    for file_mirror, validators in mirror_validators:
+      try:
+        timestamp_file_object = tuf.download.unsafe_download(file_mirror,
+          tuf.conf.DEFAULT_TIMESTAMP_REQUIRED_LENGTH,
+          mirror_scoreboard=self.mirror_scoreboard, validators=validators)
+
+      except tuf.NotModifiedError:
+        return None
+
+      except Exception as exception:
+        logger.warning('Could not prefetch ' + repr(file_mirror) + '.')
+        file_mirror_errors[file_mirror] = exception
+        self._record_mirror_failure(file_mirror, exception)
+
+      else:
+        break
+
+    if timestamp_file_object is None:
+      raise tuf.NoWorkingMirrorError(file_mirror_errors)
+
+    if validators is not None:
+      with self._metadata_lock:
+        try:
+          self._check_metadata_file_changed(timestamp_file_object, 'timestamp',
+                                            file_mirror, validators)
+
+        except tuf.NotModifiedError:
+          return None
+
+    prefetched_metadata = {'timestamp.json': timestamp_file_object}
+
+    # The snapshot metadata listed in the timestamp metadata, and the root and
+    # targets metadata listed in that snapshot metadata.  Invalid files are
+    # reported by refresh().
+    referenced_meta = self._get_prefetched_metadata_meta(timestamp_file_object)
+
+    for role_names in [['snapshot'], ['root', 'targets']]:
+      if referenced_meta is None:
+        break
+
+      with self._metadata_lock:
+        metadata_to_prefetch = self._get_metadata_to_prefetch(role_names,
+                                                              referenced_meta)
+
+      downloaded_metadata = \
+        self._download_metadata_to_prefetch(metadata_to_prefetch)
+      prefetched_metadata.update(downloaded_metadata)
+
+      referenced_meta = None
+      for metadata_role, remote_filename, upperbound_filelength in \
+        metadata_to_prefetch:
+        if metadata_role == 'snapshot' and \
+           remote_filename in downloaded_metadata:
+          referenced_meta = self._get_prefetched_metadata_meta(
+            downloaded_metadata[remote_filename])
+
+    return prefetched_metadata
+
+
+
+
+
+  def _get_prefetched_metadata_meta(self, file_object):
+    """
+    <Purpose>
+      Non-public method that returns the 'meta' field of a downloaded, and not
+      yet verified, timestamp or snapshot metadata file.
+
+    <Arguments>
+      file_object:
+        The uncompressed 'tuf.util.TempFile' file-like object.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      The 'meta' field, or None if the file cannot be parsed.
+    """
+
+    try:
+      metadata_signable = \
+        tuf.util.load_json_string(file_object.read().decode('utf-8'))
+      referenced_meta = metadata_signable['signed']['meta']
+
+      if not isinstance(referenced_meta, dict):
+        return None
+
+    except (tuf.Error, KeyError, TypeError, ValueError):
+      return None
+
+    return referenced_meta
+
+
+
+
+
+  def _get_prefetched_metadata_file(self, metadata_role, remote_filename,
+                                    expected_version, compression_algorithm):
+    """
+    <Purpose>
+      Non-public method that returns the prefetched copy of 'remote_filename',
+      if there is one and it is valid.  See _prefetch_metadata().
+
+    <Arguments>
+      metadata_role:
+        The role name of the metadata (e.g., 'targets/linux/x86').
+
+      remote_filename:
+        The relative file path (on the remote repository) of 'metadata_role'.
+
+      expected_version:
+        The expected and required version number of the file, or None.
+
+      compression_algorithm:
+        The name of the compression algorithm (e.g., 'gzip'), or None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The prefetched copy is removed from 'self._prefetched_metadata', and
+      closed if it is not valid.
+
+    <Returns>
+      A verified 'tuf.util.TempFile' file-like object, or None.
+    """
+
+    file_object = self._prefetched_metadata.pop(remote_filename, None)
+
+    if file_object is None:
+      return None
+
+    try:
+      self._verify_downloaded_metadata_file(file_object, metadata_role,
+                                            expected_version,
+                                            compression_algorithm)
+
+    except Exception:
+      logger.exception('The prefetched ' + repr(remote_filename) + \
+                       ' is not valid.')
+      file_object.close_temp_file()
+      return None
+
+    return file_object
+
+
+
+
+
+  def _discard_prefetched_metadata(self):
+    """
+    <Purpose>
+      Non-public method that closes the prefetched metadata files that were
+      not used.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      'self._prefetched_metadata' is emptied.
+
+    <Returns>
+      None.
+    """
+
+    for file_object in six.itervalues(self._prefetched_metadata):
+      file_object.close_temp_file()
+
+    self._prefetched_metadata.clear()
+
+
+
+
+
+  @_hold_metadata_lock
+  def refresh_targets_metadata_chain(self, rolename):
+    """
+    <Purpose>
+      Refresh the minimum targets metadata of 'rolename'.  If 'rolename' is
+      'targets/claimed/3.3/django', refresh the metadata of the following roles:
+      
+      targets.json
+      targets/claimed.json
+      targets/claimed/3.3.json
+
+      Note that 'targets/claimed/3.3/django.json' is not refreshed here.
+      
+      The metadata of the 'targets' role is updated in refresh() by the 
+      _update_metadata_if_changed('targets') call, not here.  Delegated roles
+      are not loaded when the repository is first initialized; they can be
+      loaded from disk, updated if they have changed, and stored to the
+      'self.metadata' store by this method.  This method may be called
+      before targets_of_role('rolename') so that the most up-to-date metadata is
+      available to verify the target files of 'rolename', including the metadata 
+      of 'rolename'.
+
+    <Arguments>
+      rolename:
+        This is a full delegated rolename and should not end in '.json'.
+        Example: 'targets/linux/x86'.
+      
+    <Exceptions>
+      tuf.FormatError:
+        If any of the arguments are improperly formatted.
+
+      tuf.RepositoryError:
+        If the metadata of any of the parent roles of 'rolename' is missing
+        from the 'snapshot.json' metadata file.
+
+    <Side Effects>
+      The metadata of the parent roles of 'rolename' are loaded from disk and
+      updated if they have changed.  Metadata is removed from the role database
+      if it has expired.
+
+    <Returns>
+      A list of the roles that have been updated, loaded, and are valid.
+    """
+    
+    # Do the arguments have the correct format? 
     # Ensure the arguments have the appropriate number of objects and object
     # types, and that all dict keys are properly named.
     # Raise 'tuf.FormatError' if the check fail.
@@ -2231,14 +4570,23 @@ class Updater(object):
     parent_roles.sort()
     logger.debug('Roles to update: ' + repr(parent_roles) + '.')
 
-    # Iterate 'parent_roles', load each role's metadata file from disk, and
-    # update it if it has changed.  
+    # Download the changed metadata of 'parent_roles' concurrently.
+    self._prefetch_metadata(parent_roles)
+
+    # Iterate 'parent_roles', load each role's metadata file from disk, unless
+    # _prefetch_metadata() already loaded it, and update it if it has changed.
     refreshed_chain = []
-    for rolename in parent_roles:
-      self._load_metadata_from_file('previous', rolename)
-      self._load_metadata_from_file('current', rolename)
+    try:
+      for rolename in parent_roles:
+        self._load_metadata_from_file('previous', rolename)
+
+        if rolename not in self.metadata['current']:
+          self._load_metadata_from_file('current', rolename)
+
+        self._update_metadata_if_changed(rolename)
 
-      self._update_metadata_if_changed(rolename)
+    finally:
+      self._discard_prefetched_metadata()
 
     return refreshed_chain
 
@@ -2316,6 +4664,7 @@ class Updater(object):
 
 
 
+  @_hold_metadata_lock
   def targets_of_role(self, rolename='targets'):
     """
     <Purpose> 
@@ -2370,6 +4719,7 @@ class Updater(object):
 
 
 
+  @_hold_metadata_lock
   def target(self, target_filepath):
     """
     <Purpose>
@@ -2409,8 +4759,18 @@ class Updater(object):
     if not target_filepath.startswith('/'):
       target_filepath = '/' + target_filepath
 
-    # Get target by looking at roles in order of priority tags.
-    target = self._preorder_depth_first_walk(target_filepath)
+    # Use the target resolved by an earlier call, if none of the roles
+    # searched for it have changed.  Otherwise, get target by looking at roles
+    # in order of priority tags.
+    target = self._get_cached_target(target_filepath)
+
+    if target is None:
+      visited_role_names = []
+      target = self._preorder_depth_first_walk(target_filepath,
+                                               visited_role_names)
+
+      if target is not None:
+        self._cache_target(target_filepath, target, visited_role_names)
 
     # Raise an exception if the target information could not be retrieved.
     if target is None:
@@ -2426,7 +4786,8 @@ class Updater(object):
 
 
 
-  def _preorder_depth_first_walk(self, target_filepath):
+  def _preorder_depth_first_walk(self, target_filepath,
+                                 visited_role_names=None):
     """
     <Purpose>
       Non-public method that interrogates the tree of target delegations in
@@ -2438,6 +4799,9 @@ class Updater(object):
         The path to the target file on the repository. This will be relative to
         the 'targets' (or equivalent) directory on a given mirror.
 
+      visited_role_names:
+        An optional list to which the name of each role searched is appended.
+
     <Exceptions>
       tuf.FormatError:
         If 'target_filepath' is improperly formatted.
@@ -2454,9 +4818,12 @@ class Updater(object):
     """
 
     target = None
-    current_metadata = self.metadata['current']
     role_names = ['targets']
 
+    # The hash of 'target_filepath' is needed to search roles delegated by
+    # 'path_hash_prefixes'.  Compute it once for the whole walk.
+    target_filepath_hash = self._get_target_hash(target_filepath)
+
     # Ensure the client has the most up-to-date version of 'targets.json'.
     # Raise 'tuf.NoWorkingMirrorError' if the changed metadata cannot be
     # successfully downloaded and 'tuf.RepositoryError' if the referenced
@@ -2478,40 +4845,11 @@ class Updater(object):
       # which this function has checked above.
       self._refresh_targets_metadata(role_name, include_delegations=False)
 
-      role_metadata = current_metadata[role_name]
-      targets = role_metadata['targets']
-      delegations = role_metadata.get('delegations', {})
-      child_roles = delegations.get('roles', [])
-      target = self._get_target_from_targets_role(role_name, targets,
-                                                  target_filepath)
-
-      if target is None:
-
-        child_roles_to_visit = []
-        # NOTE: This may be a slow operation if there are many delegated roles.
-        for child_role in child_roles:
-          child_role_name = self._visit_child_role(child_role, target_filepath)
-          if not child_role['backtrack'] and child_role_name is not None:
-            logger.debug('Adding child role '+repr(child_role_name))
-            logger.debug('Not backtracking to other roles.')
-            role_names = []
-            child_roles_to_visit.append(child_role_name)
-            break
-          
-          elif child_role_name is None:
-            logger.debug('Skipping child role '+repr(child_role_name))
-          
-          else:
-            logger.debug('Adding child role '+repr(child_role_name))
-            child_roles_to_visit.append(child_role_name)
-
-        # Push 'child_roles_to_visit' in reverse order of appearance onto
-        # 'role_names'.  Roles are popped from the end of the 'role_names' list.
-        child_roles_to_visit.reverse()
-        role_names.extend(child_roles_to_visit)
+      if visited_role_names is not None:
+        visited_role_names.append(role_name)
 
-      else:
-        logger.debug('Found target in current role '+repr(role_name))
+      target = self._search_targets_role(role_name, target_filepath,
+                                         role_names, target_filepath_hash)
 
     return target
 
@@ -2519,10 +4857,240 @@ class Updater(object):
 
 
 
-  def _get_target_from_targets_role(self, role_name, targets, target_filepath):
+  def _get_cached_target(self, target_filepath):
     """
     <Purpose>
-      Non-public method that determines whether the targets role with the given
+      Non-public method that returns the target information of
+      'target_filepath' cached by _cache_target(), if it is still valid.  It
+      is valid if the current snapshot lists the same versions of the roles
+      that were searched to resolve it, and none of them has expired.
+      Otherwise, it is evicted from the cache.
+
+    <Arguments>
+      target_filepath:
+        The path to the target file on the repository, with a leading '/'.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      The cache entry of 'target_filepath' is marked as the most recently
+      used, or evicted.
+
+    <Returns>
+      The target information for 'target_filepath', conformant to
+      'tuf.formats.TARGETFILE_SCHEMA', or None if it is not cached.
+    """
+
+    cached_target = self._target_cache.pop(target_filepath, None)
+
+    if cached_target is None:
+      return None
+
+    target, role_versions, expires_timestamp = cached_target
+
+    if expires_timestamp < int(time.time()) or \
+       self._get_snapshot_versions(role_versions) != role_versions:
+      logger.debug('Evicted the cached target ' + repr(target_filepath))
+      return None
+
+    # Re-insert 'target_filepath' as the most recently used entry.
+    self._target_cache[target_filepath] = cached_target
+    logger.debug('Found target ' + repr(target_filepath) + ' in the cache.')
+
+    return target
+
+
+
+
+
+  def _cache_target(self, target_filepath, target, role_names):
+    """
+    <Purpose>
+      Non-public method that caches the target information of
+      'target_filepath', resolved by searching the roles in 'role_names'.  The
+      least recently used targets are evicted to hold at most
+      'tuf.conf.MAX_CACHED_TARGETS' targets.
+
+    <Arguments>
+      target_filepath:
+        The path to the target file on the repository, with a leading '/'.
+
+      target:
+        The target information for 'target_filepath', conformant to
+        'tuf.formats.TARGETFILE_SCHEMA'.
+
+      role_names:
+        The names of the roles searched to resolve 'target_filepath'.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      'self._target_cache' is modified.
+
+    <Returns>
+      None.
+    """
+
+    if tuf.conf.MAX_CACHED_TARGETS < 1:
+      return
+
+    role_versions = self._get_snapshot_versions(role_names)
+
+    if role_versions is None:
+      return
+
+    # The cached target is valid until the first of the roles expires.
+    expires_timestamp = None
+
+    for role_name in role_names:
+      expires_datetime = \
+        iso8601.parse_date(self.metadata['current'][role_name]['expires'])
+      role_expires_timestamp = \
+        tuf.formats.datetime_to_unix_timestamp(expires_datetime)
+
+      if expires_timestamp is None or role_expires_timestamp < expires_timestamp:
+        expires_timestamp = role_expires_timestamp
+
+    self._target_cache.pop(target_filepath, None)
+    self._target_cache[target_filepath] = \
+      (target, role_versions, expires_timestamp)
+
+    while len(self._target_cache) > tuf.conf.MAX_CACHED_TARGETS:
+      self._target_cache.popitem(last=False)
+
+
+
+
+
+  def _get_snapshot_versions(self, role_names):
+    """
+    <Purpose>
+      Non-public method that returns the versions of the 'role_names' roles
+      listed by the current snapshot metadata.
+
+    <Arguments>
+      role_names:
+        An iterable of role names (e.g., 'targets', 'targets/unclaimed').
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      A dict of the role names to their versions, or None if the snapshot
+      metadata, or the current metadata of any role, is not available.
+    """
+
+    snapshot_metadata = self.metadata['current'].get('snapshot')
+
+    if snapshot_metadata is None:
+      return None
+
+    role_versions = {}
+
+    for role_name in role_names:
+      versioninfo = snapshot_metadata['meta'].get(role_name + '.json')
+
+      if versioninfo is None or role_name not in self.metadata['current']:
+        return None
+
+      role_versions[role_name] = versioninfo['version']
+
+    return role_versions
+
+
+
+
+
+  def _search_targets_role(self, role_name, target_filepath, role_names,
+                           target_filepath_hash=None):
+    """
+    <Purpose>
+      Non-public method that performs one step of the preorder depth-first
+      walk of _preorder_depth_first_walk().  The trusted metadata of
+      'role_name' is searched for 'target_filepath'.  If the target is not
+      found, the child roles that may provide it are pushed onto the
+      'role_names' stack, which is emptied first if a child role does not
+      allow backtracking.  The child roles are found with the compiled index
+      of the role's delegations, see _get_delegation_index().
+
+    <Arguments>
+      role_name:
+        The name of the Targets role to search.  Its metadata must be up to
+        date (see _refresh_targets_metadata()).
+
+      target_filepath:
+        The path to the target file on the repository.
+
+      role_names:
+        The stack of role names that remain to be visited by the walk.
+
+      target_filepath_hash:
+        The hash of 'target_filepath' (see _get_target_hash()), or None if it
+        should be computed when needed.
+
+    <Exceptions>
+      tuf.FormatError:
+        If a delegated role has neither "paths" nor "path_hash_prefixes".
+   
+    <Side Effects>
+      'role_names' is modified.
+    
+    <Returns>
+      The target information for 'target_filepath', conformant to
+      'tuf.formats.TARGETFILE_SCHEMA', or None if 'role_name' does not have
+      it.
+    """
+
+    role_metadata = self.metadata['current'][role_name]
+    targets = role_metadata['targets']
+    delegations = role_metadata.get('delegations', {})
+    child_roles = delegations.get('roles', [])
+    target = self._get_target_from_targets_role(role_name, targets,
+                                                target_filepath)
+
+    if target is None:
+
+      child_roles_to_visit = []
+      # Only the child roles delegated 'target_filepath' are returned by the
+      # index, in order of appearance.
+      for child_role in self._get_delegated_child_roles(role_name, child_roles,
+                                                        target_filepath,
+                                                        target_filepath_hash):
+        child_role_name = child_role['name']
+        if not child_role['backtrack']:
+          logger.debug('Adding child role '+repr(child_role_name))
+          logger.debug('Not backtracking to other roles.')
+          del role_names[:]
+          child_roles_to_visit.append(child_role_name)
+          break
+
+        else:
+          logger.debug('Adding child role '+repr(child_role_name))
+          child_roles_to_visit.append(child_role_name)
+
+      # Push 'child_roles_to_visit' in reverse order of appearance onto
+      # 'role_names'.  Roles are popped from the end of the 'role_names' list.
+      child_roles_to_visit.reverse()
+      role_names.extend(child_roles_to_visit)
+
+    else:
+      logger.debug('Found target in current role '+repr(role_name))
+
+    return target
+
+
+
+
+
+  def _get_target_from_targets_role(self, role_name, targets, target_filepath):
+    """
+    <Purpose>
+      Non-public method that determines whether the targets role with the given
       'role_name' has the target with the name 'target_filepath'.
 
     <Arguments>
@@ -2549,374 +5117,1080 @@ class Updater(object):
 
     target = None
 
-    # Does the current role name have our target?
+    # Does the current role name have our target?  'targets' is keyed by
+    # target filepath, so look it up directly rather than scanning (and
+    # logging) every entry of roles that list many targets.
     logger.debug('Asking role ' + repr(role_name) + ' about target '+\
       repr(target_filepath))
+
+    fileinfo = targets.get(target_filepath)
+
+    if fileinfo is not None:
+      logger.debug('Found target ' + target_filepath + ' in role ' + role_name)
+      target = {'filepath': target_filepath, 'fileinfo': fileinfo}
+
+    else:
+      logger.debug('No target '+target_filepath+' in role '+role_name)
+
+    return target
+
+
+
+
+
+
+  def _get_delegated_child_roles(self, role_name, child_roles,
+                                 target_filepath, target_filepath_hash=None):
+    """
+    <Purpose>
+      Non-public method that returns the child roles of 'role_name' that have
+      been delegated the target with the name 'target_filepath', in their
+      order of appearance.
+
+      Ensure that we explore only delegated roles trusted with the target. We
+      assume conservation of delegated paths in the complete tree of
+      delegations. Note that the call to tuf.util.ensure_all_targets_allowed in
+      _verify_uncompressed_metadata_file should already verify that all
+      targets metadata is valid; i.e. that the targets signed by a delegatee is
+      a proper subset of the targets delegated to it by the delegator.
+      Nevertheless, we check it again here for performance and safety reasons.
+
+      The child roles are looked up in the compiled index of the delegations
+      of 'role_name', so the cost depends on the length of 'target_filepath'
+      and not on the number of child roles.
+
+    <Arguments>
+      role_name:
+        The name of the targets role whose delegations are searched.
+
+      child_roles:
+        The delegated roles listed in the current metadata of 'role_name',
+        containing their paths, path_hash_prefixes, keys and so on.
+
+      target_filepath:
+        The path to the target file on the repository. This will be relative to
+        the 'targets' (or equivalent) directory on a given mirror.
+
+      target_filepath_hash:
+        The hash of 'target_filepath' (see _get_target_hash()), or None if it
+        should be computed when needed.
+
+    <Exceptions>
+      tuf.FormatError:
+        If a child role has neither "paths" nor "path_hash_prefixes".
+   
+    <Side Effects>
+      The delegations of 'role_name' are compiled, if they have changed.
     
-    for filepath, fileinfo in six.iteritems(targets):
-      if filepath == target_filepath:
-        logger.debug('Found target ' + target_filepath + ' in role ' + role_name)
-        target = {'filepath': filepath, 'fileinfo': fileinfo}
+    <Returns>
+      A list of the child roles, conformant to 'tuf.formats.ROLELIST_SCHEMA',
+      that have been delegated 'target_filepath'.
+    """
+
+    delegation_index = self._get_delegation_index(role_name, child_roles)
+    child_role_indices = set()
+
+    # Walk the trie of delegated paths along 'target_filepath'.  A child role
+    # path may be a filepath or directory.  Every child role path that is a
+    # prefix of 'target_filepath' ends at a node on the way.
+    node = delegation_index['paths']
+    child_role_indices.update(node.get('', []))
+
+    for character in target_filepath:
+      node = node.get(character)
+      if node is None:
         break
+
+      child_role_indices.update(node.get('', []))
+
+    # Look up the prefixes of the hash of 'target_filepath', one for each
+    # length of the delegated path hash prefixes.
+    path_hash_prefixes = delegation_index['path_hash_prefixes']
+
+    if len(path_hash_prefixes):
+      if target_filepath_hash is None:
+        target_filepath_hash = self._get_target_hash(target_filepath)
+
+      for prefix_length in delegation_index['path_hash_prefix_lengths']:
+        child_role_indices.update(
+          path_hash_prefixes.get(target_filepath_hash[:prefix_length], []))
+
+    delegated_child_roles = []
+    for child_role_index in sorted(child_role_indices):
+      child_role = child_roles[child_role_index]
+      logger.debug('Child role ' + repr(child_role['name']) + ' has target ' + \
+                   repr(target_filepath))
+      delegated_child_roles.append(child_role)
+
+    return delegated_child_roles
+
+
+
+
+
+  def _get_delegation_index(self, role_name, child_roles):
+    """
+    <Purpose>
+      Non-public method that returns the delegations of 'role_name' compiled
+      for target lookups, compiling them if they have not been compiled since
+      the metadata of 'role_name' was last loaded.
+
+      The "paths" of the child roles are stored in a character trie, where
+      the key '' of a node lists the child roles (by index in 'child_roles')
+      whose path ends at the node.  The "path_hash_prefixes" of the child
+      roles are stored in a dict of hash prefixes to child role indices.  A
+      child role with "path_hash_prefixes" is only looked up by them, even if
+      it also lists "paths".
+
+      TODO: Should the TUF spec restrict the repository to one particular
+      algorithm?  Should we allow the repository to specify in the role
+      dictionary the algorithm used for these generated hashed paths?
+
+    <Arguments>
+      role_name:
+        The name of the targets role whose delegations are compiled.
+
+      child_roles:
+        The delegated roles listed in the current metadata of 'role_name'.
+
+    <Exceptions>
+      tuf.FormatError:
+        If a child role has neither "paths" nor "path_hash_prefixes".
+   
+    <Side Effects>
+      The compiled index is stored in 'self._delegation_indexes'.
+    
+    <Returns>
+      A dict with the 'paths' trie, the 'path_hash_prefixes' dict, and the
+      sorted list of distinct 'path_hash_prefix_lengths'.
+    """
+
+    # The metadata of a role is replaced, not modified, when it is updated.
+    # The index is kept valid by comparing the identity of 'child_roles'; the
+    # cached list cannot be garbage collected and its id() reused.
+    cached_index = self._delegation_indexes.get(role_name)
+    if cached_index is not None and cached_index[0] is child_roles:
+      return cached_index[1]
+
+    paths_trie = {}
+    path_hash_prefixes = {}
+
+    for child_role_index, child_role in enumerate(child_roles):
+      child_role_paths = child_role.get('paths')
+      child_role_path_hash_prefixes = child_role.get('path_hash_prefixes')
+
+      if child_role_path_hash_prefixes is not None:
+        for child_role_path_hash_prefix in child_role_path_hash_prefixes:
+          path_hash_prefixes.setdefault(child_role_path_hash_prefix,
+                                        []).append(child_role_index)
+
+      elif child_role_paths is not None:
+        for child_role_path in child_role_paths:
+          node = paths_trie
+          for character in child_role_path:
+            node = node.setdefault(character, {})
+
+          node.setdefault('', []).append(child_role_index)
+
+      else:
+        # 'role_name' should have been validated when it was downloaded.
+        # The 'paths' or 'path_hash_prefixes' fields should not be missing,
+        # so we raise a format error here in case they are both missing.
+        raise tuf.FormatError(repr(child_role['name']) + ' has neither ' \
+                                  '"paths" nor "path_hash_prefixes".')
+
+    delegation_index = {'paths': paths_trie,
+                        'path_hash_prefixes': path_hash_prefixes,
+                        'path_hash_prefix_lengths': \
+                          sorted(set([len(prefix) for prefix in \
+                                      path_hash_prefixes]))}
+
+    self._delegation_indexes[role_name] = (child_roles, delegation_index)
+
+    return delegation_index
+
+
+
+
+
+  def _get_target_hash(self, target_filepath, hash_function='sha256'):
+    """
+    <Purpose>
+      Non-public method that computes the hash of 'target_filepath'. This is
+      useful in conjunction with the "path_hash_prefixes" attribute in a
+      delegated targets role, which tells us which paths it is implicitly
+      responsible for.
+
+    <Arguments>
+      target_filepath:
+        The path to the target file on the repository. This will be relative to
+        the 'targets' (or equivalent) directory on a given mirror.
+
+      hash_function:
+        The algorithm used by the repository to generate the hashes of the
+        target filepaths.  The repository may optionally organize targets into
+        hashed bins to ease target delegations and role metadata management.
+        The use of consistent hashing allows for a uniform distribution of
+        targets into bins. 
+
+    <Exceptions>
+      None.
+   
+    <Side Effects>
+      None.
+    
+    <Returns>
+      The hash of 'target_filepath'.
+    """
+
+    # Calculate the hash of the filepath to determine which bin to find the 
+    # target.  The client currently assumes the repository (i.e., repository
+    # tool) uses 'hash_function' to generate hashes and UTF-8.
+    digest_object = tuf.hash.digest(hash_function)
+    encoded_target_filepath = target_filepath.encode('utf-8')
+    digest_object.update(encoded_target_filepath)
+    target_filepath_hash = digest_object.hexdigest() 
+
+    return target_filepath_hash
+
+
+
+
+
+  @_hold_metadata_lock
+  def remove_obsolete_targets(self, destination_directory):
+    """
+    <Purpose>
+      Remove any files that are in 'previous' but not 'current'.  This makes it
+      so if you remove a file from a repository, it actually goes away.  The
+      targets for the 'targets' role and all delegated roles are checked.
+    
+    <Arguments>
+      destination_directory:
+        The directory containing the target files tracked by TUF.
+
+    <Exceptions>
+      tuf.FormatError:
+        If 'destination_directory' is improperly formatted.
+      
+      tuf.RepositoryError:
+        If an error occurred removing any files.
+
+    <Side Effects>
+      Target files are removed from disk.
+
+    <Returns>
+      None.
+    """
+  
+    # Does 'destination_directory' have the correct format?
+    # Raise 'tuf.FormatError' if there is a mismatch.
+    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+
+    # Iterate through the rolenames and verify whether the 'previous'
+    # directory contains a target no longer found in 'current'.
+    for role in tuf.roledb.get_rolenames():
+      if role.startswith('targets'):
+        if role in self.metadata['previous'] and self.metadata['previous'][role] != None:
+          for target in self.metadata['previous'][role]['targets']:
+            if target not in self.metadata['current'][role]['targets']:
+              # 'target' is only in 'previous', so remove it.
+              logger.warning('Removing obsolete file: ' + repr(target) + '.')
+              # Remove the file if it hasn't been removed already.
+              destination = os.path.join(destination_directory, target.lstrip(os.sep))
+              try:
+                os.remove(destination)
+              
+              except OSError as e:
+                # If 'filename' already removed, just log it.
+                if e.errno == errno.ENOENT:
+                  logger.info('File ' + repr(destination) + ' was already removed.')
+                
+                else:
+                  logger.error(str(e))
+              
+              except Exception as e:
+                logger.error(str(e))
+
+
+
+
+
+  def updated_targets(self, targets, destination_directory):
+    """
+    <Purpose>
+      Return the targets in 'targets' that have changed.  Targets are considered
+      changed if they do not exist at 'destination_directory' or the target
+      located there has mismatched file properties.
+
+      The returned information is a list conformant to
+      'tuf.formats.TARGETFILES_SCHEMA' and has the form:
+      
+      [{'filepath': 'a/b/c.txt',
+        'fileinfo': {'length': 13323,
+                     'hashes': {'sha256': dbfac345..}}
+       ...]
+
+    <Arguments>
+      targets:
+        A list of target files.  Targets that come earlier in the list are
+        chosen over duplicates that may occur later.
+
+      destination_directory:
+        The directory containing the target files.
+
+    <Exceptions>
+      tuf.FormatError:
+        If the arguments are improperly formatted.
+
+    <Side Effects>
+      The files in 'targets' are read and their hashes computed, unless their
+      hashes are recorded in the target manifest and their file properties
+      are unchanged.  The target manifest is updated and saved.
+
+    <Returns>
+      A list of targets, conformant to 'tuf.formats.TARGETFILES_SCHEMA'.
+    """
+
+    # Do the arguments have the correct format?
+    # Raise 'tuf.FormatError' if there is a mismatch.
+    tuf.formats.TARGETFILES_SCHEMA.check_match(targets)
+    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+
+    if tuf.conf.USE_TARGET_MANIFEST:
+      target_manifest = self._get_target_manifest()
+
+    else:
+      target_manifest = {}
+
+    # The hashes of each local target file, as dicts of algorithms to hex
+    # digests, and the algorithms that must still be computed.  Local files
+    # that cannot be accessed are in 'missing_filepaths'.
+    local_file_hashes = {}
+    local_file_properties = {}
+    algorithms_to_compute = {}
+    missing_filepaths = set()
+
+    for target in targets:
+      target_filepath = self._get_local_target_filepath(target['filepath'],
+                                                        destination_directory)
+
+      if target_filepath in missing_filepaths:
+        continue
+
+      if target_filepath not in local_file_hashes:
+        try:
+          file_properties = self._get_local_file_properties(target_filepath)
+
+        # This exception would occur if the target does not exist locally.
+        except OSError:
+          missing_filepaths.add(target_filepath)
+          continue
+
+        local_file_properties[target_filepath] = file_properties
+        local_file_hashes[target_filepath] = {}
+
+        # Use the hashes recorded for the file, if it has not changed since.
+        manifest_entry = \
+          target_manifest.get(os.path.abspath(target_filepath))
+
+        if manifest_entry is not None:
+          recorded_file_properties = dict(manifest_entry)
+          recorded_hashes = recorded_file_properties.pop('hashes')
+
+          if recorded_file_properties == file_properties:
+            local_file_hashes[target_filepath].update(recorded_hashes)
+
+      for algorithm in target['fileinfo']['hashes']:
+        if algorithm not in local_file_hashes[target_filepath]:
+          algorithms_to_compute.setdefault(target_filepath,
+                                           set()).add(algorithm)
+
+    # Hash the remaining files on a pool of threads.  Each file is read once
+    # for all of its algorithms.
+    def hash_local_file_worker(filepath_and_algorithms):
+      target_filepath, algorithms = filepath_and_algorithms
+
+      try:
+        digest_objects = \
+          tuf.hash.digest_filename_algorithms(target_filepath,
+                                              sorted(algorithms))
+
+      except (IOError, OSError):
+        return target_filepath, None
+
+      file_hashes = {}
+      for algorithm, digest_object in six.iteritems(digest_objects):
+        file_hashes[algorithm] = digest_object.hexdigest()
+
+      return target_filepath, file_hashes
+
+    if algorithms_to_compute:
+      thread_pool = ThreadPool(min(tuf.conf.MAX_CONCURRENT_HASHES,
+                                   len(algorithms_to_compute)))
+
+      try:
+        for target_filepath, file_hashes in \
+          thread_pool.imap_unordered(hash_local_file_worker,
+                                     list(six.iteritems(algorithms_to_compute))):
+          if file_hashes is None:
+            missing_filepaths.add(target_filepath)
+
+          else:
+            local_file_hashes[target_filepath].update(file_hashes)
+            self._record_local_target_file(target_filepath,
+              local_file_hashes[target_filepath],
+              local_file_properties[target_filepath])
+
+      finally:
+        thread_pool.close()
+        thread_pool.join()
+
+    # Keep track of the target objects and filepaths of updated targets.
+    # Return 'updated_targets' and use 'updated_targetpaths' to avoid
+    # duplicates.
+    updated_targets = []
+    updated_targetpaths = set()
+
+    for target in targets:
+      target_filepath = self._get_local_target_filepath(target['filepath'],
+                                                        destination_directory)
+
+      if target_filepath in updated_targetpaths:
+        continue
+
+      if target_filepath in missing_filepaths:
+        updated_targets.append(target)
+        updated_targetpaths.add(target_filepath)
+        continue
+
+      # Check for a mismatch of any of the algorithm/digest combos.
+      for algorithm, digest in six.iteritems(target['fileinfo']['hashes']):
+        if local_file_hashes[target_filepath][algorithm] != digest:
+          updated_targets.append(target)
+          updated_targetpaths.add(target_filepath)
+          break
+
+    # Forget the files that no longer exist.
+    with self._target_manifest_lock:
+      for target_filepath in missing_filepaths:
+        if target_manifest.pop(os.path.abspath(target_filepath), None):
+          self._target_manifest_changed = True
+
+    self._save_target_manifest()
+
+    return updated_targets
+
+
+
+
+
+  def _get_local_target_filepath(self, target_filepath, destination_directory):
+    """
+    <Purpose>
+      Non-public method that returns the local path of a target file saved
+      under 'destination_directory'.
+
+    <Arguments>
+      target_filepath:
+        The target filepath (relative to the repository targets directory)
+        obtained from TUF targets metadata.
+
+      destination_directory:
+        The directory containing the target files.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      None.
+
+    <Returns>
+      The local path of the target file.
+    """
+
+    # Prepend 'destination_directory' to the target's relative filepath (as
+    # stored in metadata.)  Note: join() discards 'destination_directory' if
+    # 'filepath' contains a leading path separator (i.e., is treated as an
+    # absolute path).
+    if target_filepath[0] == '/':
+      target_filepath = target_filepath[1:]
+
+    return os.path.join(destination_directory, target_filepath)
+
+
+
+
+
+  def download_target(self, target, destination_directory):
+    """
+    <Purpose>
+      Download 'target' and verify it is trusted.
+        
+      This will only store the file at 'destination_directory' if the
+      downloaded file matches the description of the file in the trusted
+      metadata.
+    
+    <Arguments>
+      target:
+        The target to be downloaded.  Conformant to
+        'tuf.formats.TARGETFILE_SCHEMA'.
+
+      destination_directory:
+        The directory to save the downloaded target file.
+
+    <Exceptions>
+      tuf.FormatError:
+        If 'target' is not properly formatted.
+
+      tuf.NoWorkingMirrorError:
+        If a target could not be downloaded from any of the mirrors.
+
+        Although expected to be rare, there might be OSError exceptions (except
+        errno.EEXIST) raised when creating the destination directory (if it
+        doesn't exist). 
+
+    <Side Effects>
+      A target file is saved to the local system.
+
+    <Returns>
+      None.
+    """
+
+    # Do the arguments have the correct format? 
+    # This check ensures the arguments have the appropriate 
+    # number of objects and object types, and that all dict
+    # keys are properly named.
+    # Raise 'tuf.FormatError' if the check fail.
+    tuf.formats.TARGETFILE_SCHEMA.check_match(target)
+    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+
+    try:
+      self._download_target(target, destination_directory)
+
+    finally:
+      self._save_target_manifest()
+
+
+
+
+
+  def download_targets(self, targets, destination_directory, max_workers=None):
+    """
+    <Purpose>
+      Download the targets in 'targets' concurrently and verify they are
+      trusted.  At most 'max_workers' targets are downloaded at the same time.
+      Every target is verified exactly as it is by download_target(): it is
+      only stored at 'destination_directory' if its length and hashes match
+      the trusted metadata.
+
+      A target that cannot be downloaded does not interrupt the download of
+      the others.  Targets that come earlier in 'targets' are chosen over
+      duplicates that may occur later.
+
+    <Arguments>
+      targets:
+        A list of targets to be downloaded.  Conformant to
+        'tuf.formats.TARGETFILES_SCHEMA'.
+
+      destination_directory:
+        The directory to save the downloaded target files.
+
+      max_workers:
+        The maximum number of targets downloaded concurrently.  If None, the
+        smaller of 'tuf.conf.MAX_CONCURRENT_DOWNLOADS' and
+        'tuf.conf.MAX_CONNECTIONS_PER_MIRROR' is used.  Workers beyond
+        'tuf.conf.MAX_CONNECTIONS_PER_MIRROR' wait for a connection to the
+        mirror host they download from.
+
+    <Exceptions>
+      tuf.FormatError:
+        If any of the arguments are improperly formatted.
+
+    <Side Effects>
+      Target files are saved to the local system.  The mirror scoreboard is
+      saved, if 'tuf.conf.PERSIST_MIRROR_SCOREBOARD' is True.
+
+    <Returns>
+      A dictionary of the target filepaths in 'targets' to their download
+      result: None if the target was downloaded and verified, otherwise the
+      exception raised by its download (e.g., tuf.NoWorkingMirrorError).
+    """
+
+    # Do the arguments have the correct format? 
+    # Raise 'tuf.FormatError' if there is a mismatch.
+    tuf.formats.TARGETFILES_SCHEMA.check_match(targets)
+    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+
+    # More workers than connections to the preferred mirror would only queue
+    # for them.
+    if max_workers is None:
+      max_workers = min(tuf.conf.MAX_CONCURRENT_DOWNLOADS,
+                        tuf.conf.MAX_CONNECTIONS_PER_MIRROR)
+    tuf.formats.NUMWORKERS_SCHEMA.check_match(max_workers)
+
+    # Skip duplicate filepaths so that no two workers write the same
+    # destination file.
+    unique_targets = []
+    target_filepaths = set()
+    for target in targets:
+      if target['filepath'] not in target_filepaths:
+        target_filepaths.add(target['filepath'])
+        unique_targets.append(target)
+
+    if not unique_targets:
+      return {}
+
+    def download_target_worker(target):
+      try:
+        self._download_target(target, destination_directory)
+
+      except Exception as exception:
+        logger.exception('Failed to download target ' +
+          repr(target['filepath']) + '.')
+        return target['filepath'], exception
+
+      else:
+        return target['filepath'], None
+
+    download_results = {}
+    thread_pool = ThreadPool(min(max_workers, len(unique_targets)))
+
+    try:
+      for target_filepath, download_result in \
+        thread_pool.imap_unordered(download_target_worker, unique_targets):
+        download_results[target_filepath] = download_result
+
+    finally:
+      thread_pool.close()
+      thread_pool.join()
+      self._save_mirror_scoreboard()
+      self._save_target_manifest()
+
+    return download_results
+
+
+
+
+
+  def _download_target(self, target, destination_directory):
+    """
+    <Purpose>
+      Non-public method that downloads 'target', verifies it is trusted, and
+      saves it to 'destination_directory'.  The arguments are expected to have
+      been format-checked by the caller (i.e., download_target() or
+      download_targets()).
+
+    <Arguments>
+      target:
+        The target to be downloaded.  Conformant to
+        'tuf.formats.TARGETFILE_SCHEMA'.
+
+      destination_directory:
+        The directory to save the downloaded target file.
+
+    <Exceptions>
+      tuf.NoWorkingMirrorError:
+        If a target could not be downloaded from any of the mirrors.
+
+    <Side Effects>
+      A target file is saved to the local system.
+
+    <Returns>
+      None.
+    """
+
+    # Extract the target file information.
+    target_filepath = target['filepath']
+    trusted_length = target['fileinfo']['length']
+    trusted_hashes = target['fileinfo']['hashes']
+
+    # Identical targets are not downloaded at the same time, so that the
+    # second is cloned from the target store.
+    with self._get_target_store_lock(trusted_hashes):
+      if self._copy_target_from_store(target_filepath, trusted_length,
+                                      trusted_hashes, destination_directory):
+        return
+
+      # '_get_target_file()' checks every mirror and returns the first target
+      # that passes verification.
+      target_file_object = self._get_target_file(target_filepath,
+                                                 trusted_length,
+                                                 trusted_hashes)
+
+      self._move_target_file(target_file_object, target_filepath,
+                             destination_directory, trusted_hashes)
+
+
+
+
+
+  def _move_target_file(self, target_file_object, target_filepath,
+                        destination_directory, file_hashes=None):
+    """
+    <Purpose>
+      Non-public method that moves a verified target file into place, under
+      'destination_directory'.  Missing parent directories are created.  If
+      'file_hashes' is given, the saved file is recorded in the target
+      manifest, and added to the target store.
+
+    <Arguments>
+      target_file_object:
+        A verified 'tuf.util.TempFile' file-like object containing the target.
+
+      target_filepath:
+        The target filepath (relative to the repository targets directory)
+        obtained from TUF targets metadata.
+
+      destination_directory:
+        The directory to save the target file.
+
+      file_hashes:
+        The trusted hashes of the target file, or None.
+
+    <Exceptions>
+      OSError, if the parent directories cannot be created.
+
+    <Side Effects>
+      The target file is saved to the local system, and 'target_file_object'
+      is closed.  The target manifest and target store may be modified.
+
+    <Returns>
+      None.
+    """
+   
+    # We acquired a target file object from a mirror.  Move the file into place
+    # (i.e., locally to 'destination_directory').
+    destination = self._get_target_destination(target_filepath,
+                                               destination_directory)
+
+    # move() replaces the destination, rather than writing to it, so files hard
+    # linked to it (e.g., by the target store) are not modified.
+    target_file_object.move(destination)
+
+    if file_hashes is not None:
+      self._store_target_file(destination, file_hashes)
+      self._record_local_target_file(destination, file_hashes)
+
+
+
+
+
+  def _get_target_destination(self, target_filepath, destination_directory):
+    """
+    <Purpose>
+      Non-public method that returns the absolute path where the target
+      'target_filepath' is saved under 'destination_directory', and creates
+      its missing parent directories.
+
+    <Arguments>
+      target_filepath:
+        The target filepath (relative to the repository targets directory)
+        obtained from TUF targets metadata.
+
+      destination_directory:
+        The directory to save the target file.
+
+    <Exceptions>
+      OSError, if the parent directories cannot be created.
+
+    <Side Effects>
+      Directories may be created.
+
+    <Returns>
+      The absolute path of the target file.
+    """
+
+    # Note: join() discards 'destination_directory' if 'target_path' contains
+    # a leading path separator (i.e., is treated as an absolute path).
+    destination = os.path.join(destination_directory,
+                               target_filepath.lstrip(os.sep))
+    destination = os.path.abspath(destination)
+    target_dirpath = os.path.dirname(destination)
+   
+    # When attempting to create the leaf directory of 'target_dirpath', ignore
+    # any exceptions raised if the root directory already exists.  All other
+    # exceptions potentially thrown by os.makedirs() are re-raised.
+    # Note: os.makedirs can raise OSError if the leaf directory already exists
+    # or cannot be created.
+    try:
+      os.makedirs(target_dirpath)
+    
+    except OSError as e:
+      if e.errno == errno.EEXIST:
+        pass
       
       else:
-        logger.debug('No target '+target_filepath+' in role '+role_name)
-
-    return target
+        raise
 
+    return destination
 
 
 
 
 
-  def _visit_child_role(self, child_role, target_filepath):
+  def _get_target_store_filepath(self, file_hashes):
     """
     <Purpose>
-      Non-public method that determines whether the given 'child_role' has been
-      delegated the target with the name 'target_filepath'.
-
-      Ensure that we explore only delegated roles trusted with the target. We
-      assume conservation of delegated paths in the complete tree of
-      delegations. Note that the call to tuf.util.ensure_all_targets_allowed in
-      _verify_uncompressed_metadata_file should already verify that all
-      targets metadata is valid; i.e. that the targets signed by a delegatee is
-      a proper subset of the targets delegated to it by the delegator.
-      Nevertheless, we check it again here for performance and safety reasons.
-
-      TODO: Should the TUF spec restrict the repository to one particular
-      algorithm?  Should we allow the repository to specify in the role
-      dictionary the algorithm used for these generated hashed paths?
+      Non-public method that returns the path of the target file with the
+      trusted hashes 'file_hashes' in the target store.
 
     <Arguments>
-      child_role:
-        The delegation targets role object of 'child_role', containing its
-        paths, path_hash_prefixes, keys and so on.
-
-      target_filepath:
-        The path to the target file on the repository. This will be relative to
-        the 'targets' (or equivalent) directory on a given mirror.
+      file_hashes:
+        The trusted hashes of the target file.
 
     <Exceptions>
       None.
-   
+
     <Side Effects>
       None.
-    
-    <Returns>
-      If 'child_role' has been delegated the target with the name
-      'target_filepath', then we return the role name of 'child_role'.
 
-      Otherwise, we return None.
+    <Returns>
+      The path of the stored target file, or None if
+      'tuf.conf.TARGET_STORE_DIRECTORY' is not set or 'file_hashes' has no
+      'sha256' digest.
     """
 
-    child_role_name = child_role['name']
-    child_role_paths = child_role.get('paths')
-    child_role_path_hash_prefixes = child_role.get('path_hash_prefixes')
-    # A boolean indicator that tell us whether 'child_role' has been delegated
-    # the target with the name 'target_filepath'.
-    child_role_is_relevant = False
-
-    if child_role_path_hash_prefixes is not None:
-      target_filepath_hash = self._get_target_hash(target_filepath)
-      for child_role_path_hash_prefix in child_role_path_hash_prefixes:
-        if target_filepath_hash.startswith(child_role_path_hash_prefix):
-          child_role_is_relevant = True
-        
-        else:
-          continue
+    if tuf.conf.TARGET_STORE_DIRECTORY is None or 'sha256' not in file_hashes:
+      return None
 
-    elif child_role_paths is not None:
-      for child_role_path in child_role_paths:
-        # A child role path may be a filepath or directory.  The child
-        # role 'child_role_name' is added if 'target_filepath' is located
-        # under 'child_role_path'.  Explicit filepaths are also added.
-        prefix = os.path.commonprefix([target_filepath, child_role_path])
-        if prefix == child_role_path:
-          child_role_is_relevant = True
+    # Trusted digests are hexadecimal (see 'tuf.formats.HASH_SCHEMA').  Spread
+    # the files over subdirectories, by the first byte of their digest.
+    digest = file_hashes['sha256'].lower()
 
-    else:
-      # 'role_name' should have been validated when it was downloaded.
-      # The 'paths' or 'path_hash_prefixes' fields should not be missing,
-      # so we raise a format error here in case they are both missing.
-      raise tuf.FormatError(repr(child_role_name) + ' has neither ' \
-                                '"paths" nor "path_hash_prefixes".')
-
-    if child_role_is_relevant:
-      logger.debug('Child role ' + repr(child_role_name) + ' has target ' + \
-                   repr(target_filepath))
-      return child_role_name
-    
-    else:
-      logger.debug('Child role ' + repr(child_role_name) + \
-                   ' does not have target ' + repr(target_filepath))
-      return None
+    return os.path.join(tuf.conf.TARGET_STORE_DIRECTORY, digest[:2], digest)
 
 
 
 
 
-  def _get_target_hash(self, target_filepath, hash_function='sha256'):
+  def _get_target_store_lock(self, file_hashes):
     """
     <Purpose>
-      Non-public method that computes the hash of 'target_filepath'. This is
-      useful in conjunction with the "path_hash_prefixes" attribute in a
-      delegated targets role, which tells us which paths it is implicitly
-      responsible for.
+      Non-public method that returns the lock held while the target with the
+      trusted hashes 'file_hashes' is cloned from, or added to, the target
+      store.
 
     <Arguments>
-      target_filepath:
-        The path to the target file on the repository. This will be relative to
-        the 'targets' (or equivalent) directory on a given mirror.
-
-      hash_function:
-        The algorithm used by the repository to generate the hashes of the
-        target filepaths.  The repository may optionally organize targets into
-        hashed bins to ease target delegations and role metadata management.
-        The use of consistent hashing allows for a uniform distribution of
-        targets into bins. 
+      file_hashes:
+        The trusted hashes of the target file.
 
     <Exceptions>
       None.
-   
+
     <Side Effects>
-      None.
-    
+      A lock may be added to 'self._target_store_locks'.
+
     <Returns>
-      The hash of 'target_filepath'.
+      A 'threading.Lock' object.  If the target is not stored, a new (and
+      so uncontended) lock is returned.
     """
 
-    # Calculate the hash of the filepath to determine which bin to find the 
-    # target.  The client currently assumes the repository (i.e., repository
-    # tool) uses 'hash_function' to generate hashes and UTF-8.
-    digest_object = tuf.hash.digest(hash_function)
-    encoded_target_filepath = target_filepath.encode('utf-8')
-    digest_object.update(encoded_target_filepath)
-    target_filepath_hash = digest_object.hexdigest() 
+    store_filepath = self._get_target_store_filepath(file_hashes)
 
-    return target_filepath_hash
+    if store_filepath is None:
+      return threading.Lock()
 
+    with self._target_store_locks_lock:
+      return self._target_store_locks.setdefault(store_filepath,
+                                                 threading.Lock())
 
 
 
 
-  def remove_obsolete_targets(self, destination_directory):
+
+  def _verify_stored_target_file(self, store_filepath, file_length,
+                                 file_hashes):
     """
     <Purpose>
-      Remove any files that are in 'previous' but not 'current'.  This makes it
-      so if you remove a file from a repository, it actually goes away.  The
-      targets for the 'targets' role and all delegated roles are checked.
-    
+      Non-public method that determines whether the stored target file
+      'store_filepath' has the trusted length and hashes.  The hashes recorded
+      in the target manifest are used if the file is unchanged since;
+      otherwise, the file is hashed.  An invalid stored file is removed.
+
     <Arguments>
-      destination_directory:
-        The directory containing the target files tracked by TUF.
+      store_filepath:
+        The path of the target file in the target store.
+
+      file_length:
+        The trusted length of the target file.
+
+      file_hashes:
+        The trusted hashes of the target file.
 
     <Exceptions>
-      tuf.FormatError:
-        If 'destination_directory' is improperly formatted.
-      
-      tuf.RepositoryError:
-        If an error occurred removing any files.
+      None.
 
     <Side Effects>
-      Target files are removed from disk.
+      The stored file may be hashed, recorded in the target manifest, or
+      removed.
 
     <Returns>
-      None.
+      True if the stored file is valid, False otherwise.
     """
-  
-    # Does 'destination_directory' have the correct format?
-    # Raise 'tuf.FormatError' if there is a mismatch.
-    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
 
-    # Iterate through the rolenames and verify whether the 'previous'
-    # directory contains a target no longer found in 'current'.
-    for role in tuf.roledb.get_rolenames():
-      if role.startswith('targets'):
-        if role in self.metadata['previous'] and self.metadata['previous'][role] != None:
-          for target in self.metadata['previous'][role]['targets']:
-            if target not in self.metadata['current'][role]['targets']:
-              # 'target' is only in 'previous', so remove it.
-              logger.warning('Removing obsolete file: ' + repr(target) + '.')
-              # Remove the file if it hasn't been removed already.
-              destination = os.path.join(destination_directory, target.lstrip(os.sep))
-              try:
-                os.remove(destination)
-              
-              except OSError as e:
-                # If 'filename' already removed, just log it.
-                if e.errno == errno.ENOENT:
-                  logger.info('File ' + repr(destination) + ' was already removed.')
-                
-                else:
-                  logger.error(str(e))
-              
-              except Exception as e:
-                logger.error(str(e))
+    try:
+      file_properties = self._get_local_file_properties(store_filepath)
+
+    except OSError:
+      return False
 
+    stored_hashes = {}
 
+    if tuf.conf.USE_TARGET_MANIFEST:
+      manifest_entry = \
+        self._get_target_manifest().get(os.path.abspath(store_filepath))
 
+      if manifest_entry is not None:
+        recorded_file_properties = dict(manifest_entry)
+        recorded_hashes = recorded_file_properties.pop('hashes')
 
+        if recorded_file_properties == file_properties:
+          stored_hashes.update(recorded_hashes)
 
-  def updated_targets(self, targets, destination_directory):
+    algorithms = [algorithm for algorithm in file_hashes \
+                  if algorithm not in stored_hashes]
+
+    try:
+      if file_properties['length'] != file_length:
+        raise tuf.Error('Expected a length of ' + str(file_length) + \
+                        ', but the length is ' + str(file_properties['length']))
+
+      if algorithms:
+        digest_objects = \
+          tuf.hash.digest_filename_algorithms(store_filepath, algorithms)
+
+        for algorithm, digest_object in six.iteritems(digest_objects):
+          stored_hashes[algorithm] = digest_object.hexdigest()
+
+      for algorithm, trusted_hash in six.iteritems(file_hashes):
+        if stored_hashes[algorithm] != trusted_hash:
+          raise tuf.BadHashError(trusted_hash, stored_hashes[algorithm])
+
+    except (tuf.Error, IOError, OSError) as exception:
+      logger.warning('Removing the invalid stored target ' + \
+                     repr(store_filepath) + ': ' + str(exception))
+
+      try:
+        os.remove(store_filepath)
+
+      except OSError:
+        pass
+
+      return False
+
+    if algorithms:
+      self._record_local_target_file(store_filepath, stored_hashes,
+                                     file_properties)
+
+    return True
+
+
+
+
+
+  def _copy_target_from_store(self, target_filepath, file_length, file_hashes,
+                              destination_directory):
     """
     <Purpose>
-      Return the targets in 'targets' that have changed.  Targets are considered
-      changed if they do not exist at 'destination_directory' or the target
-      located there has mismatched file properties.
-
-      The returned information is a list conformant to
-      'tuf.formats.TARGETFILES_SCHEMA' and has the form:
-      
-      [{'filepath': 'a/b/c.txt',
-        'fileinfo': {'length': 13323,
-                     'hashes': {'sha256': dbfac345..}}
-       ...]
+      Non-public method that saves the target 'target_filepath' under
+      'destination_directory' by cloning its copy in the target store, if
+      there is a valid one.
 
     <Arguments>
-      targets:
-        A list of target files.  Targets that come earlier in the list are
-        chosen over duplicates that may occur later.
+      target_filepath:
+        The target filepath (relative to the repository targets directory)
+        obtained from TUF targets metadata.
+
+      file_length:
+        The trusted length of the target file.
+
+      file_hashes:
+        The trusted hashes of the target file.
 
       destination_directory:
-        The directory containing the target files.
+        The directory to save the target file.
 
     <Exceptions>
-      tuf.FormatError:
-        If the arguments are improperly formatted.
+      OSError, if the parent directories of the target file cannot be
+      created.
 
     <Side Effects>
-      The files in 'targets' are read and their hashes computed. 
+      The target file is saved to the local system, and recorded in the
+      target manifest.
 
     <Returns>
-      A list of targets, conformant to 'tuf.formats.TARGETFILES_SCHEMA'.
+      True if the target file was cloned from the store, False otherwise.
     """
 
-    # Do the arguments have the correct format?
-    # Raise 'tuf.FormatError' if there is a mismatch.
-    tuf.formats.TARGETFILES_SCHEMA.check_match(targets)
-    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+    store_filepath = self._get_target_store_filepath(file_hashes)
 
-    # Keep track of the target objects and filepaths of updated targets.
-    # Return 'updated_targets' and use 'updated_targetpaths' to avoid
-    # duplicates.
-    updated_targets = []
-    updated_targetpaths = []
+    if store_filepath is None or \
+       not self._verify_stored_target_file(store_filepath, file_length,
+                                           file_hashes):
+      return False
 
-    for target in targets:
-      # Prepend 'destination_directory' to the target's relative filepath (as
-      # stored in metadata.)  Verify the hash of 'target_filepath' against
-      # each hash listed for its fileinfo.  Note: join() discards
-      # 'destination_directory' if 'filepath' contains a leading path separator
-      # (i.e., is treated as an absolute path).
-      filepath = target['filepath']
-      if filepath[0] == '/':
-        filepath = filepath[1:]
-      target_filepath = os.path.join(destination_directory, filepath)
-      
-      if target_filepath in updated_targetpaths:
-        continue
-      
-      # Try one of the algorithm/digest combos for a mismatch.  We break
-      # as soon as we find a mismatch.
-      for algorithm, digest in six.iteritems(target['fileinfo']['hashes']):
-        digest_object = None
-        try:
-          digest_object = tuf.hash.digest_filename(target_filepath,
-                                                   algorithm=algorithm)
-        
-        # This exception would occur if the target does not exist locally. 
-        except IOError:
-          updated_targets.append(target)
-          updated_targetpaths.append(target_filepath)
-          break
-        
-        # The file does exist locally, check if its hash differs. 
-        if digest_object.hexdigest() != digest:
-          updated_targets.append(target)
-          updated_targetpaths.append(target_filepath)
-          break
-    
-    return updated_targets
+    destination = self._get_target_destination(target_filepath,
+                                               destination_directory)
 
+    try:
+      clone_method = tuf.util.clone_file(store_filepath, destination)
+
+    except (IOError, OSError) as exception:
+      logger.warning('Could not clone the stored target ' + \
+                     repr(store_filepath) + ': ' + str(exception))
+      return False
 
+    logger.info('Saved ' + repr(target_filepath) + ' from the target store' + \
+                ' (' + clone_method + ').')
 
+    # A hard link changes the file properties of the stored file too.
+    self._record_local_target_file(store_filepath, file_hashes)
+    self._record_local_target_file(destination, file_hashes)
 
+    return True
 
-  def download_target(self, target, destination_directory):
+
+
+
+
+  def _store_target_file(self, filepath, file_hashes):
     """
     <Purpose>
-      Download 'target' and verify it is trusted.
-        
-      This will only store the file at 'destination_directory' if the
-      downloaded file matches the description of the file in the trusted
-      metadata.
-    
+      Non-public method that adds the verified target file 'filepath' to the
+      target store, unless it is already stored.  Errors are logged, not
+      raised, since the target file itself has been saved.
+
     <Arguments>
-      target:
-        The target to be downloaded.  Conformant to
-        'tuf.formats.TARGETFILE_SCHEMA'.
+      filepath:
+        The path of a verified target file.
 
-      destination_directory:
-        The directory to save the downloaded target file.
+      file_hashes:
+        The trusted hashes of the target file.
 
     <Exceptions>
-      tuf.FormatError:
-        If 'target' is not properly formatted.
-
-      tuf.NoWorkingMirrorError:
-        If a target could not be downloaded from any of the mirrors.
-
-        Although expected to be rare, there might be OSError exceptions (except
-        errno.EEXIST) raised when creating the destination directory (if it
-        doesn't exist). 
+      None.
 
     <Side Effects>
-      A target file is saved to the local system.
+      The target file is cloned into the target store, and recorded in the
+      target manifest.
 
     <Returns>
       None.
     """
 
-    # Do the arguments have the correct format? 
-    # This check ensures the arguments have the appropriate 
-    # number of objects and object types, and that all dict
-    # keys are properly named.
-    # Raise 'tuf.FormatError' if the check fail.
-    tuf.formats.TARGETFILE_SCHEMA.check_match(target)
-    tuf.formats.PATH_SCHEMA.check_match(destination_directory)
+    store_filepath = self._get_target_store_filepath(file_hashes)
 
-    # Extract the target file information.
-    target_filepath = target['filepath']
-    trusted_length = target['fileinfo']['length']
-    trusted_hashes = target['fileinfo']['hashes']
+    if store_filepath is None or os.path.exists(store_filepath):
+      return
 
-    # '_get_target_file()' checks every mirror and returns the first target
-    # that passes verification.
-    target_file_object = self._get_target_file(target_filepath, trusted_length,
-                                               trusted_hashes)
-   
-    # We acquired a target file object from a mirror.  Move the file into place
-    # (i.e., locally to 'destination_directory').  Note: join() discards
-    # 'destination_directory' if 'target_path' contains a leading path
-    # separator (i.e., is treated as an absolute path).
-    destination = os.path.join(destination_directory,
-                               target_filepath.lstrip(os.sep))
-    destination = os.path.abspath(destination)
-    target_dirpath = os.path.dirname(destination)
-   
-    # When attempting to create the leaf directory of 'target_dirpath', ignore
-    # any exceptions raised if the root directory already exists.  All other
-    # exceptions potentially thrown by os.makedirs() are re-raised.
-    # Note: os.makedirs can raise OSError if the leaf directory already exists
-    # or cannot be created.
     try:
-      os.makedirs(target_dirpath)
-    
-    except OSError as e:
-      if e.errno == errno.EEXIST:
-        pass
-      
-      else:
-        raise
+      tuf.util.ensure_parent_dir(store_filepath)
+      tuf.util.clone_file(filepath, store_filepath)
 
-    target_file_object.move(destination)
+    except (IOError, OSError) as exception:
+      logger.warning('Could not add ' + repr(filepath) + \
+                     ' to the target store: ' + str(exception))
+      return
+
+    self._record_local_target_file(store_filepath, file_hashes)
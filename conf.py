@@ -79,6 +79,24 @@ SOCKET_TIMEOUT = 2 #seconds
 # The maximum chunk of data, in bytes, we would download in every round.
 CHUNK_SIZE = 8192 #bytes
 
+# While a server fills every read, the chunks read from it grow up to
+# 'MAX_CHUNK_SIZE' bytes, and its download speed is checked at least every
+# 'DOWNLOAD_SPEED_CHECK_INTERVAL' bytes rather than after every chunk.  A read
+# that is not filled is always followed by a check.
+MAX_CHUNK_SIZE = 1048576 #bytes
+DOWNLOAD_SPEED_CHECK_INTERVAL = 1048576 #bytes
+
+# Downloaded files are kept in memory until they grow larger than
+# 'DOWNLOAD_SPOOL_SIZE' bytes, and only then written to a temporary file on
+# disk.  Metadata and small targets thus never touch the temporary file system.
+# Set it to 0 to always write downloads to disk.
+DOWNLOAD_SPOOL_SIZE = 1000000 #bytes
+
+# Compressed metadata is decompressed as it is downloaded.  Set an upper bound
+# for the number of bytes it may decompress to, so that a small compressed file
+# (i.e., a decompression bomb) cannot fill the disk.
+MAX_DECOMPRESSED_LENGTH = 100000000 #bytes
+
 # The minimum average of download speed (bytes/second) that must be met to
 # avoid being considered as a slow retrieval attack.
 MIN_AVERAGE_DOWNLOAD_SPEED = CHUNK_SIZE #bytes/second
@@ -86,6 +104,105 @@ MIN_AVERAGE_DOWNLOAD_SPEED = CHUNK_SIZE #bytes/second
 # The time (in seconds) we ignore a server with a slow initial retrieval speed.
 SLOW_START_GRACE_PERIOD = 3 #seconds
 
+# Downloads over 'http' and 'https' reuse persistent (HTTP/1.1 keep-alive)
+# connections to each mirror host.  Set the maximum number of connections that
+# may be open to a single mirror host at the same time.  Additional downloads
+# from that host wait until one of its connections is available.
+MAX_CONNECTIONS_PER_MIRROR = 4
+
+# The time (in seconds) a download waits for one of the connections to its
+# mirror host to be released, when MAX_CONNECTIONS_PER_MIRROR are in use.  The
+# wait is for other downloads, not for the network, so it must be long enough
+# for them to complete; it only guards against connections that are never
+# released.  None waits indefinitely.
+CONNECTION_POOL_TIMEOUT = 600 #seconds
+
+# The time (in seconds) an idle persistent connection is kept open before it is
+# closed and evicted from the connection pool.
+CONNECTION_IDLE_TIMEOUT = 30 #seconds
+
+# The default maximum number of target files that
+# 'Updater.download_targets()' downloads and verifies at the same time.  The
+# downloads from a single mirror host are also limited by
+# MAX_CONNECTIONS_PER_MIRROR, so the smaller of the two is used by default.
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# A target download that every mirror failed to complete is kept, so that the
+# next download of the same target resumes it.  Set the maximum number of
+# partially downloaded targets kept by an updater; the least recently failed
+# are discarded first.  0 disables resuming downloads across calls.
+MAX_PARTIAL_TARGET_FILES = 16
+
+# Metadata is requested from one mirror at a time, and the next mirror is only
+# tried after a failure.  If 'HEDGED_REQUEST_DELAY' is set, the next mirror is
+# also tried whenever the latest request has not succeeded after this many
+# seconds.  The first copy that passes verification is used, and the other
+# requests are cancelled.  None disables hedged requests.
+HEDGED_REQUEST_DELAY = None #seconds
+
+# The updater tries mirrors best-first, ordered by the latency and throughput
+# observed from each mirror host.  Every failed download adds
+# 'MIRROR_FAILURE_PENALTY' seconds to the estimated download time of the host,
+# and the penalty is halved every 'MIRROR_FAILURE_HALF_LIFE' seconds.
+MIRROR_FAILURE_PENALTY = 10 #seconds
+MIRROR_FAILURE_HALF_LIFE = 3600 #seconds
+
+# Save the observed performance of mirror hosts in the client's metadata
+# directory, so that mirrors are ordered by it across sessions.
+PERSIST_MIRROR_SCOREBOARD = False
+
+# The maximum number of target paths whose resolved target information is
+# cached by 'Updater.target()', least recently used first out.  A cached
+# target is used until the snapshot lists a new version of any of the roles
+# searched to resolve it, or one of them expires.  0 disables the cache.
+MAX_CACHED_TARGETS = 1024
+
+# The maximum number of signature verification outcomes cached by
+# 'ssl_crypto.sig', least recently used first out, so that the unchanged
+# metadata of a long-running client is not verified again on every refresh.
+# The cache is wiped whenever the key database changes.  0 disables the cache.
+MAX_CACHED_SIGNATURES = 1024
+
+# 'Updater.start_auto_refresh()' refreshes the top-level metadata in a
+# background thread about every 'AUTO_REFRESH_INTERVAL' seconds.  Each interval
+# varies randomly by up to 'AUTO_REFRESH_JITTER' of itself, so that clients do
+# not request the mirrors in step.  After each consecutive refresh that finds
+# no working mirror, the interval doubles, up to 'AUTO_REFRESH_MAX_INTERVAL'.
+AUTO_REFRESH_INTERVAL = 300 #seconds
+AUTO_REFRESH_JITTER = 0.1
+AUTO_REFRESH_MAX_INTERVAL = 3600 #seconds
+
+# 'Updater.updated_targets()' does not rehash a local target file whose length,
+# modification and change times, and inode match those recorded, with its
+# hashes, when the updater last saved or hashed it.  The records are kept in
+# the client's metadata directory.  Set to False to always rehash target files.
+USE_TARGET_MANIFEST = True
+
+# The maximum number of local target files that 'Updater.updated_targets()'
+# hashes at the same time.
+MAX_CONCURRENT_HASHES = 4
+
+# 'Updater.refresh()' requests the timestamp metadata from a mirror with the
+# 'If-None-Match' and 'If-Modified-Since' validators of the copy last accepted
+# from that mirror.  If the mirror responds that it has not changed, or sends a
+# copy identical to the trusted one, its signatures are not verified again, but
+# the trusted timestamp must still not have expired.  Set to False to always
+# download, and verify, the timestamp metadata.
+USE_CONDITIONAL_TIMESTAMP_REQUESTS = True
+
+# 'Updater' keeps the metadata it parses from the client's metadata directory
+# in a binary cache there, with the SHA-256 digest of each file, so that a new
+# updater does not parse the metadata files again until they change.  The cache
+# is saved after a successful refresh.  Set to False to always parse the files.
+USE_PARSED_METADATA_CACHE = True
+
+# A directory where the updater keeps a copy of every target file it downloads,
+# named by its trusted SHA-256 digest.  A target whose digest is in the store is
+# not downloaded again; its destination is cloned from the store instead (by
+# reflink, hard link, or copy, see 'ssl_crypto.util.clone_file()').  Stored
+# files are verified before they are used.  None disables the store.
+TARGET_STORE_DIRECTORY = None
+
 # The current "good enough" number of PBKDF2 passphrase iterations.
 # We recommend that important keys, such as root, be kept offline.
 # 'ssl_crypto.conf.PBKDF2_ITERATIONS' should increase as CPU speeds increase, set here
@@ -18,6 +18,12 @@
   metadata of that file.  The downloaded file is technically a  file-like object
   that will automatically destroys itself once closed.  Note that the file-like
   object, 'ssl_crypto.util.TempFile', is returned by the '_download_file()' function.
+
+  Files served over 'http' and 'https' are requested through persistent
+  (HTTP/1.1 keep-alive) connections that are pooled per mirror host, so that
+  consecutive downloads from the same mirror do not pay for a new TCP (and TLS)
+  handshake each time.  The size of the pool and the eviction of idle
+  connections are configured in 'ssl_crypto.conf'.
 """
 
 # Help with Python 3 compatibility, where the print statement is a function, an
@@ -28,11 +34,14 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import base64
+import email.utils
 import os
 import socket
 import logging
 import timeit
 import ssl
+import threading
 
 import ssl_crypto
 import ssl_crypto.conf
@@ -52,9 +61,21 @@ except ImportError: # pragma: no cover
 # See 'log.py' to learn how logging is handled in TUF.
 logger = logging.getLogger('ssl_crypto.download')
 
+# The URI schemes whose connections are kept alive and reused by
+# '_connection_pool'.  Other schemes (e.g., 'file') are opened with a urllib
+# opener.
+_POOLED_URI_SCHEMES = ['http', 'https']
+
+# The HTTP status codes of redirections followed by '_open_pooled_connection()'
+# and the maximum number of redirections followed for a single request.  The
+# limit matches the one of urllib's HTTPRedirectHandler.
+_REDIRECT_STATUS_CODES = [301, 302, 303, 307, 308]
+_MAX_REDIRECTIONS = 10
+
 
 
-def safe_download(url, required_length):
+def safe_download(url, required_length, hash_algorithms=None,
+                  temp_file=None, cancel_event=None, mirror_scoreboard=None):
   """
   <Purpose>
     Given the 'url' and 'required_length' of the desired file, open a connection
@@ -77,9 +98,31 @@ def safe_download(url, required_length):
       An integer value representing the length of the file.  This is an exact
       limit.
 
+    hash_algorithms:
+      An optional list of hash algorithms whose digests are computed as the
+      file is downloaded.  See 'ssl_crypto.util.TempFile.get_digest()'.
+
+    temp_file:
+      An optional 'ssl_crypto.util.TempFile' holding the first bytes of the
+      file, as left by an earlier, interrupted download.  The download resumes
+      where 'temp_file' ends, with an HTTP 'Range' request, and the data is
+      appended to 'temp_file'.  Its digests carry across the resume, so they
+      describe the whole file once the download completes.  'temp_file' is
+      not closed if the download fails; it keeps the data received so far.
+      'hash_algorithms' is ignored, as 'temp_file' tracks its own digests.
+
+    cancel_event:
+      An optional 'threading.Event'.  If it is set while the file is being
+      downloaded, the download is abandoned and 'ssl_crypto.DownloadError' is
+      raised.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of the download, if it succeeds.
+
   <Side Effects>
     A 'ssl_crypto.util.TempFile' object is created on disk to store the contents of
-    'url'.
+    'url', unless 'temp_file' is given.
  
   <Exceptions>
     ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed vs
@@ -112,13 +155,18 @@ def safe_download(url, required_length):
       ' URI Schemes: ' + repr(ssl_crypto.conf.SUPPORTED_URI_SCHEMES)
     raise ssl_crypto.FormatError(message)
   
-  return _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True)
+  return _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True,
+                        hash_algorithms=hash_algorithms, temp_file=temp_file,
+                        cancel_event=cancel_event,
+                        mirror_scoreboard=mirror_scoreboard)
 
 
 
 
 
-def unsafe_download(url, required_length):
+def unsafe_download(url, required_length, hash_algorithms=None,
+                    cancel_event=None, mirror_scoreboard=None, validators=None,
+                    compression=None):
   """
   <Purpose>
     Given the 'url' and 'required_length' of the desired file, open a connection
@@ -141,6 +189,36 @@ def unsafe_download(url, required_length):
       An integer value representing the length of the file.  This is an upper
       limit.
 
+    hash_algorithms:
+      An optional list of hash algorithms whose digests are computed as the
+      file is downloaded.  See 'ssl_crypto.util.TempFile.get_digest()'.
+
+    cancel_event:
+      An optional 'threading.Event'.  If it is set while the file is being
+      downloaded, the download is abandoned and 'ssl_crypto.DownloadError' is
+      raised.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of the download, if it succeeds.
+
+    validators:
+      An optional dict, conformant to 'ssl_crypto.formats.VALIDATORS_SCHEMA',
+      of the validators of the copy of the file last downloaded from 'url'.
+      Over 'http' and 'https', the file is then only downloaded if it has
+      changed since, and the dict is updated with the validators of the
+      downloaded file.
+
+    compression:
+      The compression algorithm (e.g., 'gzip') of the file, or None.  A
+      compressed file is decompressed as it is downloaded (see
+      'ssl_crypto.util.TempFile.decompress_writes()'), to at most
+      'ssl_crypto.conf.MAX_DECOMPRESSED_LENGTH' bytes.  'required_length' is
+      the limit of the compressed file, and the digests of 'hash_algorithms'
+      are of the decompressed data.  The caller must call
+      decompress_temp_file_object() on the file returned, to ensure that the
+      compressed data is complete.
+
   <Side Effects>
     A 'ssl_crypto.util.TempFile' object is created on disk to store the contents of
     'url'.
@@ -149,6 +227,9 @@ def unsafe_download(url, required_length):
     ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed vs
     expected lengths while downloading the file.
  
+    ssl_crypto.NotModifiedError, if 'validators' is given and the server
+    responds that the file has not changed.
+
     ssl_crypto.FormatError, if any of the arguments are improperly formatted.
 
     Any other unforeseen runtime exception.
@@ -161,6 +242,12 @@ def unsafe_download(url, required_length):
   # Raise 'ssl_crypto.FormatError' if there is a mismatch.
   ssl_crypto.formats.URL_SCHEMA.check_match(url)
   ssl_crypto.formats.LENGTH_SCHEMA.check_match(required_length)
+
+  if validators is not None:
+    ssl_crypto.formats.VALIDATORS_SCHEMA.check_match(validators)
+
+  if compression is not None:
+    ssl_crypto.formats.NAME_SCHEMA.check_match(compression)
   
   # Ensure 'url' specifies one of the URI schemes in
   # 'ssl_crypto.conf.SUPPORTED_URI_SCHEMES'.  Be default, ['http', 'https'] is
@@ -176,13 +263,19 @@ def unsafe_download(url, required_length):
       ' URI Schemes: ' + repr(ssl_crypto.conf.SUPPORTED_URI_SCHEMES) 
     raise ssl_crypto.FormatError(message)
   
-  return _download_file(url, required_length, STRICT_REQUIRED_LENGTH=False)
+  return _download_file(url, required_length, STRICT_REQUIRED_LENGTH=False,
+                        hash_algorithms=hash_algorithms,
+                        cancel_event=cancel_event,
+                        mirror_scoreboard=mirror_scoreboard,
+                        validators=validators, compression=compression)
 
 
 
 
 
-def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True):
+def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True,
+                   hash_algorithms=None, temp_file=None, cancel_event=None,
+                   mirror_scoreboard=None, validators=None, compression=None):
   """
   <Purpose>
     Given the url, hashes and length of the desired file, this function 
@@ -205,13 +298,44 @@ def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True):
       False when we know that we want to turn this off for downloading the
       timestamp metadata, which has no signed required_length.
 
+    hash_algorithms:
+      An optional list of hash algorithms.  The digests of these algorithms
+      are updated with each chunk as it is downloaded, so that the file need
+      not be read back from disk to verify its hashes.
+
+    temp_file:
+      An optional 'ssl_crypto.util.TempFile' containing the first bytes of the
+      file.  If given, the download resumes at the end of 'temp_file', and
+      'temp_file' is left open if the download fails.  Only strict downloads
+      may be resumed.
+
+    cancel_event:
+      An optional 'threading.Event' that abandons the download when set.
+
+    mirror_scoreboard:
+      An optional 'ssl_crypto.mirrors.MirrorScoreboard' that records the
+      latency and throughput of a successful download.
+
+    validators:
+      An optional dict of the validators of the copy of the file last
+      downloaded, updated with those of the downloaded file.  See
+      unsafe_download().
+
+    compression:
+      The compression algorithm of the file, which is decompressed as it is
+      downloaded, or None.  See unsafe_download().  It is ignored if
+      'temp_file' is given.
+
   <Side Effects>
     A 'ssl_crypto.util.TempFile' object is created on disk to store the contents of
-    'url'.
+    'url', unless 'temp_file' is given.
  
   <Exceptions>
     ssl_crypto.DownloadLengthMismatchError, if there was a mismatch of observed vs
     expected lengths while downloading the file.
+
+    ssl_crypto.NotModifiedError, if 'validators' is given and the file has
+    not changed.
  
     ssl_crypto.FormatError, if any of the arguments are improperly formatted.
 
@@ -233,32 +357,96 @@ def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True):
   logger.info('Downloading: '+str(url))
 
   # This is the temporary file that we will return to contain the contents of
-  # the downloaded file.
-  temp_file = ssl_crypto.util.TempFile()
+  # the downloaded file.  A 'temp_file' supplied by the caller belongs to the
+  # caller, and keeps the data received so far if the download fails.
+  owns_temp_file = temp_file is None
+  if owns_temp_file:
+    temp_file = ssl_crypto.util.TempFile(hash_algorithms=hash_algorithms,
+      spool_size=ssl_crypto.conf.DOWNLOAD_SPOOL_SIZE)
+
+    # Only the decompressed data is written to disk.
+    if compression is not None:
+      temp_file.decompress_writes(compression,
+                                  ssl_crypto.conf.MAX_DECOMPRESSED_LENGTH)
+
+  # The number of bytes of the file that 'temp_file' already holds.  A file
+  # that is already complete was rejected by the caller, so start over.
+  offset = temp_file.get_length()
+  if offset > 0 and (offset >= required_length or not STRICT_REQUIRED_LENGTH):
+    temp_file.truncate()
+    offset = 0
+
+  connection = None
 
   try:
-    # Open the connection to the remote file.
-    connection = _open_connection(url)
+    # Open the connection to the remote file.  A nonzero 'offset' requests
+    # only the remaining bytes of the file.  The time until the server
+    # responds is the latency of the download.
+    request_time = timeit.default_timer()
+    connection = _open_connection(url, offset, validators)
+    response_time = timeit.default_timer()
+
+    if offset > 0:
+      if _check_content_range(connection, offset):
+        logger.info('Resuming the download at byte ' + str(offset) + '.')
+        temp_file.seek(offset)
 
-    # We ask the server about how big it thinks this file should be.
+      else:
+        # The server sent the entire file, so discard the partial download and
+        # its digests.
+        logger.info('The server does not support resuming the download.')
+        temp_file.truncate()
+        offset = 0
+
+    # We ask the server about how big it thinks this file should be.  For a
+    # resumed download, this is the number of remaining bytes.
     reported_length = _get_content_length(connection)
 
     # Then, we check whether the required length matches the reported length.
-    _check_content_length(reported_length, required_length,
+    # A file reported to be larger than 'required_length' is rejected before
+    # any of its data is transferred.
+    _check_content_length(reported_length, required_length - offset,
                           STRICT_REQUIRED_LENGTH)
 
     # Download the contents of the URL, up to the required length, to a
     # temporary file, and get the total number of downloaded bytes.
-    total_downloaded = _download_fixed_amount_of_data(connection, temp_file, 
-                                                      required_length)
+    number_of_bytes_received = \
+      _download_fixed_amount_of_data(connection, temp_file,
+                                     required_length - offset, cancel_event)
+    total_downloaded = offset + number_of_bytes_received
+    temp_file.flush()
 
     # Does the total number of downloaded bytes match the required length?
     _check_downloaded_length(total_downloaded, required_length,
                              STRICT_REQUIRED_LENGTH=STRICT_REQUIRED_LENGTH)
 
+    if validators is not None:
+      validators.clear()
+      validators.update(_get_validators(connection.info()))
+
+    if mirror_scoreboard is not None:
+      mirror_scoreboard.record_download(url, response_time - request_time,
+                                        number_of_bytes_received,
+                                        timeit.default_timer() - response_time)
+
+  # The file is unchanged, and was not downloaded.
+  except ssl_crypto.NotModifiedError:
+    if owns_temp_file:
+      temp_file.close_temp_file()
+    logger.info('Not modified: ' + str(url))
+    raise
+
   except:
-    # Close 'temp_file'.  Any written data is lost.
-    temp_file.close_temp_file()
+    # The connection is closed here if the download was abandoned before
+    # _download_fixed_amount_of_data() (e.g., the reported length is too
+    # large).  Closing it again is harmless.
+    if connection is not None:
+      connection.close()
+
+    # Close 'temp_file'.  Any written data is lost, unless the caller owns
+    # 'temp_file' and may resume the download later.
+    if owns_temp_file:
+      temp_file.close_temp_file()
     logger.exception('Could not download URL: '+str(url))
     raise
 
@@ -269,12 +457,22 @@ def _download_file(url, required_length, STRICT_REQUIRED_LENGTH=True):
 
 
 
-def _download_fixed_amount_of_data(connection, temp_file, required_length):
+def _download_fixed_amount_of_data(connection, temp_file, required_length,
+                                   cancel_event=None):
   """
   <Purpose>
     This is a helper function, where the download really happens. While-block
-    reads data from connection a fixed chunk of data at a time, or less, until
+    reads data from connection a chunk of data at a time, or less, until
     'required_length' is reached.
+
+    If the connection supports readinto1() (i.e., at most one read from the
+    socket per call), the data is read into a preallocated buffer, and the
+    chunks grow from 'ssl_crypto.conf.CHUNK_SIZE' up to
+    'ssl_crypto.conf.MAX_CHUNK_SIZE' bytes while the server fills every read.
+    The average download speed is then checked after every read that is not
+    filled, and at least every 'ssl_crypto.conf.DOWNLOAD_SPEED_CHECK_INTERVAL'
+    bytes.  Otherwise, the chunks are 'ssl_crypto.conf.CHUNK_SIZE' bytes, and
+    the speed is checked after every chunk.
   
   <Arguments>
     connection:
@@ -290,11 +488,17 @@ def _download_fixed_amount_of_data(connection, temp_file, required_length):
       always specified by the TUF metadata for the data file in question
       (except in the case of timestamp metadata, in which case we would fix a
       reasonable upper bound).
+
+    cancel_event:
+      An optional 'threading.Event'.  It is checked before every chunk is
+      read, and the download is abandoned once it is set.
   
   <Side Effects>
     Data from the server will be written to 'temp_file'.
  
   <Exceptions>
+    ssl_crypto.DownloadError, if 'cancel_event' is set during the download.
+
     Runtime or network exceptions will be raised without question.
  
   <Returns>
@@ -310,34 +514,82 @@ def _download_fixed_amount_of_data(connection, temp_file, required_length):
 
   # Keep track of total bytes downloaded.
   number_of_bytes_received = 0
+
+  # The number of bytes received by filled reads since the download speed was
+  # last checked.
+  number_of_bytes_unchecked = 0
+
+  # A blocking read() waits for all of the bytes it asks for, so the chunks of
+  # connections without readinto1() are never grown.  Slicing 'buffer' does
+  # not copy it.
+  readinto1 = getattr(connection, 'readinto1', None)
+  buffer = None
+  if readinto1 is not None:
+    buffer = memoryview(bytearray(max(ssl_crypto.conf.MAX_CHUNK_SIZE,
+                                      ssl_crypto.conf.CHUNK_SIZE)))
+
+  chunk_size = ssl_crypto.conf.CHUNK_SIZE
   
   start_time = timeit.default_timer()
 
   try:
     while True:
-      # We download a fixed chunk of data in every round. This is so that we
+      # Stop as soon as the caller no longer needs the file (e.g., another
+      # mirror already provided it).
+      if cancel_event is not None and cancel_event.is_set():
+        raise ssl_crypto.DownloadError('The download was cancelled.')
+
+      # We download a bounded chunk of data in every round. This is so that we
       # can defend against slow retrieval attacks. Furthermore, we do not wish
       # to download an extremely large file in one shot.
       data = b'' 
-      read_amount = min(ssl_crypto.conf.CHUNK_SIZE,
+      read_amount = min(chunk_size,
                         required_length - number_of_bytes_received)
       #logger.debug('Reading next chunk...')
       
       try: 
-        data = connection.read(read_amount)
+        if buffer is not None:
+          data = buffer[:readinto1(buffer[:read_amount])]
+
+        else:
+          data = connection.read(read_amount)
      
       # Python 3.2 returns 'IOError' if the remote file object has timed out. 
       except (socket.error, IOError):
         pass
+
+      else:
+        # The server has no more data to send (e.g., the file is smaller than
+        # the upper bound of an unsafe download).  Stop now, rather than
+        # reading nothing until the slow start grace period is over.
+        if not data:
+          message = 'Downloaded '+str(number_of_bytes_received)+'/'+ \
+            str(required_length)+' bytes.'
+          logger.debug(message)
+          break
     
       number_of_bytes_received = number_of_bytes_received + len(data)
       
-      # Data successfully read from the connection.  Store it. 
-      temp_file.write(data)
+      # Data successfully read from the connection.  Store it.  The file is
+      # flushed once it is complete, rather than after every chunk.
+      temp_file.write(data, auto_flush=False)
 
       if number_of_bytes_received == required_length:
         break        
 
+      # The server keeps up with the reads, so read more at a time, and check
+      # its speed less often.  A read that is not filled (e.g., by a server
+      # that trickles data, or a read that timed out) is always checked.
+      if buffer is not None and len(data) == read_amount:
+        chunk_size = min(chunk_size * 2, len(buffer))
+        number_of_bytes_unchecked = number_of_bytes_unchecked + len(data)
+
+        if number_of_bytes_unchecked < \
+           ssl_crypto.conf.DOWNLOAD_SPEED_CHECK_INTERVAL:
+          continue
+
+      number_of_bytes_unchecked = 0
+
       stop_time = timeit.default_timer()
       seconds_spent_receiving = stop_time - start_time
       
@@ -428,7 +680,7 @@ def _get_opener(scheme=None):
 
 
 
-def _open_connection(url):
+def _open_connection(url, offset=0, validators=None):
   """
   <Purpose>
     Helper function that opens a connection to the url. urllib2 supports http, 
@@ -442,9 +694,19 @@ def _open_connection(url):
   <Arguments>
     url:
       URL string (e.g., 'http://...' or 'ftp://...' or 'file://...') 
+
+    offset:
+      The byte offset at which the download should start.  Only 'http' and
+      'https' URLs send a 'Range' request; the caller must check whether the
+      server honoured it (see _check_content_range()).
+
+    validators:
+      An optional dict of the validators of the copy of 'url' last downloaded.
+      Only 'http' and 'https' URLs send a conditional request.
     
   <Exceptions>
-    None.
+    ssl_crypto.NotModifiedError, if 'validators' is given and the server
+    responds that 'url' has not changed.
     
   <Side Effects>
     Opens a connection to a remote server.
@@ -462,6 +724,12 @@ def _open_connection(url):
   # Python-urllib/x.y.
 
   parsed_url = six.moves.urllib.parse.urlparse(url)
+
+  # Requests over 'http' and 'https' reuse the persistent connections of
+  # '_connection_pool'.
+  if parsed_url.scheme in _POOLED_URI_SCHEMES:
+    return _open_pooled_connection(url, offset, validators=validators)
+
   opener = _get_opener(scheme=parsed_url.scheme)
   request = _get_request(url)
   
@@ -471,6 +739,251 @@ def _open_connection(url):
 
 
 
+def _open_pooled_connection(url, offset=0,
+                            redirections_left=_MAX_REDIRECTIONS,
+                            validators=None):
+  """
+  <Purpose>
+    Helper function that requests 'url' over a persistent connection borrowed
+    from '_connection_pool'.  A connection that was reused, but that the server
+    closed while it was idle, is replaced by a new connection and the request
+    is sent again.  Redirections are followed, as they are by urllib's
+    default opener.
+
+  <Arguments>
+    url:
+      An 'http' or 'https' URL string.
+
+    offset:
+      If nonzero, the bytes of 'url' from 'offset' onwards are requested with
+      a 'Range' header.  The server may still respond with the entire file.
+
+    redirections_left:
+      The number of redirections that may still be followed.
+
+    validators:
+      If given, a dict of the validators of the copy of 'url' last downloaded,
+      sent in the 'If-None-Match' and 'If-Modified-Since' headers.
+
+  <Exceptions>
+    six.moves.urllib.error.HTTPError, if the server responds with a status
+    other than 200 (or 206, for a 'Range' request), or redirects too many
+    times.
+
+    ssl_crypto.NotModifiedError, if 'validators' is given and the server
+    responds with a 304 (Not Modified) status.
+
+    ssl_crypto.ConnectionPoolTimeoutError, if every connection to the host
+    stays in use for 'ssl_crypto.conf.CONNECTION_POOL_TIMEOUT' seconds.
+
+    Runtime or network exceptions will be raised without question.
+
+  <Side Effects>
+    Opens a connection to a remote server, or reuses an idle one.
+
+  <Returns>
+    A '_PooledResponse' file-like object.  Closing it returns the connection
+    to '_connection_pool'.
+  """
+
+  parsed_url = six.moves.urllib.parse.urlparse(url)
+
+  # Connections through a proxy are pooled apart from direct connections.
+  proxy_url = _get_proxy_url(parsed_url)
+  pool_key = (parsed_url.scheme, parsed_url.netloc, proxy_url)
+
+  # Request the path (and query) of 'url'.  Fragments are never sent to the
+  # server.
+  request_path = parsed_url.path or '/'
+  if parsed_url.query:
+    request_path = request_path + '?' + parsed_url.query
+
+  # The 'Accept-encoding' header protects against "creative" interpretation
+  # of the RFC.  See _get_request().
+  request_headers = {'Accept-encoding': 'identity'}
+  accepted_status_codes = [200]
+
+  # An 'http' proxy is sent the absolute URL of the file.  'https' requests
+  # are tunneled through the proxy instead (see _ConnectionPool.acquire()).
+  if proxy_url is not None and parsed_url.scheme == 'http':
+    request_path = parsed_url.scheme + '://' + parsed_url.netloc + request_path
+    request_headers.update(_get_proxy_headers(proxy_url))
+
+  if offset > 0:
+    request_headers['Range'] = 'bytes=' + str(offset) + '-'
+    accepted_status_codes.append(206)
+
+  # Request the file only if it has changed.
+  if validators:
+    if 'etag' in validators:
+      request_headers['If-None-Match'] = validators['etag']
+
+    if 'last_modified' in validators:
+      request_headers['If-Modified-Since'] = validators['last_modified']
+
+  while True:
+    connection, reused = _connection_pool.acquire(pool_key)
+
+    try:
+      connection.request('GET', request_path, headers=request_headers)
+      response = connection.getresponse()
+
+    # A timeout is not retried, otherwise a slow server would be given twice
+    # 'ssl_crypto.conf.SOCKET_TIMEOUT' seconds.
+    except socket.timeout:
+      _connection_pool.release(pool_key, connection, reusable=False)
+      raise
+
+    except (socket.error, six.moves.http_client.HTTPException):
+      _connection_pool.release(pool_key, connection, reusable=False)
+
+      # The server may close an idle keep-alive connection at any time.  Only
+      # a new connection is trusted to report a genuine network error.
+      if reused:
+        logger.debug('Reused connection to ' + repr(parsed_url.netloc) + \
+                     ' was closed by the server.  Reconnecting.')
+        continue
+
+      raise
+
+    else:
+      break
+
+  pooled_response = _PooledResponse(pool_key, connection, response)
+
+  if response.status in _REDIRECT_STATUS_CODES and \
+     response.getheader('Location') is not None and redirections_left > 0:
+    redirected_url = six.moves.urllib.parse.urljoin(url,
+                                               response.getheader('Location'))
+    pooled_response.close()
+    logger.debug('Redirected from ' + repr(url) + ' to ' + repr(redirected_url))
+
+    # A redirection may point to a scheme that is not pooled (or supported).
+    parsed_redirected_url = six.moves.urllib.parse.urlparse(redirected_url)
+    if parsed_redirected_url.scheme not in _POOLED_URI_SCHEMES:
+      message = 'Redirected to an unsupported URI scheme: ' + \
+        repr(redirected_url)
+      raise ssl_crypto.FormatError(message)
+
+    return _open_pooled_connection(redirected_url, offset,
+                                   redirections_left - 1, validators)
+
+  # A 304 response has no body.  Reading it lets the connection be reused.
+  if response.status == 304 and validators:
+    pooled_response.read()
+    pooled_response.close()
+    raise ssl_crypto.NotModifiedError(repr(url) + ' has not changed.')
+
+  if response.status not in accepted_status_codes:
+    pooled_response.close()
+    raise six.moves.urllib.error.HTTPError(url, response.status,
+                                           response.reason, response.msg, None)
+
+  return pooled_response
+
+
+
+
+
+def _get_proxy_url(parsed_url):
+  """
+  <Purpose>
+    Helper function that returns the URL of the proxy that a request for
+    'parsed_url' must go through, as urllib's default ProxyHandler would find
+    it (e.g., in the 'http_proxy' and 'https_proxy' environment variables,
+    except for the hosts listed in 'no_proxy').
+
+  <Arguments>
+    parsed_url:
+      The parsed 'http' or 'https' URL of the request.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    The URL string of the proxy, or None if the request is not proxied.
+  """
+
+  proxy_url = six.moves.urllib.request.getproxies().get(parsed_url.scheme)
+
+  if not proxy_url or \
+     six.moves.urllib.request.proxy_bypass(parsed_url.hostname):
+    return None
+
+  # A proxy may be given without a scheme (e.g., 'proxy.example.com:3128').
+  if '://' not in proxy_url:
+    proxy_url = 'http://' + proxy_url
+
+  return proxy_url
+
+
+
+
+
+def _get_proxy_headers(proxy_url):
+  """
+  <Purpose>
+    Helper function that returns the headers that authenticate a request to
+    'proxy_url' with the credentials it contains, if any.
+
+  <Arguments>
+    proxy_url:
+      The URL string of a proxy, as returned by _get_proxy_url().
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    A dict of header names to values.
+  """
+
+  parsed_proxy_url = six.moves.urllib.parse.urlparse(proxy_url)
+
+  if parsed_proxy_url.username is None:
+    return {}
+
+  credentials = six.moves.urllib.parse.unquote(parsed_proxy_url.username) + \
+    ':' + six.moves.urllib.parse.unquote(parsed_proxy_url.password or '')
+  credentials = base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+
+  return {'Proxy-Authorization': 'Basic ' + credentials}
+
+
+
+
+
+def close_pooled_connections():
+  """
+  <Purpose>
+    Close every idle persistent connection kept by the connection pool.
+    Connections currently in use are closed once they are released.  New
+    downloads open new connections, as needed.
+
+  <Arguments>
+    None.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    Closes the idle connections to all mirror hosts.
+
+  <Returns>
+    None.
+  """
+
+  _connection_pool.close_idle_connections()
+
+
+
+
+
 def _get_content_length(connection):
   """
   <Purpose>
@@ -516,6 +1029,53 @@ def _get_content_length(connection):
 
 
 
+def _get_validators(response_headers):
+  """
+  <Purpose>
+    A helper function that returns the validators of the file that the server
+    sent (i.e., the values of its 'ETag' and 'Last-Modified' response
+    headers).  A 'Last-Modified' time less than a second before the 'Date' of
+    the response is a weak validator, as the file may have changed again
+    within that second (RFC 7232, section 2.2.2), so it is left out.
+
+  <Arguments>
+    response_headers:
+      The headers of the response, with case-insensitive or lowercase names.
+
+  <Side Effects>
+    None.
+
+  <Exceptions>
+    None.
+
+  <Returns>
+    A dict conformant to 'ssl_crypto.formats.VALIDATORS_SCHEMA'.
+  """
+
+  validators = {}
+
+  etag = response_headers.get('etag')
+  if etag is not None:
+    validators['etag'] = etag
+
+  last_modified = response_headers.get('last-modified')
+  date = response_headers.get('date')
+
+  if last_modified is not None and date is not None:
+    last_modified_time = email.utils.parsedate_tz(last_modified)
+    date_time = email.utils.parsedate_tz(date)
+
+    if last_modified_time is not None and date_time is not None and \
+       email.utils.mktime_tz(date_time) - \
+       email.utils.mktime_tz(last_modified_time) >= 1:
+      validators['last_modified'] = last_modified
+
+  return validators
+
+
+
+
+
 def _check_content_length(reported_length, required_length, strict_length=True):
   """
   <Purpose>
@@ -537,7 +1097,9 @@ def _check_content_length(reported_length, required_length, strict_length=True):
     No known side effects.
  
   <Exceptions>
-    No known exceptions.
+    ssl_crypto.DownloadLengthMismatchError, if the server reported a length
+    greater than 'required_length'.  Downloading such a file can only end in
+    a length mismatch, or in a truncated file, so it is not attempted.
  
   <Returns>
     None.
@@ -545,13 +1107,19 @@ def _check_content_length(reported_length, required_length, strict_length=True):
 
   logger.debug('The server reported a length of '+repr(reported_length)+' bytes.')
   comparison_result = None
+
+  # The server may not report a length (e.g., chunked transfer encoding).  The
+  # download loop still never reads more than 'required_length' bytes.
+  if reported_length is None:
+    return
  
+  if reported_length > required_length:
+    raise ssl_crypto.DownloadLengthMismatchError(required_length,
+                                                 reported_length)
+
   if reported_length < required_length:
     comparison_result = 'less than' 
   
-  elif reported_length > required_length:
-    comparison_result = 'greater than' 
-  
   else:
     comparison_result = 'equal to' 
 
@@ -569,6 +1137,57 @@ def _check_content_length(reported_length, required_length, strict_length=True):
 
 
   
+def _check_content_range(connection, offset):
+  """
+  <Purpose>
+    A helper function that checks whether the server honoured a request for
+    the bytes of a file from 'offset' onwards.
+
+  <Arguments>
+    connection:
+      The object that the _open_connection function returns for communicating
+      with the server about the contents of a URL.
+
+    offset:
+      The byte offset requested with the 'Range' header.
+
+  <Side Effects>
+    No known side effects.
+ 
+  <Exceptions>
+    ssl_crypto.DownloadError, if the server responded with partial content
+    that does not start at 'offset'.
+ 
+  <Returns>
+    True, if the server responded with a partial content (206) status, and a
+    'Content-Range' header (e.g., 'bytes 100-999/1000') that starts at
+    'offset'.  False, if the response carries the entire file.
+  """
+
+  if connection.getcode() != 206:
+    return False
+
+  content_range = connection.info().get('Content-Range')
+
+  # Parse 'bytes <first>-<last>/<total>' and compare <first> to 'offset'.
+  try:
+    unit, byte_range = content_range.strip().split(' ', 1)
+    first_byte = int(byte_range.split('-', 1)[0], 10)
+
+  except (AttributeError, ValueError):
+    unit = first_byte = None
+
+  if unit != 'bytes' or first_byte != offset:
+    message = 'Requested the bytes from ' + repr(offset) + ' onwards, but' + \
+      ' the server sent the content range ' + repr(content_range) + '.'
+    raise ssl_crypto.DownloadError(message)
+
+  return True
+
+
+
+
+  
 def _check_downloaded_length(total_downloaded, required_length,
                              STRICT_REQUIRED_LENGTH=True):
   """
@@ -673,7 +1292,10 @@ class VerifiedHTTPSConnection(six.moves.http_client.HTTPSConnection):
                                 cert_reqs=ssl.CERT_REQUIRED,
                                 ca_certs=cert_path)
 
-    match_hostname(self.sock.getpeercert(), self.host)
+    # A connection tunneled through a proxy must present the certificate of
+    # the tunnel's host, not of the proxy.
+    match_hostname(self.sock.getpeercert(),
+                   getattr(self, '_tunnel_host', None) or self.host)
 
 
 
@@ -692,3 +1314,215 @@ class VerifiedHTTPSHandler(six.moves.urllib.request.HTTPSHandler):
 
   def https_open(self, req):
     return self.do_open(self.specialized_conn_class, req)
+
+
+
+
+
+
+class _PooledResponse(object):
+  """
+  A file-like wrapper around the HTTP response of a pooled connection.  It
+  provides the subset of the urllib response interface needed by this module
+  (i.e., read(), readinto1(), info(), and close()).  Closing the response returns its
+  connection to '_connection_pool' if the response was read entirely and the
+  server agreed to keep the connection alive, otherwise the connection is
+  closed.
+  """
+
+  def __init__(self, pool_key, connection, response):
+    self._pool_key = pool_key
+    self._connection = connection
+    self._response = response
+
+    # See _download_fixed_amount_of_data().
+    if not hasattr(response, 'readinto1'):
+      self.readinto1 = None
+
+
+  def info(self):
+    return self._response.msg
+
+
+  def getcode(self):
+    return self._response.status
+
+
+  def read(self, amount=None):
+    return self._response.read(amount)
+
+
+  def readinto1(self, buffer):
+    # 'http.client.HTTPResponse' (Python 3.5+) reads at most once from the
+    # socket.
+    return self._response.readinto1(buffer)
+
+
+  def close(self):
+    # close() may be called more than once (e.g., see
+    # _download_fixed_amount_of_data()).
+    if self._connection is None:
+      return
+
+    # A connection can only be reused once its previous response has been
+    # consumed entirely.
+    reusable = self._response.isclosed() and not self._response.will_close
+
+    if not reusable:
+      self._response.close()
+
+    _connection_pool.release(self._pool_key, self._connection, reusable)
+    self._connection = None
+
+
+
+
+
+class _ConnectionPool(object):
+  """
+  A thread-safe pool of persistent connections, indexed by the
+  (scheme, netloc, proxy URL) of the mirror host they are connected to, and of
+  the proxy they go through, if any.  At most
+  'ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR' connections are open to the
+  same host; additional requests wait until a connection is released, for up
+  to 'ssl_crypto.conf.CONNECTION_POOL_TIMEOUT' seconds.  Idle connections are
+  evicted after 'ssl_crypto.conf.CONNECTION_IDLE_TIMEOUT' seconds.
+  """
+
+  def __init__(self):
+    self._condition = threading.Condition()
+
+    # pool_key: [(connection, time the connection was released), ...]
+    self._idle_connections = {}
+
+    # pool_key: number of open connections (i.e., both idle and in use).
+    self._open_connections = {}
+
+
+  def acquire(self, pool_key):
+    """
+    Return a (connection, reused) tuple, where 'reused' is True if the
+    connection was previously used by another request.  Raise
+    'ssl_crypto.ConnectionPoolTimeoutError' if no connection is released
+    within 'ssl_crypto.conf.CONNECTION_POOL_TIMEOUT' seconds.
+    """
+
+    scheme, netloc, proxy_url = pool_key
+
+    deadline = None
+    if ssl_crypto.conf.CONNECTION_POOL_TIMEOUT is not None:
+      deadline = \
+        timeit.default_timer() + ssl_crypto.conf.CONNECTION_POOL_TIMEOUT
+
+    with self._condition:
+      while True:
+        self._evict_idle_connections(pool_key)
+
+        idle_connections = self._idle_connections.get(pool_key)
+        if idle_connections:
+          connection, released_at = idle_connections.pop()
+          return connection, True
+
+        open_connections = self._open_connections.get(pool_key, 0)
+        if open_connections < ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR:
+          self._open_connections[pool_key] = open_connections + 1
+          break
+
+        # Every connection to the host is in use (or was leaked by a caller
+        # that never closed its response).
+        if deadline is None:
+          self._condition.wait()
+          continue
+
+        time_left = deadline - timeit.default_timer()
+        if time_left <= 0:
+          raise ssl_crypto.ConnectionPoolTimeoutError('No connection to ' +
+            repr(netloc) + ' was released in time.')
+
+        self._condition.wait(time_left)
+
+    # The connection is established lazily, by its first request.  A proxied
+    # connection is opened to the proxy, and 'https' requests are tunneled
+    # through it to 'netloc'.
+    try:
+      host = netloc
+      if proxy_url is not None:
+        # The credentials of the proxy, if any, are sent in a header.
+        proxy_netloc = six.moves.urllib.parse.urlparse(proxy_url).netloc
+        host = proxy_netloc.rpartition('@')[2]
+
+      if scheme == 'https':
+        connection = VerifiedHTTPSConnection(host,
+                                     timeout=ssl_crypto.conf.SOCKET_TIMEOUT)
+
+        if proxy_url is not None:
+          connection.set_tunnel(netloc,
+                                headers=_get_proxy_headers(proxy_url))
+
+      else:
+        connection = six.moves.http_client.HTTPConnection(host,
+                                     timeout=ssl_crypto.conf.SOCKET_TIMEOUT)
+
+    except:
+      self._forget_connection(pool_key)
+      raise
+
+    return connection, False
+
+
+  def release(self, pool_key, connection, reusable):
+    """
+    Return 'connection' to the pool if 'reusable', otherwise close it.
+    """
+
+    if not reusable:
+      connection.close()
+      self._forget_connection(pool_key)
+      return
+
+    with self._condition:
+      self._idle_connections.setdefault(pool_key, []).append(
+        (connection, timeit.default_timer()))
+      self._condition.notify()
+
+
+  def close_idle_connections(self):
+    with self._condition:
+      for pool_key, idle_connections in six.iteritems(self._idle_connections):
+        for connection, released_at in idle_connections:
+          connection.close()
+        self._open_connections[pool_key] -= len(idle_connections)
+
+      self._idle_connections.clear()
+      self._condition.notify_all()
+
+
+  def _forget_connection(self, pool_key):
+    with self._condition:
+      self._open_connections[pool_key] -= 1
+      self._condition.notify()
+
+
+  def _evict_idle_connections(self, pool_key):
+    # Called with 'self._condition' held.
+    idle_connections = self._idle_connections.get(pool_key)
+    if not idle_connections:
+      return
+
+    now = timeit.default_timer()
+    still_idle = []
+
+    for connection, released_at in idle_connections:
+      if now - released_at > ssl_crypto.conf.CONNECTION_IDLE_TIMEOUT:
+        logger.debug('Evicting idle connection to ' + repr(pool_key[1]))
+        connection.close()
+        self._open_connections[pool_key] -= 1
+
+      else:
+        still_idle.append((connection, released_at))
+
+    self._idle_connections[pool_key] = still_idle
+
+
+# The persistent connections shared by all downloads.
+_connection_pool = _ConnectionPool()
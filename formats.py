@@ -188,6 +188,10 @@ RSAKEYBITS_SCHEMA = SCHEMA.Integer(lo=2048)
 # as requiring them to be a power of 2. 
 NUMBINS_SCHEMA = SCHEMA.Integer(lo=1)
 
+# The number of worker threads that may run at the same time (e.g., the number
+# of target files downloaded concurrently).  Must be 1, or greater.
+NUMWORKERS_SCHEMA = SCHEMA.Integer(lo=1)
+
 # A PyCrypto signature.
 PYCRYPTOSIGNATURE_SCHEMA = SCHEMA.AnyBytes()
 
@@ -517,6 +521,70 @@ MIRRORDICT_SCHEMA = SCHEMA.DictOf(
   key_schema = SCHEMA.AnyString(),
   value_schema = MIRROR_SCHEMA)
 
+# The performance of a mirror host, as observed by the client.  'latency' is
+# the moving average of the milliseconds until a response arrives,
+# 'throughput' the moving average of the bytes/second received, and 'failures'
+# the Unix times of the most recent failed downloads.
+MIRRORSCORE_SCHEMA = SCHEMA.Object(
+  object_name = 'MIRRORSCORE_SCHEMA',
+  latency = SCHEMA.Optional(SCHEMA.Integer(lo=0)),
+  throughput = SCHEMA.Optional(SCHEMA.Integer(lo=0)),
+  failures = SCHEMA.ListOf(UNIX_TIMESTAMP_SCHEMA))
+
+# A dictionary of mirror scores, as saved by
+# 'ssl_crypto.mirrors.MirrorScoreboard'.  The dict keys hold the mirror host
+# ('scheme://netloc') and the dict values the host's 'MIRRORSCORE_SCHEMA'.
+MIRRORSCOREBOARD_SCHEMA = SCHEMA.DictOf(
+  key_schema = SCHEMA.AnyString(),
+  value_schema = MIRRORSCORE_SCHEMA)
+
+# The file properties of a target file saved locally, and its hashes when it
+# had these properties.  The file is assumed unchanged while its length,
+# modification and change times (in nanoseconds), and inode are unchanged.
+# These integers do not fit in 32 bits.
+TARGETMANIFESTENTRY_SCHEMA = SCHEMA.Object(
+  object_name = 'TARGETMANIFESTENTRY_SCHEMA',
+  length = SCHEMA.Integer(lo=0, hi=2**63 - 1),
+  mtime_ns = SCHEMA.Integer(lo=-2**63, hi=2**63 - 1),
+  ctime_ns = SCHEMA.Integer(lo=-2**63, hi=2**63 - 1),
+  inode = SCHEMA.Integer(lo=0, hi=2**64 - 1),
+  hashes = HASHDICT_SCHEMA)
+
+# A dictionary of the target files saved locally by the updater.  The dict
+# keys hold absolute file paths and the dict values their
+# 'TARGETMANIFESTENTRY_SCHEMA'.
+TARGETMANIFEST_SCHEMA = SCHEMA.DictOf(
+  key_schema = PATH_SCHEMA,
+  value_schema = TARGETMANIFESTENTRY_SCHEMA)
+
+# The validators of a file downloaded over HTTP (i.e., the values of its 'ETag'
+# and 'Last-Modified' response headers).  They are sent back to the server to
+# request the file again only if it has changed.
+VALIDATORS_SCHEMA = SCHEMA.Object(
+  object_name = 'VALIDATORS_SCHEMA',
+  etag = SCHEMA.Optional(SCHEMA.AnyString()),
+  last_modified = SCHEMA.Optional(SCHEMA.AnyString()))
+
+# A metadata file parsed by the updater: the SHA-256 digest of the file, and
+# the 'signed' object of its signable, serialized with 'marshal'.
+PARSEDMETADATAENTRY_SCHEMA = SCHEMA.Object(
+  object_name = 'PARSEDMETADATAENTRY_SCHEMA',
+  digest = HASH_SCHEMA,
+  signed = SCHEMA.AnyBytes())
+
+# The parsed metadata files kept in the client's metadata directory.  The dict
+# keys of 'entries' hold the paths of the metadata files relative to the
+# metadata directory (e.g., 'current/root.json').  A cache is only used by the
+# cache 'version' and the Python version ('major.minor') that wrote it, as the
+# 'marshal' format may change between Python versions.
+PARSEDMETADATACACHE_SCHEMA = SCHEMA.Object(
+  object_name = 'PARSEDMETADATACACHE_SCHEMA',
+  version = SCHEMA.Integer(lo=1),
+  python_version = SCHEMA.AnyString(),
+  entries = SCHEMA.DictOf(
+    key_schema = RELPATH_SCHEMA,
+    value_schema = PARSEDMETADATAENTRY_SCHEMA))
+
 # A Mirrorlist: indicates all the live mirrors, and what documents they
 # serve.
 MIRRORLIST_SCHEMA = SCHEMA.Object(
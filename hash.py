@@ -87,6 +87,11 @@ if not _supported_libraries: # pragma: no cover
 _DEFAULT_HASH_ALGORITHM = 'sha256'
 _DEFAULT_HASH_LIBRARY = 'hashlib'
 
+# The number of bytes read at a time by digest_filename_algorithms().  Large
+# reads let hashlib release the GIL while it hashes, so that files can be
+# hashed in parallel threads.
+_FILE_CHUNK_SIZE = 1048576
+
 
 
 
@@ -282,3 +287,55 @@ def digest_filename(filename, algorithm=_DEFAULT_HASH_ALGORITHM,
   file_object.close()
   
   return digest_object
+
+
+
+
+
+def digest_filename_algorithms(filename, algorithms,
+                               hash_library=_DEFAULT_HASH_LIBRARY):
+  """
+  <Purpose>
+    Generate a digest object for each of 'algorithms', and update their
+    hashes in a single read of the file specified by filename.
+
+  <Arguments>
+    filename:
+      The filename belonging to the file object to be used.
+
+    algorithms:
+      A list of hash algorithms (e.g., ['sha256', 'sha512']).
+
+    hash_library:
+      The library providing the hash algorithms
+      (e.g., pycrypto, hashlib).
+
+  <Exceptions>
+    ssl_crypto.UnsupportedAlgorithmError
+    ssl_crypto.Error
+    IOError, if 'filename' cannot be read.
+
+  <Side Effects>
+    'filename' is read, and closed before returning.
+
+  <Returns>
+    A dict of the algorithms to their digest objects.
+  """
+
+  # digest() raises:
+  # ssl_crypto.UnsupportedAlgorithmError
+  # ssl_crypto.Error
+  digest_objects = {}
+  for algorithm in algorithms:
+    digest_objects[algorithm] = digest(algorithm, hash_library)
+
+  with open(filename, 'rb') as file_object:
+    while True:
+      data = file_object.read(_FILE_CHUNK_SIZE)
+      if not data:
+        break
+
+      for digest_object in six.itervalues(digest_objects):
+        digest_object.update(data)
+
+  return digest_objects
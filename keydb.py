@@ -52,6 +52,16 @@ logger = logging.getLogger('ssl_crypto.keydb')
 # The key database.
 _keydb_dict = {}
 
+# The parsed public key objects of the keys in the key database, indexed by
+# keyid, so that verifying signatures does not parse their public keys again.
+# See 'ssl_crypto.keys.load_public_key()'.
+_public_key_objects = {}
+
+# Incremented whenever the key database changes, so that results derived from
+# its keys (e.g., the signature verifications cached by 'ssl_crypto.sig') can
+# tell when they are stale.
+_keydb_generation = 0
+
 
 def create_keydb_from_root_metadata(root_metadata):
   """
@@ -88,7 +98,7 @@ def create_keydb_from_root_metadata(root_metadata):
   ssl_crypto.formats.ROOT_SCHEMA.check_match(root_metadata)
 
   # Clear the key database.
-  _keydb_dict.clear()
+  clear_keydb()
 
   # Iterate the keys found in 'root_metadata' by converting them to
   # 'RSAKEY_SCHEMA' if their type is 'rsa', and then adding them to the
@@ -177,6 +187,20 @@ def add_key(key_dict, keyid=None):
     raise ssl_crypto.KeyAlreadyExistsError('Key: '+keyid)
  
   _keydb_dict[keyid] = copy.deepcopy(key_dict)
+  _increment_generation()
+
+  # A key whose public key cannot be parsed here is still added; verifying its
+  # signatures parses it again and raises the error then.
+  try:
+    public_key_object = ssl_crypto.keys.load_public_key(key_dict)
+
+  except ssl_crypto.Error as e:
+    logger.debug('Could not load the public key of ' + repr(keyid) + ': ' +
+                 str(e))
+
+  else:
+    if public_key_object is not None:
+      _public_key_objects[keyid] = public_key_object
 
 
 
@@ -252,6 +276,8 @@ def remove_key(keyid):
   # Remove the key belonging to 'keyid' if found in the key database.
   if keyid in _keydb_dict: 
     del _keydb_dict[keyid]
+    _public_key_objects.pop(keyid, None)
+    _increment_generation()
   else:
     raise ssl_crypto.UnknownKeyError('Key: '+keyid)
 
@@ -278,3 +304,76 @@ def clear_keydb():
   """
   
   _keydb_dict.clear()
+  _public_key_objects.clear()
+  _increment_generation()
+
+
+
+
+
+def get_public_key_object(keyid):
+  """
+  <Purpose>
+    Return the parsed public key object of the key belonging to 'keyid', as
+    loaded by 'ssl_crypto.keys.load_public_key()' when the key was added.  It
+    may be passed to 'ssl_crypto.keys.verify_signature_bytes()'.
+
+  <Arguments>
+    keyid:
+      An object conformant to 'ssl_crypto.formats.KEYID_SCHEMA'.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if 'keyid' does not have the correct format.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    The public key object, or None if there is none for 'keyid' (e.g., it is
+    not an RSA key, or not in the key database).
+  """
+
+  # Does 'keyid' have the correct format?
+  # Raise 'ssl_crypto.FormatError' is the match fails.
+  ssl_crypto.formats.KEYID_SCHEMA.check_match(keyid)
+
+  return _public_key_objects.get(keyid)
+
+
+
+
+
+def get_generation():
+  """
+  <Purpose>
+    Return the generation of the keydb key database, a number that changes
+    whenever a key is added or removed, or the database is cleared.  Callers
+    caching results derived from the keys in the database can compare
+    generations to tell whether their results are stale.
+
+  <Arguments>
+    None.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    An integer.
+  """
+
+  return _keydb_generation
+
+
+
+
+
+def _increment_generation():
+  """
+    Non-public function that marks a change to the key database.
+  """
+
+  global _keydb_generation
+  _keydb_generation += 1
@@ -25,7 +25,8 @@
   http://ed25519.cr.yp.to/
   
   The (RSA and Ed25519)-related functions provided include generate_rsa_key(),
-  generate_ed25519_key(), create_signature(), and verify_signature().
+  generate_ed25519_key(), create_signature(), verify_signature(),
+  verify_signature_bytes(), and load_public_key().
   The cryptography libraries called by 'ssl_crypto.keys.py' generate the actual TUF
   keys and the functions listed above can be viewed as the easy-to-use public
   interface.
@@ -840,7 +841,78 @@ def verify_signature(key_dict, signature, data):
 
   # Does 'signature' have the correct format?
   ssl_crypto.formats.SIGNATURE_SCHEMA.check_match(signature)
-  
+
+  # Convert 'data' to canonical JSON format so that repeatable signatures are
+  # generated across different platforms and Python key dictionaries.  The
+  # resulting 'data' is a string encoded in UTF-8 and compatible with the input
+  # expected by the cryptography functions called by verify_signature_bytes().
+  data = ssl_crypto.formats.encode_canonical(data).encode('utf-8')
+
+  return verify_signature_bytes(key_dict, signature, data)
+
+
+
+
+
+def verify_signature_bytes(key_dict, signature, data, public_key_object=None):
+  """
+  <Purpose>
+    Like verify_signature(), but 'data' is the UTF-8 encoded canonical JSON
+    of the signed object rather than the object itself.  Callers verifying
+    several signatures over the same object (e.g., ssl_crypto.sig) can encode
+    it once and avoid re-serializing it for every signature.
+
+    >>> ed25519_key = generate_ed25519_key()
+    >>> data = 'The quick brown fox jumps over the lazy dog'
+    >>> signature = create_signature(ed25519_key, data)
+    >>> encoded = ssl_crypto.formats.encode_canonical(data).encode('utf-8')
+    >>> verify_signature_bytes(ed25519_key, signature, encoded)
+    True
+    >>> verify_signature_bytes(ed25519_key, signature, b'"bad_data"')
+    False
+
+  <Arguments>
+    key_dict:
+      A dictionary containing the TUF keys and other identifying information.
+      Conformant to 'ssl_crypto.formats.ANYKEY_SCHEMA'.
+
+    signature:
+      The signature dictionary produced by one of the key generation functions.
+      Conformant to 'ssl_crypto.formats.SIGNATURE_SCHEMA'.
+
+    data:
+      The canonical JSON encoding, in UTF-8 bytes, of the object that was
+      signed.  Conformant to 'ssl_crypto.formats.DATA_SCHEMA'.
+
+    public_key_object:
+      The object returned by load_public_key() for 'key_dict' (e.g., the one
+      kept by 'ssl_crypto.keydb'), so that the public key is not parsed again.
+      If None, the public key is parsed as needed.
+
+  <Exceptions>
+    ssl_crypto.FormatError, raised if 'key_dict', 'signature', or 'data' are
+    improperly formatted.
+
+    ssl_crypto.UnsupportedLibraryError, if an unsupported or unavailable library is
+    detected.
+
+    ssl_crypto.UnknownMethodError.  Raised if the signing method used by
+    'signature' is not one supported.
+
+  <Side Effects>
+    The cryptography library specified in 'ssl_crypto.conf' called to do the actual
+    verification.
+
+  <Returns>
+    Boolean.  True if the signature is valid, False otherwise.
+  """
+
+  # Do the arguments have the correct format?
+  # Raise 'ssl_crypto.FormatError' if any of the checks fail.
+  ssl_crypto.formats.ANYKEY_SCHEMA.check_match(key_dict)
+  ssl_crypto.formats.SIGNATURE_SCHEMA.check_match(signature)
+  ssl_crypto.formats.DATA_SCHEMA.check_match(data)
+
   # Using the public key belonging to 'key_dict'
   # (i.e., rsakey_dict['keyval']['public']), verify whether 'signature'
   # was produced by key_dict's corresponding private key
@@ -852,12 +924,6 @@ def verify_signature(key_dict, signature, data):
   keytype = key_dict['keytype']
   valid_signature = False
   
-  # Convert 'data' to canonical JSON format so that repeatable signatures are
-  # generated across different platforms and Python key dictionaries.  The
-  # resulting 'data' is a string encoded in UTF-8 and compatible with the input
-  # expected by the cryptography functions called below.
-  data = ssl_crypto.formats.encode_canonical(data).encode('utf-8')
-  
   # Call the appropriate cryptography libraries for the supported key types,
   # otherwise raise an exception.
   if keytype == 'rsa':
@@ -872,7 +938,8 @@ def verify_signature(key_dict, signature, data):
       
       else:
         valid_signature = ssl_crypto.pycrypto_keys.verify_rsa_signature(sig, method,
-                                                                 public, data) 
+                                                                 public, data,
+                                                                 public_key_object) 
     elif _RSA_CRYPTO_LIBRARY == 'pyca-cryptography': 
       if 'pyca-cryptography' not in _available_crypto_libraries: # pragma: no cover
         raise ssl_crypto.UnsupportedLibraryError('Metadata downloaded from the remote'
@@ -884,7 +951,8 @@ def verify_signature(key_dict, signature, data):
 
       else:
         valid_signature = ssl_crypto.pyca_crypto_keys.verify_rsa_signature(sig, method,
-                                                                 public, data) 
+                                                                 public, data,
+                                                                 public_key_object) 
     
     else: # pragma: no cover
       raise ssl_crypto.UnsupportedLibraryError('Unsupported'
@@ -914,6 +982,63 @@ def verify_signature(key_dict, signature, data):
 
 
 
+def load_public_key(key_dict):
+  """
+  <Purpose>
+    Parse the public key of 'key_dict' into the object that the cryptography
+    library specified in 'ssl_crypto.conf' verifies signatures with.  The
+    object may be passed to verify_signature_bytes() to verify any number of
+    signatures without parsing the public key again.  Only RSA public keys,
+    which are stored in PEM format, are parsed; None is returned for other
+    key types.
+
+  <Arguments>
+    key_dict:
+      A dictionary containing the TUF keys and other identifying information.
+      Conformant to 'ssl_crypto.formats.ANYKEY_SCHEMA'.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if 'key_dict' is improperly formatted.
+
+    ssl_crypto.UnsupportedLibraryError, if the cryptography library specified
+    for RSA keys is unsupported or unavailable.
+
+    ssl_crypto.CryptoError, if the public key cannot be decoded.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    The public key object, or None.
+  """
+
+  # Does 'key_dict' have the correct format?
+  # Raise 'ssl_crypto.FormatError' if the check fails.
+  ssl_crypto.formats.ANYKEY_SCHEMA.check_match(key_dict)
+
+  if key_dict['keytype'] != 'rsa':
+    return None
+
+  public = key_dict['keyval']['public']
+
+  if _RSA_CRYPTO_LIBRARY not in _available_crypto_libraries:
+    raise ssl_crypto.UnsupportedLibraryError(repr(_RSA_CRYPTO_LIBRARY) + ' was'
+      ' set (in conf.py) to verify RSA signatures, but is not available.')
+
+  if _RSA_CRYPTO_LIBRARY == 'pycrypto':
+    return ssl_crypto.pycrypto_keys.load_rsa_public_key(public)
+
+  elif _RSA_CRYPTO_LIBRARY == 'pyca-cryptography':
+    return ssl_crypto.pyca_crypto_keys.load_rsa_public_key(public)
+
+  else: # pragma: no cover
+    raise ssl_crypto.UnsupportedLibraryError('Unsupported'
+      ' "ssl_crypto.conf.RSA_CRYPTO_LIBRARY": ' + repr(_RSA_CRYPTO_LIBRARY) + '.')
+
+
+
+
+
 def import_rsakey_from_encrypted_pem(encrypted_pem, password):
   """
   <Purpose> 
@@ -14,7 +14,9 @@
 
 <Purpose>
   Extract a list of mirror urls corresponding to the file type and the location
-  of the file with respect to the base url.
+  of the file with respect to the base url.  The list may be ordered best-first
+  by a 'MirrorScoreboard', which keeps the performance observed from each
+  mirror host.
 """
 
 # Help with Python 3 compatibility, where the print statement is a function, an
@@ -26,19 +28,43 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import os
+import time
+import logging
+import threading
 
 import ssl_crypto
+import ssl_crypto.conf
 import ssl_crypto.util
 import ssl_crypto.formats
 
 import six
 
+# See 'log.py' to learn how logging is handled in TUF.
+logger = logging.getLogger('ssl_crypto.mirrors')
+
 # The type of file to be downloaded from a repository.  The
 # 'get_list_of_mirrors' function supports these file types.
 _SUPPORTED_FILE_TYPES = ['meta', 'target']
 
+# The weight of the latest observation in the moving averages of latency and
+# throughput kept by 'MirrorScoreboard'.
+_SMOOTHING_FACTOR = 0.3
+
+# Downloads smaller than this are dominated by latency, and do not update the
+# throughput of a mirror host.
+_MIN_THROUGHPUT_SAMPLE_LENGTH = 65536 #bytes
+
+# Mirror hosts are compared by their estimated time to download this many
+# bytes, plus their failure penalty.
+_REFERENCE_LENGTH = 262144 #bytes
+
+# The number of recent failures remembered per mirror host.  Older failures
+# have decayed the most, and are forgotten first.
+_MAX_RECORDED_FAILURES = 16
 
-def get_list_of_mirrors(file_type, file_path, mirrors_dict):
+
+def get_list_of_mirrors(file_type, file_path, mirrors_dict,
+                        mirror_scoreboard=None):
   """
   <Purpose>
     Get a list of mirror urls from a mirrors dictionary, provided the type
@@ -68,6 +94,11 @@ def get_list_of_mirrors(file_type, file_path, mirrors_dict):
 
       The 'custom' field is optional.
 
+    mirror_scoreboard:
+      An optional 'MirrorScoreboard' object.  If given, the mirror urls are
+      ordered best-first according to it.  Otherwise, they are listed in the
+      order of 'mirrors_dict'.
+
   <Exceptions>
     ssl_crypto.Error, on unsupported 'file_type'.
     
@@ -120,4 +151,325 @@ def get_list_of_mirrors(file_type, file_path, mirrors_dict):
     url = base + '/' + file_path.lstrip(os.sep) 
     list_of_mirrors.append(url)
 
+  if mirror_scoreboard is not None:
+    list_of_mirrors = mirror_scoreboard.order_mirrors(list_of_mirrors)
+
   return list_of_mirrors
+
+
+
+
+
+def _get_mirror_host(url):
+  """Return the 'scheme://netloc' of 'url', by which mirrors are scored."""
+
+  parsed_url = six.moves.urllib.parse.urlparse(url)
+
+  return parsed_url.scheme + '://' + parsed_url.netloc
+
+
+
+
+
+class MirrorScoreboard(object):
+  """
+  <Purpose>
+    Keep the latency, throughput and recent failures observed from each mirror
+    host, and order mirror urls best-first accordingly.  Mirror hosts are
+    identified by the scheme and network location of their urls.
+
+    A host is ranked by its estimated time to download a reference amount of
+    data, from the moving averages of its latency and throughput.  Every
+    failure adds 'ssl_crypto.conf.MIRROR_FAILURE_PENALTY' seconds to the
+    estimate, a penalty halved every 'ssl_crypto.conf.MIRROR_FAILURE_HALF_LIFE'
+    seconds.  Hosts not yet observed are tried first, so that every mirror is
+    eventually scored.  Hosts with equal estimates keep the order given.
+
+    A 'MirrorScoreboard' may be shared by threads downloading at the same
+    time.
+
+  <Example>
+    mirror_scoreboard = MirrorScoreboard()
+    mirror_scoreboard.record_download(url, latency, length, seconds)
+    mirror_scoreboard.record_failure(url)
+    mirror_urls = mirror_scoreboard.order_mirrors(mirror_urls)
+    mirror_scoreboard.save(filepath)
+  """
+
+  def __init__(self):
+    """
+    <Purpose>
+      Create an empty scoreboard.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Returns>
+      None.
+    """
+
+    # Mirror host ('scheme://netloc'): {'latency': seconds (float or None),
+    # 'throughput': bytes/second (float or None), 'failures': [Unix times]}
+    self._scores = {}
+    self._lock = threading.Lock()
+
+
+
+
+
+  def _get_score(self, url):
+    """Return the score of the host of 'url', created if needed.  The
+    caller must hold 'self._lock'."""
+
+    mirror_host = _get_mirror_host(url)
+
+    if mirror_host not in self._scores:
+      self._scores[mirror_host] = \
+        {'latency': None, 'throughput': None, 'failures': []}
+
+    return self._scores[mirror_host]
+
+
+
+
+
+  def record_download(self, url, latency, length, seconds):
+    """
+    <Purpose>
+      Record a successful download from 'url'.
+
+    <Arguments>
+      url:
+        The URL of the downloaded file.
+
+      latency:
+        The seconds elapsed until the server responded.
+
+      length:
+        The number of bytes received.
+
+      seconds:
+        The seconds spent receiving 'length' bytes.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      Updates the moving averages of latency and throughput of the host of
+      'url'.  Throughput is only updated for downloads large enough to measure
+      it.
+
+    <Returns>
+      None.
+    """
+
+    with self._lock:
+      score = self._get_score(url)
+      score['latency'] = _moving_average(score['latency'], latency)
+
+      if length >= _MIN_THROUGHPUT_SAMPLE_LENGTH and seconds > 0:
+        score['throughput'] = \
+          _moving_average(score['throughput'], length / seconds)
+
+
+
+
+
+  def record_failure(self, url):
+    """
+    <Purpose>
+      Record a failed download from 'url' (e.g., a network error, a timeout, or
+      a file that failed verification).
+
+    <Arguments>
+      url:
+        The URL of the file that could not be downloaded.
+
+    <Exceptions>
+      None.
+
+    <Side Effects>
+      Penalizes the host of 'url' until the failure has decayed.
+
+    <Returns>
+      None.
+    """
+
+    with self._lock:
+      failures = self._get_score(url)['failures']
+      failures.append(int(time.time()))
+      del failures[:-_MAX_RECORDED_FAILURES]
+
+
+
+
+
+  def order_mirrors(self, urls):
+    """
+    <Purpose>
+      Order 'urls' best-first, by the estimated download time of their hosts.
+
+    <Arguments>
+      urls:
+        A list of mirror urls (e.g., as returned by get_list_of_mirrors()).
+
+    <Exceptions>
+      None.
+
+    <Returns>
+      A new list containing 'urls', the most promising mirror first.
+    """
+
+    now = time.time()
+
+    with self._lock:
+      estimates = dict((url, self._estimate_download_time(url, now)) \
+                       for url in urls)
+
+    # sorted() is stable, so mirrors with equal estimates keep their order.
+    return sorted(urls, key=lambda url: estimates[url])
+
+
+
+
+
+  def _estimate_download_time(self, url, now):
+    """Return the estimated seconds to download '_REFERENCE_LENGTH' bytes
+    from the host of 'url', plus its failure penalty.  The caller must hold
+    'self._lock'."""
+
+    score = self._scores.get(_get_mirror_host(url))
+
+    # Hosts not yet observed are tried first.
+    if score is None:
+      return 0.0
+
+    estimate = score['latency'] or 0.0
+
+    if score['throughput']:
+      estimate = estimate + _REFERENCE_LENGTH / score['throughput']
+
+    for failure_time in score['failures']:
+      age = max(0, now - failure_time)
+      estimate = estimate + ssl_crypto.conf.MIRROR_FAILURE_PENALTY * \
+        0.5 ** (age / ssl_crypto.conf.MIRROR_FAILURE_HALF_LIFE)
+
+    return estimate
+
+
+
+
+
+  def save(self, filepath):
+    """
+    <Purpose>
+      Save the scoreboard to 'filepath', in 'MIRRORSCOREBOARD_SCHEMA' format.
+
+    <Arguments>
+      filepath:
+        The path of the file to write (e.g., in the client's metadata
+        directory).
+
+    <Exceptions>
+      ssl_crypto.FormatError, if 'filepath' is improperly formatted.
+
+      IOError or OSError, if the file cannot be written.
+
+    <Side Effects>
+      Writes 'filepath'.
+
+    <Returns>
+      None.
+    """
+
+    ssl_crypto.formats.PATH_SCHEMA.check_match(filepath)
+
+    # Latency is saved in milliseconds, and throughput in bytes/second, so that
+    # both are integers.
+    saved_scores = {}
+    
+    with self._lock:
+      for mirror_host, score in six.iteritems(self._scores):
+        saved_score = {'failures': list(score['failures'])}
+        
+        if score['latency'] is not None:
+          saved_score['latency'] = int(score['latency'] * 1000)
+        
+        if score['throughput'] is not None:
+          saved_score['throughput'] = int(score['throughput'])
+        
+        saved_scores[mirror_host] = saved_score
+
+    file_object = ssl_crypto.util.TempFile()
+    file_object.write(ssl_crypto.util.json.dumps(saved_scores,
+                                                 sort_keys=True).encode('utf-8'))
+    file_object.move(filepath)
+
+
+
+
+
+  def load(self, filepath):
+    """
+    <Purpose>
+      Replace the scores with those saved in 'filepath' by save().  A missing
+      or invalid file is logged and ignored, as the scores only affect the
+      order in which mirrors are tried.
+
+    <Arguments>
+      filepath:
+        The path of a file written by save().
+
+    <Exceptions>
+      ssl_crypto.FormatError, if 'filepath' is improperly formatted.
+
+    <Side Effects>
+      Reads 'filepath'.
+
+    <Returns>
+      None.
+    """
+
+    ssl_crypto.formats.PATH_SCHEMA.check_match(filepath)
+
+    if not os.path.exists(filepath):
+      logger.debug('No mirror scoreboard saved in ' + repr(filepath) + '.')
+      return
+
+    try:
+      saved_scores = ssl_crypto.util.load_json_file(filepath)
+      ssl_crypto.formats.MIRRORSCOREBOARD_SCHEMA.check_match(saved_scores)
+    
+    except ssl_crypto.Error as exception:
+      logger.warning('Ignoring the mirror scoreboard in ' + repr(filepath) + \
+                     ': ' + str(exception))
+      return
+
+    scores = {}
+    for mirror_host, saved_score in six.iteritems(saved_scores):
+      latency = saved_score.get('latency')
+      if latency is not None:
+        latency = latency / 1000
+      
+      scores[mirror_host] = {'latency': latency,
+                             'throughput': saved_score.get('throughput'),
+                             'failures': list(saved_score['failures'])}
+
+    with self._lock:
+      self._scores = scores
+
+
+
+
+
+def _moving_average(average, observation):
+  """Return the exponentially weighted moving 'average' updated with
+  'observation'.  The first observation becomes the average."""
+
+  if average is None:
+    return float(observation)
+
+  return average + _SMOOTHING_FACTOR * (observation - average)
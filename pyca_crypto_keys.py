@@ -21,6 +21,7 @@
   The RSA-related functions provided include:
   generate_rsa_public_and_private()
   create_rsa_signature()
+  load_rsa_public_key()
   verify_rsa_signature()
   create_rsa_encrypted_pem()
   create_rsa_public_and_private_from_encrypted_pem()
@@ -358,7 +359,56 @@ def create_rsa_signature(private_key, data):
 
 
 
-def verify_rsa_signature(signature, signature_method, public_key, data):
+def load_rsa_public_key(public_key):
+  """
+  <Purpose>
+    Parse 'public_key', an RSA public key in PEM format, into the public key
+    object that verify_rsa_signature() verifies signatures with.  Callers
+    verifying many signatures with the same key can load it once and pass the
+    object to verify_rsa_signature().
+
+    >>> public, private = generate_rsa_public_and_private(2048)
+    >>> public_key_object = load_rsa_public_key(public)
+    >>> public_key_object.key_size
+    2048
+
+  <Arguments>
+    public_key:
+      The RSA public key, a string in PEM format.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if 'public_key' is improperly formatted.
+
+    ssl_crypto.CryptoError, if 'public_key' cannot be decoded or its key type
+    is unsupported.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    A pyca/cryptography 'RSAPublicKey' object.
+  """
+
+  # Does 'public_key' have the correct format?
+  # Raise 'ssl_crypto.FormatError' if the check fails.
+  ssl_crypto.formats.PEMRSA_SCHEMA.check_match(public_key)
+
+  try:
+    return serialization.load_pem_public_key(public_key.encode('utf-8'),
+                                             backend=default_backend())
+
+  except ValueError:
+    raise ssl_crypto.CryptoError('The PEM could not be decoded successfully.')
+
+  except cryptography.exceptions.UnsupportedAlgorithm:
+    raise ssl_crypto.CryptoError('The private key type is not supported.')
+
+
+
+
+
+def verify_rsa_signature(signature, signature_method, public_key, data,
+                         public_key_object=None):
   """
   <Purpose>
     Determine whether the corresponding private key of 'public_key' produced
@@ -389,6 +439,10 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
       Data used by ssl_crypto.keys.create_signature() to generate
       'signature'.  'data' (a string) is needed here to verify 'signature'.
 
+    public_key_object:
+      The object returned by load_rsa_public_key() for 'public_key'.  If
+      None, 'public_key' is parsed here.
+
   <Exceptions>
     ssl_crypto.FormatError, if 'signature', 'signature_method', 'public_key', or
     'data' are improperly formatted.
@@ -430,11 +484,13 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
   if signature_method != 'RSASSA-PSS':
     raise ssl_crypto.UnknownMethodError(signature_method)
   
+  # Parse 'public_key', unless the caller has already loaded it.  Raise
+  # 'ssl_crypto.CryptoError' if it cannot be decoded.
+  if public_key_object is None:
+    public_key_object = load_rsa_public_key(public_key)
+
   # Verify the RSASSA-PSS signature with pyca/cryptography.
   try:
-    public_key_object = serialization.load_pem_public_key(public_key.encode('utf-8'),
-                                                   backend=default_backend())
-    
     # 'salt_length' is set to the digest size of the hashing algorithm (to
     # match the default size used by 'ssl_crypto.pycrypto_keys.py').
     verifier = public_key_object.verifier(signature,
@@ -453,13 +509,8 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
     except cryptography.exceptions.InvalidSignature:
       return False
 
-  # Raised by load_pem_public_key(). 
   except ValueError:
-    raise ssl_crypto.CryptoError('The PEM could not be decoded successfully.')
-
-  # Raised by load_pem_public_key().
-  except cryptography.exceptions.UnsupportedAlgorithm:
-    raise ssl_crypto.CryptoError('The private key type is not supported.')
+    raise ssl_crypto.CryptoError('The RSA signature could not be verified.')
 
 
 
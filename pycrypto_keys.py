@@ -18,6 +18,7 @@
   cryptography through the PyCrypto library.  The RSA-related functions provided:
   generate_rsa_public_and_private()
   create_rsa_signature()
+  load_rsa_public_key()
   verify_rsa_signature()
   create_rsa_encrypted_pem()
   create_rsa_public_and_private_from_encrypted_pem()
@@ -324,7 +325,52 @@ def create_rsa_signature(private_key, data):
 
 
 
-def verify_rsa_signature(signature, signature_method, public_key, data):
+def load_rsa_public_key(public_key):
+  """
+  <Purpose>
+    Parse 'public_key', an RSA public key in PEM format, into the key object
+    that verify_rsa_signature() verifies signatures with.  Callers verifying
+    many signatures with the same key can load it once and pass the object to
+    verify_rsa_signature().
+
+    >>> public, private = generate_rsa_public_and_private(2048)
+    >>> rsa_key_object = load_rsa_public_key(public)
+    >>> rsa_key_object.has_private()
+    False
+
+  <Arguments>
+    public_key:
+      The RSA public key, a string in PEM format.
+
+  <Exceptions>
+    ssl_crypto.FormatError, if 'public_key' is improperly formatted.
+
+    ssl_crypto.CryptoError, if 'public_key' cannot be decoded.
+
+  <Side Effects>
+    None.
+
+  <Returns>
+    A PyCrypto 'Crypto.PublicKey.RSA' key object.
+  """
+
+  # Does 'public_key' have the correct format?
+  # Raise 'ssl_crypto.FormatError' if the check fails.
+  ssl_crypto.formats.PEMRSA_SCHEMA.check_match(public_key)
+
+  try:
+    return Crypto.PublicKey.RSA.importKey(public_key)
+
+  except (ValueError, IndexError, TypeError) as e:
+    raise ssl_crypto.CryptoError('The RSA public key could not be decoded: ' +
+      str(e))
+
+
+
+
+
+def verify_rsa_signature(signature, signature_method, public_key, data,
+                         rsa_key_object=None):
   """
   <Purpose>
     Determine whether the corresponding private key of 'public_key' produced
@@ -355,6 +401,10 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
       Data object used by ssl_crypto.keys.create_signature() to generate
       'signature'.  'data' is needed here to verify the signature.
 
+    rsa_key_object:
+      The object returned by load_rsa_public_key() for 'public_key'.  If
+      None, 'public_key' is parsed here.
+
   <Exceptions>
     ssl_crypto.UnknownMethodError.  Raised if the signing method used by
     'signature' is not one supported by ssl_crypto.keys.create_signature().
@@ -362,6 +412,9 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
     ssl_crypto.FormatError. Raised if 'signature', 'signature_method', or 'public_key'
     is improperly formatted.
 
+    ssl_crypto.CryptoError, if 'public_key' cannot be decoded, or the signature
+    cannot be verified.
+
   <Side Effects>
     Crypto.Signature.PKCS1_PSS.verify() called to do the actual verification.
 
@@ -391,8 +444,11 @@ def verify_rsa_signature(signature, signature_method, public_key, data):
   # Verify the signature with PyCrypto if the signature method is valid,
   # otherwise raise 'ssl_crypto.UnknownMethodError'.
   if signature_method == 'RSASSA-PSS':
+    # Parse 'public_key', unless the caller has already loaded it.
+    if rsa_key_object is None:
+      rsa_key_object = load_rsa_public_key(public_key)
+
     try:
-      rsa_key_object = Crypto.PublicKey.RSA.importKey(public_key)
       pkcs1_pss_verifier = Crypto.Signature.PKCS1_PSS.new(rsa_key_object)
       sha256_object = Crypto.Hash.SHA256.new(data)
       valid_signature = pkcs1_pss_verifier.verify(sha256_object, signature)
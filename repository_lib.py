@@ -380,9 +380,10 @@ def _remove_invalid_and_duplicate_signatures(signable):
   # generate duplicate valid signatures of the same data, yet contain different
   # signatures.
   signature_keyids = []
+  signed_bytes = \
+    ssl_crypto.formats.encode_canonical(signable['signed']).encode('utf-8')
 
   for signature in signable['signatures']:
-    signed = signable['signed']
     keyid = signature['keyid']
     key = None
 
@@ -396,7 +397,10 @@ def _remove_invalid_and_duplicate_signatures(signable):
       continue
     
     # Remove 'signature' from 'signable' if it is an invalid signature.
-    if not ssl_crypto.keys.verify_signature(key, signature, signed):
+    public_key_object = ssl_crypto.keydb.get_public_key_object(keyid)
+    if not ssl_crypto.keys.verify_signature_bytes(key, signature,
+                                                  signed_bytes,
+                                                  public_key_object):
       signable['signatures'].remove(signature)
     
     # Although valid, it may still need removal if it is a duplicate.  Check
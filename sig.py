@@ -30,7 +30,9 @@
   are now available to the Snapshot role?  This question can be answered by
   get_signature_status(), which will return a full 'status report' of these 
   'signable' dicts.  This module also provides a convenient verify() function
-  that will determine if a role still has a sufficient number of valid keys.
+  that will determine if a role still has a sufficient number of valid keys,
+  and verify_signable_bytes() for callers that already hold the canonical
+  encoding of the signed object.
   If a caller needs to update the signatures of a 'signable' object, there
   is also a function for that.
 """
@@ -43,13 +45,28 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
+import threading
+
 import ssl_crypto
+import ssl_crypto.conf
 import ssl_crypto.formats
+import ssl_crypto.hash
+import ssl_crypto.keys
 import ssl_crypto.keydb
 import ssl_crypto.roledb
 
+# The outcomes of signature verifications, least recently used first, keyed by
+# the keyid, method, and sig of the signature and the SHA-256 digest of the
+# canonical signed bytes.  The outcomes hold only for the keys in the key
+# database when they were recorded, so they are discarded as soon as the
+# generation of 'ssl_crypto.keydb' differs from '_signature_cache_generation'.
+_signature_cache = collections.OrderedDict()
+_signature_cache_generation = None
+_signature_cache_lock = threading.Lock()
+
 
-def get_signature_status(signable, role=None):
+def get_signature_status(signable, role=None, signed_bytes=None):
   """
   <Purpose>
     Return a dictionary representing the status of the signatures listed
@@ -72,13 +89,19 @@ def get_signature_status(signable, role=None):
     role:
       TUF role (e.g., 'root', 'targets', 'snapshot').
 
+    signed_bytes:
+      The canonical JSON encoding, in UTF-8 bytes, of signable['signed'].  If
+      None, it is computed here, once for all of the signatures in 'signable'.
+
   <Exceptions>
-    ssl_crypto.FormatError, if 'signable' does not have the correct format.
+    ssl_crypto.FormatError, if 'signable' or 'signed_bytes' does not have the
+    correct format.
 
     ssl_crypto.UnknownRoleError, if 'role' is not recognized.
 
   <Side Effects>
-    None.
+    The outcomes of the signature verifications are cached, and reused while
+    the key database is unchanged.  See 'ssl_crypto.conf.MAX_CACHED_SIGNATURES'.
 
   <Returns>
     A dictionary representing the status of the signatures in 'signable'.
@@ -112,6 +135,19 @@ def get_signature_status(signable, role=None):
   signed = signable['signed']
   signatures = signable['signatures']
 
+  # Every signature covers the same 'signed' object, so serialize it to
+  # canonical JSON once rather than once per signature.
+  if signed_bytes is None:
+    signed_bytes = ssl_crypto.formats.encode_canonical(signed).encode('utf-8')
+
+  else:
+    ssl_crypto.formats.DATA_SCHEMA.check_match(signed_bytes)
+
+  # The generation is read before any key is, so that outcomes verified with
+  # keys that have since changed are not cached.
+  keydb_generation = ssl_crypto.keydb.get_generation()
+  signed_digest = _get_signed_digest(signed_bytes)
+
   # Iterate through the signatures and enumerate the signature_status fields.
   # (i.e., good_sigs, bad_sigs, etc.).
   for signature in signatures:
@@ -129,7 +165,8 @@ def get_signature_status(signable, role=None):
 
     # Identify key using an unknown key signing method.
     try:
-      valid_sig = ssl_crypto.keys.verify_signature(key, signature, signed)
+      valid_sig = _verify_signature(key, signature, signed_bytes,
+                                    signed_digest, keydb_generation)
     
     except ssl_crypto.UnknownMethodError:
       unknown_method_sigs.append(keyid)
@@ -188,6 +225,10 @@ def verify(signable, role):
     associated with 'role'.  'signable' must conform to SIGNABLE_SCHEMA
     and 'role' must not equal 'None' or be less than zero.
 
+    Only the signatures of keys authorized for 'role' are verified, each key
+    at most once, and verification stops as soon as the threshold is met.
+    Call get_signature_status() for a full report of the signatures.
+
   <Arguments>
     signable:
       A dictionary containing a list of signatures and a 'signed' identifier.
@@ -204,29 +245,220 @@ def verify(signable, role):
     ssl_crypto.Error, if an invalid threshold is encountered.
 
   <Side Effects>
-    ssl_crypto.sig.get_signature_status() called.  Any exceptions thrown by
-    get_signature_status() will be caught here and re-raised.
+    ssl_crypto.sig.verify_signable_bytes() called.  Any exceptions thrown by
+    verify_signable_bytes() will be caught here and re-raised.
 
   <Returns>
     Boolean.  True if the number of good signatures >= the role's threshold,
     False otherwise.
   """
 
-  # Retrieve the signature status.  ssl_crypto.sig.get_signature_status() raises
-  # ssl_crypto.UnknownRoleError
-  # ssl_crypto.FormatError
-  status = get_signature_status(signable, role)
-  
-  # Retrieve the role's threshold and the authorized keys of 'status'
-  threshold = status['threshold']
-  good_sigs = status['good_sigs']
+  # Does 'signable' have the correct format?
+  # Raise 'ssl_crypto.FormatError' if the check fails.
+  ssl_crypto.formats.SIGNABLE_SCHEMA.check_match(signable)
+
+  signed_bytes = \
+    ssl_crypto.formats.encode_canonical(signable['signed']).encode('utf-8')
+
+  return verify_signable_bytes(signable, role, signed_bytes)
+
+
+
+
+
+def verify_signable_bytes(signable, role, signed_bytes):
+  """
+  <Purpose> 
+    Like verify(), but for callers that already hold 'signed_bytes', the
+    canonical JSON encoding of signable['signed'].  The signatures of
+    'signable' are checked against 'signed_bytes' directly, without
+    re-encoding the signed object.
+
+  <Arguments>
+    signable:
+      A dictionary containing a list of signatures and a 'signed' identifier.
+      signable = {'signed':, 'signatures': [{'keyid':, 'method':, 'sig':}]}
+
+    role:
+      TUF role (e.g., 'root', 'targets', 'snapshot').
 
-  # Does 'status' have the required threshold of signatures?
-  # First check for invalid threshold values before returning result.
+    signed_bytes:
+      The canonical JSON encoding, in UTF-8 bytes, of signable['signed'].
+      Conformant to 'ssl_crypto.formats.DATA_SCHEMA'.
+
+  <Exceptions>
+    ssl_crypto.UnknownRoleError, if 'role' is not recognized.
+
+    ssl_crypto.FormatError, if 'signable' or 'signed_bytes' is not formatted
+    correctly.
+
+    ssl_crypto.Error, if an invalid threshold is encountered.
+
+  <Side Effects>
+    The outcomes of the signature verifications are cached, as by
+    get_signature_status().
+
+  <Returns>
+    Boolean.  True if the number of good signatures >= the role's threshold,
+    False otherwise.
+  """
+
+  # Do the arguments have the correct format?
+  # Raise 'ssl_crypto.FormatError' if any of the checks fail.
+  ssl_crypto.formats.SIGNABLE_SCHEMA.check_match(signable)
+  ssl_crypto.formats.DATA_SCHEMA.check_match(signed_bytes)
+
+  # Retrieve the role's threshold and authorized keyids before verifying any
+  # signature.  Raise 'ssl_crypto.UnknownRoleError' if 'role' is not
+  # recognized.
+  threshold = ssl_crypto.roledb.get_role_threshold(role)
+  authorized_keyids = set(ssl_crypto.roledb.get_role_keyids(role))
+
+  # First check for invalid threshold values before verifying signatures.
   if threshold is None or threshold <= 0:
       raise ssl_crypto.Error("Invalid threshold: " + str(threshold))
 
-  return len(good_sigs) >= threshold
+  keydb_generation = ssl_crypto.keydb.get_generation()
+  signed_digest = _get_signed_digest(signed_bytes)
+  good_keyids = set()
+
+  for signature in signable['signatures']:
+    keyid = signature['keyid']
+
+    # Unauthorized keys, and keys already counted, cannot add to the number
+    # of good signatures, so their signatures are not verified.
+    if keyid not in authorized_keyids or keyid in good_keyids:
+      continue
+
+    try:
+      key = ssl_crypto.keydb.get_key(keyid)
+      valid_sig = _verify_signature(key, signature, signed_bytes,
+                                    signed_digest, keydb_generation)
+
+    except (ssl_crypto.UnknownKeyError, ssl_crypto.UnknownMethodError):
+      continue
+
+    if valid_sig:
+      good_keyids.add(keyid)
+
+      if len(good_keyids) >= threshold:
+        return True
+
+  return False
+
+
+
+
+
+def clear_signature_cache():
+  """
+  <Purpose>
+    Discard the signature verification outcomes cached by this module.  They
+    are also discarded whenever the key database changes.
+
+  <Arguments>
+    None.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    The signature cache is emptied.
+
+  <Returns>
+    None.
+  """
+
+  with _signature_cache_lock:
+    _signature_cache.clear()
+
+
+
+
+
+def _get_signed_digest(signed_bytes):
+  """
+    Non-public function that returns the hex SHA-256 digest of 'signed_bytes'
+    that identifies them in the signature cache, or None if the cache is
+    disabled.
+  """
+
+  if ssl_crypto.conf.MAX_CACHED_SIGNATURES < 1:
+    return None
+
+  digest_object = ssl_crypto.hash.digest('sha256')
+  digest_object.update(signed_bytes)
+
+  return digest_object.hexdigest()
+
+
+
+
+
+def _verify_signature(key, signature, signed_bytes, signed_digest,
+                      keydb_generation):
+  """
+    Non-public function that verifies 'signature' over 'signed_bytes' with
+    'key', or returns the outcome cached when it was last verified.
+    'signed_digest' is the digest returned by _get_signed_digest() (None
+    bypasses the cache), and 'keydb_generation' the generation of the key
+    database when 'key' was retrieved from it.  Exceptions raised by
+    ssl_crypto.keys.verify_signature_bytes() are not cached.
+  """
+
+  global _signature_cache_generation
+
+  if signed_digest is None:
+    return _verify_signature_bytes(key, signature, signed_bytes)
+
+  cache_key = (signature['keyid'], signature['method'], signature['sig'],
+               signed_digest)
+
+  with _signature_cache_lock:
+    # Discard the outcomes verified with an earlier key database.  An
+    # outdated 'keydb_generation' neither reads nor replaces them.
+    if _signature_cache_generation != keydb_generation and \
+       ssl_crypto.keydb.get_generation() == keydb_generation:
+      _signature_cache.clear()
+      _signature_cache_generation = keydb_generation
+
+    valid_sig = None
+
+    if _signature_cache_generation == keydb_generation:
+      valid_sig = _signature_cache.pop(cache_key, None)
+
+    if valid_sig is not None:
+      # Re-insert 'cache_key' as the most recently used entry.
+      _signature_cache[cache_key] = valid_sig
+      return valid_sig
+
+  valid_sig = _verify_signature_bytes(key, signature, signed_bytes)
+
+  with _signature_cache_lock:
+    # The key database may have changed while verifying.
+    if _signature_cache_generation == keydb_generation and \
+       ssl_crypto.keydb.get_generation() == keydb_generation:
+      _signature_cache[cache_key] = valid_sig
+
+      while len(_signature_cache) > ssl_crypto.conf.MAX_CACHED_SIGNATURES:
+        _signature_cache.popitem(last=False)
+
+  return valid_sig
+
+
+
+
+
+def _verify_signature_bytes(key, signature, signed_bytes):
+  """
+    Non-public function that verifies 'signature' over 'signed_bytes' with
+    'key', using the public key object that 'ssl_crypto.keydb' parsed for it.
+  """
+
+  public_key_object = ssl_crypto.keydb.get_public_key_object(key['keyid'])
+
+  return ssl_crypto.keys.verify_signature_bytes(key, signature, signed_bytes,
+                                                public_key_object)
 
 
 
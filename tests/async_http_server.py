@@ -0,0 +1,218 @@
+"""
+<Program Name>
+  async_http_server.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  A stand-in HTTP/1.1 server, built on 'asyncio.start_server()', for the unit
+  tests of 'async_download.py' and 'client/async_updater.py'.  It runs in the
+  event loop of the test, so that no thread or subprocess is needed.
+
+  Requested paths are answered by the coroutine registered for them in
+  'AsyncHTTPServer.responders', if any, and otherwise with the file of the
+  same relative path in 'files_directory'.  Every request is recorded, so
+  that tests may inspect the headers the client sent.
+
+  This module requires Python 3.7, or later.
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import asyncio
+import os
+
+import six
+
+
+class AsyncHTTPServer(object):
+  """
+  <Purpose>
+    A stand-in HTTP/1.1 server listening on a free port of 127.0.0.1.  Each
+    response is followed by the end of the connection.
+
+  <Attributes>
+    files_directory:
+      The directory whose files are served, or None.
+
+    responders:
+      A dict of request paths to coroutine functions called with the
+      (path, request headers, stream writer) of the request.  The coroutine
+      writes the whole response.
+
+    requests:
+      A list of the (path, request headers) of every request received.  The
+      header names are lowercase.
+  """
+
+  def __init__(self, files_directory=None):
+    self.files_directory = files_directory
+    self.responders = {}
+    self.requests = []
+    self.port = None
+    self._server = None
+
+    # The tasks of the connections being handled.
+    self._connection_tasks = set()
+
+
+  async def start(self):
+    self._server = await asyncio.start_server(self._handle_connection,
+                                              '127.0.0.1', 0)
+    self.port = self._server.sockets[0].getsockname()[1]
+
+
+  async def stop(self):
+    self._server.close()
+
+    # Responses that are still being written (e.g., to a client that gave up
+    # on a slow retrieval) are abandoned.
+    for connection_task in self._connection_tasks:
+      connection_task.cancel()
+
+    await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+    await self._server.wait_closed()
+
+
+  def url(self, path):
+    return 'http://127.0.0.1:' + str(self.port) + path
+
+
+  async def _handle_connection(self, reader, writer):
+    connection_task = asyncio.current_task()
+    self._connection_tasks.add(connection_task)
+
+    try:
+      request_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+      method, path, version = request_line.split(' ', 2)
+
+      headers = {}
+      while True:
+        header_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+        if not header_line:
+          break
+
+        name, separator, value = header_line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+      self.requests.append((path, headers))
+
+      responder = self.responders.get(path, self._serve_file)
+      await responder(path, headers, writer)
+      await writer.drain()
+
+    # The client may close the connection before the response is complete
+    # (e.g., after a slow retrieval was detected).
+    except (ConnectionError, ValueError):
+      pass
+
+    # The response was abandoned by stop().  The task ends normally, since
+    # 'asyncio.start_server()' otherwise logs the cancellation as an error.
+    except asyncio.CancelledError:
+      pass
+
+    finally:
+      writer.close()
+      self._connection_tasks.discard(connection_task)
+
+
+  async def _serve_file(self, path, headers, writer):
+    relative_path = six.moves.urllib.parse.unquote(path.lstrip('/'))
+    filepath = None
+
+    if self.files_directory is not None:
+      filepath = os.path.join(self.files_directory, *relative_path.split('/'))
+
+    if filepath is None or not os.path.isfile(filepath):
+      write_response(writer, 404, body=b'Not Found')
+      return
+
+    with open(filepath, 'rb') as file_object:
+      write_response(writer, 200, body=file_object.read())
+
+
+
+
+
+def write_response(writer, status, headers=None, body=b''):
+  """
+  <Purpose>
+    Write a complete response, whose body is delimited by its
+    'Content-Length', to 'writer'.
+
+  <Arguments>
+    writer:
+      The 'asyncio.StreamWriter' of the connection.
+
+    status:
+      The HTTP status code of the response.
+
+    headers:
+      An optional dict of additional header names to values.
+
+    body:
+      The bytes of the body.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    Writes to 'writer'.
+
+  <Returns>
+    None.
+  """
+
+  response_headers = {'Content-Length': str(len(body))}
+  response_headers.update(headers or {})
+
+  write_response_head(writer, status, response_headers)
+  writer.write(body)
+
+
+
+
+
+def write_response_head(writer, status, headers):
+  """
+  <Purpose>
+    Write the status line and 'headers' of a response to 'writer'.  The body,
+    if any, is written by the caller.
+
+  <Arguments>
+    writer:
+      The 'asyncio.StreamWriter' of the connection.
+
+    status:
+      The HTTP status code of the response.
+
+    headers:
+      A dict of header names to values.
+
+  <Exceptions>
+    None.
+
+  <Side Effects>
+    Writes to 'writer'.
+
+  <Returns>
+    None.
+  """
+
+  response_head = 'HTTP/1.1 ' + str(status) + ' Stand-in\r\n'
+
+  for name, value in six.iteritems(headers):
+    response_head = response_head + name + ': ' + value + '\r\n'
+
+  response_head = response_head + 'Connection: close\r\n\r\n'
+  writer.write(response_head.encode('latin-1'))
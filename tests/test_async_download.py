@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+"""
+<Program Name>
+  test_async_download.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  Unit test for 'async_download.py'.  Files are downloaded from the stand-in
+  server of 'async_http_server.py', which runs in the event loop of each test.
+
+  This module requires Python 3.7, or later.
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import asyncio
+import hashlib
+import logging
+import unittest
+
+import ssl_crypto
+import ssl_crypto.async_download as async_download
+import ssl_crypto.conf
+import ssl_crypto.log
+import ssl_crypto.unittest_toolbox as unittest_toolbox
+
+import six
+
+import async_http_server
+
+logger = logging.getLogger('ssl_crypto.test_async_download')
+
+# The settings of 'ssl_crypto.conf' modified by the tests.
+_CONF_SETTINGS = ['SOCKET_TIMEOUT', 'SLOW_START_GRACE_PERIOD',
+                  'MIN_AVERAGE_DOWNLOAD_SPEED']
+
+
+class TestAsyncDownload(unittest_toolbox.Modified_TestCase):
+  def setUp(self):
+    unittest_toolbox.Modified_TestCase.setUp(self)
+
+    self.saved_conf_settings = dict((name, getattr(ssl_crypto.conf, name))
+                                    for name in _CONF_SETTINGS)
+
+    self.loop = asyncio.new_event_loop()
+    self.server = async_http_server.AsyncHTTPServer()
+    self.loop.run_until_complete(self.server.start())
+
+    self.file_data = b'The quick brown fox jumps over the lazy dog.\n' * 100
+    self.file_length = len(self.file_data)
+
+
+  def tearDown(self):
+    unittest_toolbox.Modified_TestCase.tearDown(self)
+
+    for name, value in self.saved_conf_settings.items():
+      setattr(ssl_crypto.conf, name, value)
+
+    self.loop.run_until_complete(self.server.stop())
+    self.loop.close()
+
+
+  def _download(self, download_coroutine):
+    return self.loop.run_until_complete(download_coroutine)
+
+
+  def _respond(self, path, responder):
+    self.server.responders[path] = responder
+    return self.server.url(path)
+
+
+  def _serve_data(self, path, data, headers=None):
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response(writer, 200, headers, data)
+
+    return self._respond(path, responder)
+
+
+  def test_content_length_response(self):
+    url = self._serve_data('/file', self.file_data)
+
+    temp_file = self._download(async_download.safe_download(url,
+      self.file_length, hash_algorithms=['sha256']))
+
+    self.assertEqual(self.file_data, temp_file.read())
+    self.assertEqual(hashlib.sha256(self.file_data).hexdigest(),
+                     temp_file.get_digest('sha256').hexdigest())
+    temp_file.close_temp_file()
+
+    # The request asks for the identity encoding.
+    path, request_headers = self.server.requests[-1]
+    self.assertEqual('/file', path)
+    self.assertEqual('identity', request_headers['accept-encoding'])
+
+
+  def test_chunked_response(self):
+    # Chunks of various sizes, one with a chunk extension, and a trailer.
+    chunk_sizes = [1, 1000, 7, 2000, self.file_length - 3008]
+    chunks = []
+    for chunk_size in chunk_sizes:
+      offset = sum([len(chunk) for chunk in chunks])
+      chunks.append(self.file_data[offset:offset + chunk_size])
+
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response_head(writer, 200,
+        {'Transfer-Encoding': 'chunked'})
+
+      for chunk in chunks:
+        chunk_size_line = '%x' % len(chunk)
+        if len(chunk) == 7:
+          chunk_size_line = chunk_size_line + ';name=value'
+
+        writer.write(chunk_size_line.encode('ascii') + b'\r\n' + chunk +
+                     b'\r\n')
+
+      writer.write(b'0\r\nTrailer: value\r\n\r\n')
+
+    url = self._respond('/chunked', responder)
+
+    temp_file = self._download(async_download.safe_download(url,
+                                                            self.file_length))
+    self.assertEqual(self.file_data, temp_file.read())
+    temp_file.close_temp_file()
+
+
+  def test_chunked_response_survives_read_timeouts(self):
+    # A read that times out, during the slow start grace period, after the
+    # data of a chunk was received but before the CRLF that follows it, must
+    # not lose the data nor corrupt the chunk framing.
+    ssl_crypto.conf.SOCKET_TIMEOUT = 0.1
+    ssl_crypto.conf.SLOW_START_GRACE_PERIOD = 30
+
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response_head(writer, 200,
+        {'Transfer-Encoding': 'chunked'})
+      writer.write(b'5\r\nhello')
+      await writer.drain()
+      await asyncio.sleep(0.3)
+      writer.write(b'\r\n6\r\n world\r\n0\r\n\r\n')
+
+    url = self._respond('/chunked', responder)
+
+    temp_file = self._download(async_download.safe_download(url, 11))
+    self.assertEqual(b'hello world', temp_file.read())
+    temp_file.close_temp_file()
+
+
+  def test_eof_delimited_response(self):
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response_head(writer, 200, {})
+      writer.write(self.file_data)
+
+    url = self._respond('/eof', responder)
+
+    # The length of the file is only known once the connection is closed.
+    temp_file = self._download(async_download.unsafe_download(url,
+      self.file_length * 2))
+    self.assertEqual(self.file_data, temp_file.read())
+    temp_file.close_temp_file()
+
+
+  def test_redirect_response(self):
+    self._serve_data('/file', self.file_data)
+
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response(writer, 302, {'Location': '/file'})
+
+    redirecting_url = self._respond('/redirect', responder)
+
+    temp_file = self._download(async_download.safe_download(redirecting_url,
+                                                            self.file_length))
+    self.assertEqual(self.file_data, temp_file.read())
+    temp_file.close_temp_file()
+
+    self.assertEqual(['/redirect', '/file'],
+                     [path for path, headers in self.server.requests])
+
+
+  def test_not_modified_response(self):
+    async def responder(path, request_headers, writer):
+      if request_headers.get('if-none-match') == '"v1"':
+        async_http_server.write_response_head(writer, 304, {'ETag': '"v1"'})
+
+      else:
+        async_http_server.write_response(writer, 200, {'ETag': '"v1"'},
+                                         self.file_data)
+
+    url = self._respond('/timestamp.json', responder)
+
+    # The first download learns the validators of the file.
+    validators = {}
+    temp_file = self._download(async_download.unsafe_download(url,
+      self.file_length, validators=validators))
+    self.assertEqual(self.file_data, temp_file.read())
+    self.assertEqual('"v1"', validators['etag'])
+    temp_file.close_temp_file()
+
+    # The file is not downloaded again while it is unchanged.
+    self.assertRaises(ssl_crypto.NotModifiedError, self._download,
+                      async_download.unsafe_download(url, self.file_length,
+                                                     validators=validators))
+
+    path, request_headers = self.server.requests[-1]
+    self.assertEqual('"v1"', request_headers['if-none-match'])
+
+
+  def test_http_error_response(self):
+    url = self.server.url('/missing')
+
+    with self.assertRaises(six.moves.urllib.error.HTTPError) as context:
+      self._download(async_download.safe_download(url, self.file_length))
+
+    self.assertEqual(404, context.exception.code)
+
+
+  def test_length_mismatch(self):
+    url = self._serve_data('/file', self.file_data)
+
+    # The server reports more data than the trusted length.
+    self.assertRaises(ssl_crypto.DownloadLengthMismatchError, self._download,
+                      async_download.safe_download(url, self.file_length - 1))
+    self.assertRaises(ssl_crypto.DownloadLengthMismatchError, self._download,
+                      async_download.unsafe_download(url, self.file_length - 1))
+
+    # The server sends less data than the trusted length.
+    self.assertRaises(ssl_crypto.DownloadLengthMismatchError, self._download,
+                      async_download.safe_download(url, self.file_length + 1))
+
+    # A body of unknown length is never read past the trusted length.
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response_head(writer, 200, {})
+      writer.write(self.file_data)
+
+    url = self._respond('/eof', responder)
+
+    temp_file = self._download(async_download.unsafe_download(url, 10))
+    self.assertEqual(self.file_data[:10], temp_file.read())
+    temp_file.close_temp_file()
+
+
+  def test_slow_retrieval(self):
+    ssl_crypto.conf.SOCKET_TIMEOUT = 0.2
+    ssl_crypto.conf.SLOW_START_GRACE_PERIOD = 0
+    ssl_crypto.conf.MIN_AVERAGE_DOWNLOAD_SPEED = 1000
+
+    async def responder(path, request_headers, writer):
+      async_http_server.write_response_head(writer, 200,
+        {'Content-Length': str(self.file_length)})
+
+      for byte_index in range(self.file_length):
+        writer.write(self.file_data[byte_index:byte_index + 1])
+        await writer.drain()
+        await asyncio.sleep(0.05)
+
+    url = self._respond('/slow', responder)
+
+    self.assertRaises(ssl_crypto.DownloadLengthMismatchError, self._download,
+                      async_download.safe_download(url, self.file_length))
+
+
+  def test_unsupported_uri_scheme(self):
+    self.assertRaises(ssl_crypto.FormatError, self._download,
+                      async_download.safe_download('file:///etc/passwd', 10))
+
+
+
+# Run unit test.
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+"""
+<Program Name>
+  test_async_updater.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  Unit test for 'client/async_updater.py'.  A small signed repository is
+  created with 'repository_tool.py' for each test, and served by the stand-in
+  server of 'async_http_server.py', which runs in the event loop of the test.
+
+  This module requires Python 3.7, or later.
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import asyncio
+import logging
+import os
+import shutil
+import unittest
+
+import ssl_crypto
+import ssl_crypto.client.async_updater as async_updater
+import ssl_crypto.conf
+import ssl_crypto.keydb
+import ssl_crypto.keys
+import ssl_crypto.log
+import ssl_crypto.repository_tool as repo_tool
+import ssl_crypto.roledb
+import ssl_crypto.unittest_toolbox as unittest_toolbox
+
+import async_http_server
+
+logger = logging.getLogger('ssl_crypto.test_async_updater')
+
+repo_tool.disable_console_log_messages()
+
+# The target files of the repository, and their contents.
+_TARGET_FILES = {'file1.txt': b'This is an example target file.\n' * 100,
+                 'file2.txt': b'This is another example target file.\n' * 10}
+
+_TOP_LEVEL_ROLE_NAMES = ['root', 'targets', 'snapshot', 'timestamp']
+
+
+class TestAsyncUpdater(unittest_toolbox.Modified_TestCase):
+  def setUp(self):
+    unittest_toolbox.Modified_TestCase.setUp(self)
+
+    temporary_directory = self.make_temp_directory()
+    self.repository_directory = \
+      os.path.join(temporary_directory, 'repository')
+    self.client_directory = os.path.join(temporary_directory, 'client')
+    self.destination_directory = os.path.join(temporary_directory, 'targets')
+    os.mkdir(self.destination_directory)
+
+    # The keys are generated and verified with PyNaCl, rather than with the
+    # default pure Python 'ed25519' library.
+    self.saved_ed25519_crypto_library = \
+      ssl_crypto.keys._ED25519_CRYPTO_LIBRARY
+    ssl_crypto.keys._ED25519_CRYPTO_LIBRARY = 'pynacl'
+
+    # Sign the metadata of each top-level role with its own key.
+    self.role_keys = {}
+    repository = repo_tool.create_new_repository(self.repository_directory)
+
+    for role_name in _TOP_LEVEL_ROLE_NAMES:
+      self.role_keys[role_name] = ssl_crypto.keys.generate_ed25519_key()
+      getattr(repository, role_name).add_verification_key(
+        self.role_keys[role_name])
+
+    for target_filename, target_data in _TARGET_FILES.items():
+      self._add_target(repository, target_filename, target_data)
+
+    self._write_repository(repository)
+    repo_tool.create_ssl_crypto_client_directory(self.repository_directory,
+                                                 self.client_directory)
+
+    # The client starts from the metadata of the repository.
+    ssl_crypto.roledb.clear_roledb()
+    ssl_crypto.keydb.clear_keydb()
+    self.saved_repository_directory = ssl_crypto.conf.repository_directory
+    ssl_crypto.conf.repository_directory = self.client_directory
+
+    self.loop = asyncio.new_event_loop()
+    self.server = async_http_server.AsyncHTTPServer(self.repository_directory)
+    self.loop.run_until_complete(self.server.start())
+
+    repository_mirrors = {'mirror1': {'url_prefix': self.server.url(''),
+                                      'metadata_path': 'metadata',
+                                      'targets_path': 'targets',
+                                      'confined_target_dirs': ['']}}
+
+    self.updater = async_updater.AsyncUpdater('test_repository',
+                                              repository_mirrors)
+
+
+  def tearDown(self):
+    unittest_toolbox.Modified_TestCase.tearDown(self)
+
+    ssl_crypto.conf.repository_directory = self.saved_repository_directory
+    ssl_crypto.keys._ED25519_CRYPTO_LIBRARY = \
+      self.saved_ed25519_crypto_library
+    ssl_crypto.roledb.clear_roledb()
+    ssl_crypto.keydb.clear_keydb()
+
+    self.loop.run_until_complete(self.server.stop())
+    self.loop.close()
+
+
+  def _run(self, coroutine):
+    return self.loop.run_until_complete(coroutine)
+
+
+  def _add_target(self, repository, target_filename, target_data):
+    target_filepath = os.path.join(self.repository_directory, 'targets',
+                                   target_filename)
+
+    with open(target_filepath, 'wb') as file_object:
+      file_object.write(target_data)
+
+    repository.targets.add_target(target_filepath)
+
+
+  def _write_repository(self, repository):
+    # Publish the staged metadata, as a repository administrator would.
+    for role_name in _TOP_LEVEL_ROLE_NAMES:
+      getattr(repository, role_name).load_signing_key(self.role_keys[role_name])
+
+    repository.write()
+
+    metadata_directory = os.path.join(self.repository_directory, 'metadata')
+    shutil.rmtree(metadata_directory, ignore_errors=True)
+    shutil.copytree(os.path.join(self.repository_directory, 'metadata.staged'),
+                    metadata_directory)
+
+
+  def _get_requested_paths(self):
+    return [path for path, headers in self.server.requests]
+
+
+  def test_refresh(self):
+    # The repository is unchanged, so only the timestamp is downloaded.
+    self._run(self.updater.refresh())
+    self.assertEqual(['/metadata/timestamp.json'],
+                     self._get_requested_paths())
+
+    # Publish a new target, and a new version of the top-level roles.
+    repository = repo_tool.load_repository(self.repository_directory)
+    self._add_target(repository, 'file3.txt', b'A new target file.\n')
+    self._write_repository(repository)
+
+    current_metadata = self.updater.updater.metadata['current']
+    targets_version = current_metadata['targets']['version']
+
+    self._run(self.updater.refresh())
+
+    self.assertIn('/metadata/snapshot.json', self._get_requested_paths())
+    self.assertIn('/metadata/targets.json', self._get_requested_paths())
+    self.assertEqual(targets_version + 1,
+                     current_metadata['targets']['version'])
+    self.assertIn('/file3.txt', current_metadata['targets']['targets'])
+
+    # The new metadata was saved for the next updater.
+    self.assertTrue(os.path.exists(os.path.join(self.client_directory,
+                                   'metadata', 'previous', 'targets.json')))
+
+
+  def test_target(self):
+    self._run(self.updater.refresh())
+
+    target = self._run(self.updater.target('file1.txt'))
+    self.assertEqual('/file1.txt', target['filepath'])
+    self.assertEqual(len(_TARGET_FILES['file1.txt']),
+                     target['fileinfo']['length'])
+
+    # Concurrent lookups resolve the same targets.
+    async def get_targets():
+      return await asyncio.gather(self.updater.target('/file1.txt'),
+                                  self.updater.target('file2.txt'))
+
+    targets = self._run(get_targets())
+    self.assertEqual(target, targets[0])
+    self.assertEqual('/file2.txt', targets[1]['filepath'])
+
+    self.assertRaises(ssl_crypto.UnknownTargetError, self._run,
+                      self.updater.target('missing.txt'))
+    self.assertRaises(ssl_crypto.FormatError, self._run, self.updater.target(8))
+
+
+  def test_download_target(self):
+    self._run(self.updater.refresh())
+
+    async def download_targets():
+      targets = await asyncio.gather(*[self.updater.target(target_filename)
+                                       for target_filename in _TARGET_FILES])
+      await asyncio.gather(*[self.updater.download_target(target,
+                               self.destination_directory)
+                             for target in targets])
+
+    self._run(download_targets())
+
+    for target_filename, target_data in _TARGET_FILES.items():
+      target_filepath = os.path.join(self.destination_directory,
+                                     target_filename)
+
+      with open(target_filepath, 'rb') as file_object:
+        self.assertEqual(target_data, file_object.read())
+
+    self.assertIn('/targets/file1.txt', self._get_requested_paths())
+    self.assertIn('/targets/file2.txt', self._get_requested_paths())
+
+
+  def test_download_target_with_untrusted_file(self):
+    self._run(self.updater.refresh())
+    target = self._run(self.updater.target('file1.txt'))
+
+    # The mirror serves a file of the trusted length, but not of the trusted
+    # hashes.
+    target_data = _TARGET_FILES['file1.txt']
+    with open(os.path.join(self.repository_directory, 'targets',
+                           'file1.txt'), 'wb') as file_object:
+      file_object.write(target_data[::-1])
+
+    self.assertRaises(ssl_crypto.NoWorkingMirrorError, self._run,
+                      self.updater.download_target(target,
+                                                   self.destination_directory))
+    self.assertFalse(os.path.exists(os.path.join(self.destination_directory,
+                                                 'file1.txt')))
+
+    self.assertRaises(ssl_crypto.FormatError, self._run,
+                      self.updater.download_target({'filepath': 8},
+                                                   self.destination_directory))
+
+
+
+# Run unit test.
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+"""
+<Program Name>
+  test_download.py
+
+<Started>
+  October 16, 2026.
+
+<Copyright>
+  See LICENSE for licensing information.
+
+<Purpose>
+  Unit test for the persistent connections of 'download.py'.  Files are
+  downloaded from a local HTTP/1.1 server that keeps connections alive, and
+  runs in a thread of the test.
+"""
+
+# Help with Python 3 compatibility, where the print statement is a function, an
+# implicit relative import is invalid, and the '/' operator performs true
+# division.  Example:  print 'hello world' raises a 'SyntaxError' exception.
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+import unittest
+
+from multiprocessing.pool import ThreadPool
+
+import ssl_crypto
+import ssl_crypto.conf
+import ssl_crypto.download as download
+import ssl_crypto.log
+import ssl_crypto.unittest_toolbox as unittest_toolbox
+
+import six
+
+logger = logging.getLogger('ssl_crypto.test_download')
+
+# The settings of 'ssl_crypto.conf' modified by the tests.
+_CONF_SETTINGS = ['SOCKET_TIMEOUT', 'MIN_AVERAGE_DOWNLOAD_SPEED',
+                  'MAX_CONNECTIONS_PER_MIRROR', 'CONNECTION_POOL_TIMEOUT']
+
+# The file served, and the time the server takes to send it.
+_FILE_DATA = b'The quick brown fox jumps over the lazy dog.\n' * 100
+_FILE_PIECES = 10
+_SECONDS_PER_PIECE = 0.1
+
+
+class _SlowRequestHandler(six.moves.BaseHTTPServer.BaseHTTPRequestHandler):
+  # Keep connections alive, so that they are reused by the connection pool.
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    server = self.server
+
+    with server.lock:
+      server.open_requests = server.open_requests + 1
+      server.max_open_requests = max(server.max_open_requests,
+                                     server.open_requests)
+
+    try:
+      self.send_response(200)
+      self.send_header('Content-Length', str(len(_FILE_DATA)))
+      self.end_headers()
+
+      # Each piece arrives well within the socket timeout, but the whole file
+      # does not.
+      piece_length = len(_FILE_DATA) // _FILE_PIECES + 1
+      for offset in range(0, len(_FILE_DATA), piece_length):
+        time.sleep(_SECONDS_PER_PIECE)
+        self.wfile.write(_FILE_DATA[offset:offset + piece_length])
+        self.wfile.flush()
+
+    finally:
+      with server.lock:
+        server.open_requests = server.open_requests - 1
+
+
+  def log_message(self, format, *args):
+    logger.debug(format % args)
+
+
+
+class TestDownload(unittest_toolbox.Modified_TestCase):
+  def setUp(self):
+    unittest_toolbox.Modified_TestCase.setUp(self)
+
+    self.saved_conf_settings = dict((name, getattr(ssl_crypto.conf, name))
+                                    for name in _CONF_SETTINGS)
+
+    # The transfer of a file lasts longer than the socket timeout.
+    ssl_crypto.conf.SOCKET_TIMEOUT = 0.5
+    ssl_crypto.conf.MIN_AVERAGE_DOWNLOAD_SPEED = 1
+    ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR = 2
+
+    self.server = six.moves.socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+      _SlowRequestHandler)
+    self.server.daemon_threads = True
+    self.server.lock = threading.Lock()
+    self.server.open_requests = 0
+    self.server.max_open_requests = 0
+
+    self.server_thread = threading.Thread(target=self.server.serve_forever)
+    self.server_thread.daemon = True
+    self.server_thread.start()
+
+    self.url = 'http://127.0.0.1:' + str(self.server.server_address[1]) + \
+      '/file.txt'
+
+
+  def tearDown(self):
+    unittest_toolbox.Modified_TestCase.tearDown(self)
+
+    download.close_pooled_connections()
+    self.server.shutdown()
+    self.server.server_close()
+
+    for name, value in self.saved_conf_settings.items():
+      setattr(ssl_crypto.conf, name, value)
+
+
+  def test_more_concurrent_downloads_than_connections(self):
+    number_of_downloads = ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR * 3
+
+    def download_file(index):
+      temp_file = download.safe_download(self.url, len(_FILE_DATA))
+      data = temp_file.read()
+      temp_file.close_temp_file()
+      return data
+
+    # The downloads that wait for a pooled connection wait longer than the
+    # socket timeout, and still succeed.
+    thread_pool = ThreadPool(number_of_downloads)
+    try:
+      downloaded_data = thread_pool.map(download_file,
+                                        range(number_of_downloads))
+
+    finally:
+      thread_pool.close()
+      thread_pool.join()
+
+    self.assertEqual([_FILE_DATA] * number_of_downloads, downloaded_data)
+    self.assertEqual(ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR,
+                     self.server.max_open_requests)
+
+
+  def test_connection_pool_timeout(self):
+    ssl_crypto.conf.MAX_CONNECTIONS_PER_MIRROR = 1
+    ssl_crypto.conf.CONNECTION_POOL_TIMEOUT = 0.2
+
+    # A response that is never closed keeps its connection.
+    leaked_response = download._open_connection(self.url)
+
+    try:
+      self.assertRaises(ssl_crypto.ConnectionPoolTimeoutError,
+                        download.safe_download, self.url, len(_FILE_DATA))
+
+    finally:
+      leaked_response.read()
+      leaked_response.close()
+
+    # The released connection is used by the next download.
+    temp_file = download.safe_download(self.url, len(_FILE_DATA))
+    self.assertEqual(_FILE_DATA, temp_file.read())
+    temp_file.close_temp_file()
+
+
+
+# Run unit test.
+if __name__ == '__main__':
+  unittest.main()
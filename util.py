@@ -26,12 +26,16 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import io
+import errno
 import os
 import sys
 import gzip
+import stat
 import shutil
 import logging
 import tempfile
+import zlib
 
 import ssl_crypto
 import ssl_crypto.hash
@@ -47,6 +51,30 @@ HASH_FUNCTION = 'sha256'
 # See 'log.py' to learn how logging is handled in TUF.
 logger = logging.getLogger('ssl_crypto.util')
 
+# The 'fcntl' module is only available on Unix platforms.  It is needed to
+# clone files (see clone_file()).
+try:
+  import fcntl
+
+except ImportError: # pragma: no cover
+  fcntl = None
+
+# The Linux ioctl() request that clones the data of a file (FICLONE), so that
+# the clone shares the blocks of the original until either is modified.  It is
+# supported by copy-on-write file systems, such as Btrfs and XFS.
+_FICLONE = 0x40049409
+
+# The 'wbits' argument of zlib.decompressobj() that expects a gzip header and
+# trailer around the compressed data.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# The mode open() gives new files, according to the umask of the process.  The
+# umask can only be read by setting it, which would briefly affect the files
+# created by other threads, so it is read once, on import.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_DEFAULT_FILE_MODE = 0o666 & ~_UMASK
+
 
 class TempFile(object):
   """
@@ -60,9 +88,9 @@ class TempFile(object):
   """
 
   def _default_temporary_directory(self, prefix):
-    """__init__ helper."""
+    """_new_named_temporary_file() helper."""
     try:
-      self.temporary_file = tempfile.NamedTemporaryFile(prefix=prefix)
+      return tempfile.NamedTemporaryFile(prefix=prefix)
     
     except OSError as err: # pragma: no cover
       logger.critical('Cannot create a system temporary directory: '+repr(err))
@@ -70,7 +98,56 @@ class TempFile(object):
 
 
 
-  def __init__(self, prefix='ssl_crypto_temp_'):
+  def _new_named_temporary_file(self):
+    """
+    Create a temporary file on disk, in 'self._directory' if possible, else in
+    the system default temp dir.
+    """
+
+    directory = self._directory
+
+    if directory is not None and \
+       ssl_crypto.formats.PATH_SCHEMA.matches(directory):
+      try:
+        return tempfile.NamedTemporaryFile(prefix=self._prefix, dir=directory)
+
+      except OSError as err:
+        logger.error('Temp file in ' + directory + ' failed: '+repr(err))
+        logger.error('Will attempt to use system default temp dir.')
+
+    return self._default_temporary_directory(self._prefix)
+
+
+
+  def _new_temporary_file(self):
+    """
+    Create the underlying temporary file.  It is held in memory, until it
+    grows larger than 'self._spool_size' bytes, if that is set.
+    """
+
+    if self._spool_size:
+      return io.BytesIO()
+
+    return self._new_named_temporary_file()
+
+
+
+  def _roll_over(self):
+    """
+    Write the file held in memory to a temporary file on disk, and keep writing
+    to the latter.
+    """
+
+    spooled_file = self.temporary_file
+    self.temporary_file = self._new_named_temporary_file()
+    self.temporary_file.write(spooled_file.getvalue())
+    self.temporary_file.seek(spooled_file.tell())
+    spooled_file.close()
+
+
+
+  def __init__(self, prefix='ssl_crypto_temp_', hash_algorithms=None,
+               spool_size=None):
     """
     <Purpose>
       Initializes TempFile.
@@ -79,29 +156,133 @@ class TempFile(object):
       prefix:
         A string argument to be used with tempfile.NamedTemporaryFile function.
 
+      hash_algorithms:
+        An optional list of hash algorithms (e.g., ['sha256', 'sha512']).  The
+        digests of these algorithms are updated with every chunk passed to
+        write(), so that get_digest() need not read the file back from disk.
+        Algorithms unsupported by 'ssl_crypto.hash' are not tracked.
+
+      spool_size:
+        An optional number of bytes.  If set (and nonzero), the file is kept in
+        memory, and is only written to a file on disk once it grows larger
+        than 'spool_size' bytes.  Small files (e.g., metadata) then never touch
+        the temporary file system.
+
     <Exceptions>
       ssl_crypto.Error on failure to load temp dir.
 
+      ssl_crypto.FormatError, if 'hash_algorithms' or 'spool_size' is
+      improperly formatted.
+
     <Return>
       None.
     """
 
+    if hash_algorithms is None:
+      hash_algorithms = []
+
+    ssl_crypto.formats.NAMES_SCHEMA.check_match(hash_algorithms)
+
+    if spool_size is not None:
+      ssl_crypto.formats.LENGTH_SCHEMA.check_match(spool_size)
+
+    self._prefix = prefix
+    self._spool_size = spool_size
+
+    self._directory = ssl_crypto.conf.temporary_directory
     self._compression = None
+    self._hash_algorithms = list(hash_algorithms)
+
+    # Set by decompress_writes().  The data passed to write() is decompressed
+    # by 'self._decompressor', and the decompressed data is stored.
+    self._decompressor = None
+    self._max_length = None
+    self._compressed_length = None
+    
+    # The digest objects of 'self._hash_algorithms', and the number of bytes
+    # written, are kept up to date by write().
+    self._digest_objects = {}
+    self._length = 0
+    self._reset_digests()
     
     # If compression is set then the original file is saved in 'self._orig_file'.
     self._orig_file = None
-    temp_dir = ssl_crypto.conf.temporary_directory
-    if temp_dir is not None and ssl_crypto.formats.PATH_SCHEMA.matches(temp_dir):
+    self.temporary_file = self._new_temporary_file()
+
+
+
+
+
+  def _reset_digests(self):
+    """Create fresh digest objects for the tracked hash algorithms."""
+
+    self._digest_objects = {}
+    self._length = 0
+
+    for algorithm in self._hash_algorithms:
       try:
-        self.temporary_file = tempfile.NamedTemporaryFile(prefix=prefix,
-                                                          dir=temp_dir)
-      except OSError as err:
-        logger.error('Temp file in ' + temp_dir + ' failed: '+repr(err))
-        logger.error('Will attempt to use system default temp dir.')
-        self._default_temporary_directory(prefix)
-    
+        self._digest_objects[algorithm] = ssl_crypto.hash.digest(algorithm)
+      
+      # get_digest() falls back to reading the file, and raises the error,
+      # if the digest of an unsupported algorithm is requested.
+      except (ssl_crypto.UnsupportedAlgorithmError, ssl_crypto.Error):
+        logger.debug('Not tracking the ' + repr(algorithm) + ' digest.')
+
+
+
+
+
+  def get_digest(self, algorithm):
+    """
+    <Purpose>
+      Get the digest object of the file's (uncompressed) contents for
+      'algorithm'.  If 'algorithm' was given to the constructor, the digest
+      computed while the data was written is returned and the file is not read
+      again.  Otherwise, the contents of the file are read and hashed.
+
+    <Arguments>
+      algorithm:
+        The hash algorithm (e.g., 'sha256') of the digest object.
+
+    <Exceptions>
+      ssl_crypto.FormatError, if 'algorithm' is improperly formatted.
+
+      ssl_crypto.UnsupportedAlgorithmError, if 'algorithm' is unsupported.
+
+    <Return>
+      A digest object (e.g., hashlib.new(algorithm)).  A copy is returned so
+      that the caller may update it freely.
+    """
+
+    ssl_crypto.formats.NAME_SCHEMA.check_match(algorithm)
+
+    if algorithm in self._digest_objects:
+      return self._digest_objects[algorithm].copy()
+
     else:
-      self._default_temporary_directory(prefix)
+      return ssl_crypto.hash.digest_fileobject(self, algorithm)
+
+
+
+
+
+  def get_length(self):
+    """
+    <Purpose>
+      Get the length of the file's (uncompressed) contents, as counted while
+      the data was written.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Return>
+      Nonnegative integer representing the number of bytes in the file.
+    """
+
+    return self._length
 
 
 
@@ -123,9 +304,13 @@ class TempFile(object):
       Nonnegative integer representing compressed file size.
     """
 
-    # Even if we read a compressed file with the gzip standard library module,
-    # the original file will remain compressed.
-    return os.stat(self.temporary_file.name).st_size
+    # The compressed data is counted as it is decompressed.  It may not have
+    # been stored (see decompress_writes()).
+    if self._compressed_length is not None:
+      return self._compressed_length
+
+    # A spooled file held in memory has no name to stat().
+    return self._length
 
 
 
@@ -187,7 +372,9 @@ class TempFile(object):
   def write(self, data, auto_flush=True):
     """
     <Purpose>
-      Writes a data string to the file.
+      Writes a data string to the file, and updates the tracked digests and
+      length with it.  If decompress_writes() was called, 'data' is
+      decompressed first.
 
     <Arguments>
       data:
@@ -198,40 +385,131 @@ class TempFile(object):
         internal buffer.
 
     <Exceptions>
-      None.
+      ssl_crypto.DecompressionError, if 'data' cannot be decompressed, or the
+      decompressed data exceeds its maximum length.
 
     <Return>
       None.
     """
 
-    self.temporary_file.write(data)
+    if self._decompressor is not None:
+      self._write_compressed(data)
+
+    else:
+      self._write_uncompressed(data)
+    
     if auto_flush:
       self.flush()
 
 
 
+
+
+  def _write_uncompressed(self, data):
+    """Store 'data', and update the tracked digests and length with it."""
+
+    if self._spool_size and isinstance(self.temporary_file, io.BytesIO) and \
+       self.temporary_file.tell() + len(data) > self._spool_size:
+      self._roll_over()
+
+    self.temporary_file.write(data)
+    self._length = self._length + len(data)
+    
+    for digest_object in six.itervalues(self._digest_objects):
+      digest_object.update(data)
+
+
+
+
+
+  def _write_compressed(self, data):
+    """Decompress 'data', a chunk of compressed data, and store the result."""
+
+    self._compressed_length = self._compressed_length + len(data)
+
+    try:
+      while data:
+        # Decompress at most a chunk at a time, so that highly compressed data
+        # does not fill memory.  The rest of 'data' is left in
+        # 'unconsumed_tail'.
+        uncompressed_data = \
+          self._decompressor.decompress(data, ssl_crypto.conf.CHUNK_SIZE)
+        data = self._decompressor.unconsumed_tail
+
+        if self._max_length is not None and \
+           self._length + len(uncompressed_data) > self._max_length:
+          raise ssl_crypto.Error('The decompressed data exceeds ' + \
+                                 str(self._max_length) + ' bytes.')
+
+        self._write_uncompressed(uncompressed_data)
+
+        # Data following the compressed data (e.g., a second gzip member) is
+        # not accepted.  Once the end of the compressed data is reached, the
+        # rest of 'data' is also left in 'unconsumed_tail'.
+        if self._decompressor.unused_data or \
+           (data and getattr(self._decompressor, 'eof', False)):
+          raise ssl_crypto.Error('Unexpected data follows the compressed'
+                                 ' data.')
+
+    except (ssl_crypto.Error, zlib.error) as exception:
+      raise ssl_crypto.DecompressionError(exception)
+
+
+
   def move(self, destination_path):
     """
     <Purpose>
-      Copies 'self.temporary_file' to a non-temp file at 'destination_path' and
-      closes 'self.temporary_file' so that it is removed.
+      Moves 'self.temporary_file' to a non-temp file at 'destination_path' and
+      closes 'self.temporary_file' so that it is removed.  The destination is
+      replaced atomically.  The data is not copied if the temporary file is on
+      the file system of 'destination_path' (it is hard linked, or cloned), and
+      is otherwise copied by the kernel if possible (see clone_file()).  A file
+      held in memory is written to a new file next to 'destination_path',
+      which is then renamed over it.  No file is created at 'destination_path'
+      before its data is complete.
+
+      The moved file has the mode of the file it replaces, or else the default
+      mode of new files.
 
     <Arguments>
       destination_path:
         Path to store the file in.
 
     <Exceptions>
-      None.
+      IOError or OSError, if the file cannot be moved.
 
     <Return>
       None.
     """
 
     self.flush()
-    self.seek(0)
-    destination_file = open(destination_path, 'wb')
-    shutil.copyfileobj(self.temporary_file, destination_file)
-    destination_file.close()
+
+    # The temporary file is only readable by its owner.  Note the mode of the
+    # destination, whose inode is replaced, or else the mode open() would have
+    # given it.
+    try:
+      mode = stat.S_IMODE(os.stat(destination_path).st_mode)
+
+    except OSError as e:
+      if e.errno != errno.ENOENT:
+        raise
+
+      mode = _DEFAULT_FILE_MODE
+
+    if isinstance(self.temporary_file, io.BytesIO):
+      self._copy(destination_path)
+
+    else:
+      try:
+        clone_file(self.temporary_file.name, destination_path)
+
+      # The temporary file cannot be opened again by its name on some
+      # platforms (e.g., Windows).  Copy its data instead.
+      except (IOError, OSError):
+        logger.debug('Cannot clone ' + repr(self.temporary_file.name) + '.')
+        self._copy(destination_path)
+
+    os.chmod(destination_path, mode)
     
     # 'self.close()' closes temporary file which destroys itself.
     self.close_temp_file()
@@ -240,6 +518,60 @@ class TempFile(object):
 
 
 
+  def _copy(self, destination_path):
+    """Replace 'destination_path' with a copy of the file, atomically."""
+
+    file_descriptor, temp_filepath = \
+      tempfile.mkstemp(prefix='.' + self._prefix,
+                       dir=os.path.dirname(os.path.abspath(destination_path)))
+
+    try:
+      with os.fdopen(file_descriptor, 'wb') as destination_file:
+        self.seek(0)
+        shutil.copyfileobj(self.temporary_file, destination_file)
+
+      # os.replace() also replaces an existing destination on Windows.
+      getattr(os, 'replace', os.rename)(temp_filepath, destination_path)
+
+    except:
+      if os.path.exists(temp_filepath):
+        os.remove(temp_filepath)
+
+      raise
+
+
+
+
+
+  def truncate(self):
+    """
+    <Purpose>
+      Discard the contents of the file, so that it may be written again from
+      the beginning (e.g., when a partial download cannot be resumed).  The
+      tracked digests and length are reset.
+
+    <Arguments>
+      None.
+
+    <Exceptions>
+      None.
+
+    <Return>
+      None.
+    """
+
+    self.temporary_file.seek(0)
+    self.temporary_file.truncate()
+    self._reset_digests()
+
+    if self._decompressor is not None:
+      self._decompressor = zlib.decompressobj(_GZIP_WBITS)
+      self._compressed_length = 0
+
+
+
+
+
   def seek(self, *args):
     """
     <Purpose>
@@ -265,7 +597,65 @@ class TempFile(object):
 
 
 
-  def decompress_temp_file_object(self, compression):
+  def decompress_writes(self, compression, max_length=None):
+    """
+    <Purpose>
+      Decompress the data passed to write() as it is written, so that only
+      the decompressed data is stored.  Unlike decompress_temp_file_object(),
+      the compressed data is not stored and read back, and only a chunk of it
+      is held in memory at a time.  This must be called before any data is
+      written (e.g., before the file is downloaded), and
+      decompress_temp_file_object() must be called after all of it is written,
+      to ensure that the compressed data is complete.
+
+    <Arguments>
+      compression:
+        A string indicating the type of compression of the data written.  Only
+        gzip is allowed.
+
+      max_length:
+        The maximum number of bytes of decompressed data, or None for no limit.
+        It guards against decompression bombs, which are small compressed
+        files that decompress to an enormous amount of data.
+
+    <Exceptions>
+      ssl_crypto.FormatError: If an argument is improperly formatted.
+
+      ssl_crypto.Error: If an invalid compression is given, the compression has
+      already been set, or data has already been written.
+
+    <Side Effects>
+      The tracked digests and length describe the decompressed data.
+
+    <Return>
+      None.
+    """
+
+    ssl_crypto.formats.NAME_SCHEMA.check_match(compression)
+
+    if max_length is not None:
+      ssl_crypto.formats.LENGTH_SCHEMA.check_match(max_length)
+
+    if self._compression is not None:
+      raise ssl_crypto.Error('Can only set compression on a TempFile once.')
+
+    if compression != 'gzip':
+      raise ssl_crypto.Error('Only gzip compression is supported.')
+
+    if self._length > 0:
+      raise ssl_crypto.Error('Can only decompress the data of a TempFile'
+                             ' before it is written.')
+
+    self._compression = compression
+    self._decompressor = zlib.decompressobj(_GZIP_WBITS)
+    self._max_length = max_length
+    self._compressed_length = 0
+
+
+
+
+
+  def decompress_temp_file_object(self, compression, max_length=None):
     """
     <Purpose>
       To decompress a compressed temp file object.  Decompression is performed
@@ -283,13 +673,21 @@ class TempFile(object):
           containing meta.json          containing meta.json.gz
           (decompressed data)
 
+      The data is decompressed a chunk at a time.  If the data was already
+      decompressed as it was written (see decompress_writes()), only the
+      completeness of the compressed data is checked.
+
     <Arguments>
       compression:
         A string indicating the type of compression that was used to compress
         a file.  Only gzip is allowed.
 
+      max_length:
+        The maximum number of bytes of decompressed data, or None for no limit.
+        It is ignored if decompress_writes() set the limit.
+
     <Exceptions>
-      ssl_crypto.FormatError: If 'compression' is improperly formatted.
+      ssl_crypto.FormatError: If an argument is improperly formatted.
 
       ssl_crypto.Error: If an invalid compression is given.
 
@@ -297,6 +695,7 @@ class TempFile(object):
 
     <Side Effects>
       'self._orig_file' is used to store the original data of 'temporary_file'.
+      The tracked digests and length now describe the decompressed data.
 
     <Return>
       None.
@@ -305,24 +704,45 @@ class TempFile(object):
     # Does 'compression' have the correct format?
     # Raise 'ssl_crypto.FormatError' if there is a mismatch.
     ssl_crypto.formats.NAME_SCHEMA.check_match(compression)
+
+    # The data was decompressed as it was written.
+    if self._decompressor is not None:
+      if compression != self._compression:
+        raise ssl_crypto.Error('The data was compressed with ' + \
+                               repr(self._compression) + '.')
+
+      self._finish_decompression()
+      return
     
-    if self._orig_file is not None:
+    if self._compression is not None:
       raise ssl_crypto.Error('Can only set compression on a TempFile once.')
 
     if compression != 'gzip':
       raise ssl_crypto.Error('Only gzip compression is supported.')
 
+    self.flush()
     self.seek(0)
-    self._compression = compression
     self._orig_file = self.temporary_file
 
     try:
-      gzip_file_object = gzip.GzipFile(fileobj=self.temporary_file, mode='rb')
-      uncompressed_content = gzip_file_object.read()
-      self.temporary_file = tempfile.NamedTemporaryFile()
-      self.temporary_file.write(uncompressed_content)
-      self.flush() 
+      self.temporary_file = self._new_temporary_file()
+      self._reset_digests()
+      self.decompress_writes(compression, max_length)
+
+      while True:
+        data = self._orig_file.read(ssl_crypto.conf.CHUNK_SIZE)
+
+        if not data:
+          break
+
+        self.write(data, auto_flush=False)
+
+      self.flush()
+      self._finish_decompression()
     
+    except ssl_crypto.DecompressionError:
+      raise
+
     except Exception as exception:
       raise ssl_crypto.DecompressionError(exception)
 
@@ -330,6 +750,24 @@ class TempFile(object):
 
 
 
+  def _finish_decompression(self):
+    """
+    Ensure that all of the compressed data was written, and stop decompressing
+    write()s.
+    """
+
+    # Python 2's decompression objects lack 'eof'.  Incomplete data is then
+    # only detected by the verification of the decompressed data.
+    if not getattr(self._decompressor, 'eof', True):
+      raise ssl_crypto.DecompressionError(
+        ssl_crypto.Error('The compressed data is incomplete.'))
+
+    self._decompressor = None
+
+
+
+
+
   def close_temp_file(self):
     """
     <Purpose>
@@ -454,6 +892,96 @@ def ensure_parent_dir(filename):
 
 
 
+def clone_file(source_filepath, destination_filepath):
+  """
+  <Purpose>
+    Replace 'destination_filepath' with the contents of 'source_filepath',
+    without copying the data if possible.  The file is cloned (reflinked) if
+    the file system supports it, else hard linked, else copied.  The
+    destination is replaced atomically.
+
+    A hard linked destination shares its data with 'source_filepath';
+    modifying one in place modifies the other.
+
+  <Arguments>
+    source_filepath:
+      The path of the file to clone.
+
+    destination_filepath:
+      The path of the clone.  Its parent directory must exist.
+
+  <Exceptions>
+    ssl_crypto.FormatError: If the arguments are improperly formatted.
+
+    IOError or OSError: If the file cannot be cloned.
+
+  <Side Effects>
+    A file is created at 'destination_filepath'.
+
+  <Return>
+    'reflink', 'hardlink', or 'copy', according to how the file was cloned.
+  """
+
+  # Do the arguments have the correct format?
+  # Raise 'ssl_crypto.FormatError' on a mismatch.
+  ssl_crypto.formats.PATH_SCHEMA.check_match(source_filepath)
+  ssl_crypto.formats.PATH_SCHEMA.check_match(destination_filepath)
+
+  # Renaming a hard link onto another link of the same file does nothing.
+  if os.path.exists(destination_filepath) and \
+     os.path.samefile(source_filepath, destination_filepath):
+    return 'hardlink'
+
+  # The clone is created next to the destination, and then renamed over it.
+  file_descriptor, temp_filepath = \
+    tempfile.mkstemp(prefix='.ssl_crypto_clone_',
+                     dir=os.path.dirname(destination_filepath) or '.')
+  clone_method = None
+
+  try:
+    with open(source_filepath, 'rb') as source_file:
+      if fcntl is not None:
+        try:
+          fcntl.ioctl(file_descriptor, _FICLONE, source_file.fileno())
+          clone_method = 'reflink'
+
+        except (IOError, OSError):
+          logger.debug('Cannot reflink ' + repr(source_filepath) + '.')
+
+    os.close(file_descriptor)
+    file_descriptor = None
+
+    if clone_method is None:
+      try:
+        os.remove(temp_filepath)
+        os.link(source_filepath, temp_filepath)
+        clone_method = 'hardlink'
+
+      except (AttributeError, OSError):
+        logger.debug('Cannot hard link ' + repr(source_filepath) + '.')
+
+    if clone_method is None:
+      shutil.copyfile(source_filepath, temp_filepath)
+      clone_method = 'copy'
+
+    # os.replace() also replaces an existing destination on Windows.
+    getattr(os, 'replace', os.rename)(temp_filepath, destination_filepath)
+
+  except:
+    if file_descriptor is not None:
+      os.close(file_descriptor)
+
+    if os.path.exists(temp_filepath):
+      os.remove(temp_filepath)
+
+    raise
+
+  return clone_method
+
+
+
+
+
 def file_in_confined_directories(filepath, confined_directories):
   """
   <Purpose>